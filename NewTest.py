@@ -1,8 +1,8 @@
-import requests
-from bs4 import BeautifulSoup
 from geopy.geocoders import Nominatim
 from geopy.distance import geodesic
 import pandas as pd
+from price_parser import parse_price_text
+from store_scrapers import ScrapeSession, scraper_for_url
 
 # Sample item list
 items = ["milk", "eggs", "bread"]
@@ -22,51 +22,36 @@ def get_nearby_stores(location, radius=50):
         {"name": "Rouses", "lat": 29.9500, "lon": -90.0700, "url": "https://www.rouses.com/shop/"},
     ]
 
-# Step 3: Scrape prices for specific items from each store (requires custom scraper per site)
-def get_prices_from_walmart(item):
-    search_url = f"https://www.walmart.com/search?q={item}"
-    headers = {"User-Agent": "Mozilla/5.0"}
-    response = requests.get(search_url, headers=headers)
-    soup = BeautifulSoup(response.content, "html.parser")
-    try:
-        price_span = soup.find("span", class_="price-characteristic")
-        return f"${price_span.text}" if price_span else "N/A"
-    except:
-        return "Error"
-
-def get_prices_from_rouses(item):
-    search_url = f"https://www.rouses.com/shop/?s={item}"
-    headers = {"User-Agent": "Mozilla/5.0"}
-    response = requests.get(search_url, headers=headers)
-    soup = BeautifulSoup(response.content, "html.parser")
-    try:
-        # This selector may need to be updated based on Rouses' HTML
-        price_tag = soup.find("span", class_="woocommerce-Price-amount")
-        return price_tag.text.strip() if price_tag else "N/A"
-    except:
-        return "Error"
-
-# Step 4: Loop through stores and items
+# Step 3: Scrape prices for specific items from each store (one adapter per site in store_scrapers.py)
+# Step 4: Scrape every store x item page concurrently over a shared connection pool
 def collect_prices():
     user_location = get_user_location()
     stores = get_nearby_stores(user_location)
 
-    price_data = []
+    jobs, rows = [], []
     for store in stores:
         store_location = (store["lat"], store["lon"])
         if geodesic(user_location, store_location).miles <= 50:
+            scraper = scraper_for_url(store["url"])
             for item in items:
-                if "walmart" in store["url"]:
-                    price = get_prices_from_walmart(item)
-                elif "rouses" in store["url"]:
-                    price = get_prices_from_rouses(item)
-                else:
-                    price = "TBD"
-                price_data.append({
-                    "Store": store["name"],
-                    "Item": item,
-                    "Price": price
-                })
+                if scraper:
+                    jobs.append((scraper, item))
+                rows.append((store["name"], item, scraper is not None))
+
+    scraped = iter(ScrapeSession().scrape(jobs))
+    price_data = []
+    for store_name, item, has_scraper in rows:
+        price = next(scraped)["price"] if has_scraper else "TBD"
+        # Same parser as the LLM estimates: "$3.98" -> 3.98, "N/A" -> None
+        parsed = parse_price_text(price)
+        price_data.append({
+            "Store": store_name,
+            "Item": item,
+            "Price": parsed.price,
+            "Unit Price": parsed.unit_price,
+            "Unit": parsed.unit,
+            "Raw Price": price
+        })
 
     return pd.DataFrame(price_data)
 
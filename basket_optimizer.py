@@ -0,0 +1,343 @@
+import time
+from itertools import combinations, permutations
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from geo_distance import distances_from, haversine_miles
+from price_records import PriceTable
+
+# Driving cost per mile (the IRS standard mileage rate for 2025, $0.70)
+DEFAULT_COST_PER_MILE = 0.70
+
+# Largest store count solved exactly by solve(); above it, local search
+EXACT_MAX_STORES = 3
+
+# Routes through up to this many stores are found by trying every visiting order
+EXACT_TOUR_STORES = 6
+
+_PERMUTATIONS: Dict[int, np.ndarray] = {}
+
+
+class BasketPlan(NamedTuple):
+    """Cheapest way found to buy a basket from at most max_stores stores"""
+    stores: List[int]          # Store indices in visiting order (home -> stores -> home)
+    assignment: np.ndarray     # Per basket item, the store index it is bought at (-1: sold nowhere)
+    item_cost: float
+    travel_miles: float
+    total_cost: float          # item_cost + travel_miles * cost_per_mile
+    method: str                # 'exact' or 'local search'
+    evaluated: int             # Store subsets whose cost was computed
+
+
+def _all_orders(count: int) -> np.ndarray:
+    if count not in _PERMUTATIONS:
+        _PERMUTATIONS[count] = np.array(list(permutations(range(count))), dtype=np.intp)
+    return _PERMUTATIONS[count]
+
+
+class BasketOptimizer:
+    """Cheapest store subset for a basket, counting the drive from home and between stores
+
+    prices is a stores x items matrix of basket prices (already multiplied by
+    quantity), NaN where a store doesn't sell the item. home_miles is each
+    store's distance from home (Store.distance) and coords its (lat, lng), from
+    which store-to-store distances are computed unless store_miles (road miles,
+    e.g. road_network.DriveTimes.between; NaN where unknown) is given. A trip
+    is a round trip from home through the chosen stores.
+    """
+
+    def __init__(self, prices: np.ndarray, home_miles: Sequence[float], coords: np.ndarray,
+                 cost_per_mile: float = DEFAULT_COST_PER_MILE, store_miles: Optional[np.ndarray] = None):
+        prices = np.asarray(prices, dtype=np.float64)
+        if prices.ndim != 2 or len(prices) != len(home_miles) or len(coords) != len(home_miles):
+            raise ValueError("prices must be stores x items, with one distance and coordinate per store")
+        if cost_per_mile < 0:
+            raise ValueError(f"cost_per_mile must be >= 0, got {cost_per_mile}")
+        self.cost_per_mile = cost_per_mile
+        sold = ~np.isnan(prices)
+        # Items nobody sells are left out of the optimization (and reported as -1)
+        self.available = sold.any(axis=0)
+        self.prices = np.where(sold, prices, np.inf)[:, self.available]
+        # Bitset of the (available) items each store sells, for fast coverage checks
+        self.masks = [int.from_bytes(np.packbits(row, bitorder='little').tobytes(), 'little')
+                      for row in sold[:, self.available]]
+        self.full_mask = (1 << int(self.available.sum())) - 1
+
+        # Node 0 is home, node s + 1 is store s
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        store_count = len(coords)
+        self.miles = np.zeros((store_count + 1, store_count + 1))
+        self.miles[0, 1:] = self.miles[1:, 0] = np.asarray(home_miles, dtype=np.float64)
+        self.miles[1:, 1:] = haversine_miles(coords[:, None, 0], coords[:, None, 1], coords[None, :, 0], coords[None, :, 1])
+        if store_miles is not None:
+            self.miles[1:, 1:] = np.where(np.isnan(store_miles), self.miles[1:, 1:], store_miles)
+
+        # Lowest possible price of every item, and a stand-in price for items a store lacks,
+        # large enough that the greedy start never prefers a gap to buying the item
+        self.item_floor = self.prices.min(axis=0)
+        finite = np.where(np.isfinite(self.prices), self.prices, 0)
+        self._penalized = np.where(np.isfinite(self.prices), self.prices, 10 * finite.max(axis=0) + 1000)
+
+    @classmethod
+    def from_table(cls, table: PriceTable, items: Optional[Sequence[str]] = None,
+                   quantities: Optional[Sequence[float]] = None, cost_per_mile: float = DEFAULT_COST_PER_MILE,
+                   store_miles: Optional[np.ndarray] = None) -> 'BasketOptimizer':
+        """Optimizer over a PriceTable's latest date, for items (default: every item)"""
+        items = list(table.items) if items is None else list(items)
+        positions = {item: i for i, item in enumerate(table.items)}
+        unknown = [item for item in items if item not in positions]
+        if unknown:
+            raise ValueError(f"Items not in the price table: {unknown}")
+        latest = table.date_codes == table.date_codes.max() if len(table) else np.zeros(0, dtype=bool)
+        matrix = np.full((len(table.stores), len(table.items)), np.nan)
+        matrix[table.store_codes[latest], table.item_codes[latest]] = table.prices[latest]
+        basket = matrix[:, [positions[item] for item in items]]
+        if quantities is not None:
+            basket = basket * np.asarray(quantities, dtype=np.float64)
+        coords = np.array([(store.lat, store.lng) for store in table.stores], dtype=np.float64)
+        return cls(basket, [store.distance for store in table.stores], coords, cost_per_mile, store_miles)
+
+    @classmethod
+    def from_frames(cls, stores_df: pd.DataFrame, prices_df: pd.DataFrame, item_ids: Sequence,
+                    home: Tuple[float, float], quantities: Optional[Sequence[float]] = None,
+                    cost_per_mile: float = DEFAULT_COST_PER_MILE) -> 'BasketOptimizer':
+        """Optimizer over dashboard tables (stores with lat/lon, latest prices), stores in stores_df order"""
+        latest = prices_df.loc[prices_df['item_id'].isin(item_ids)]
+        matrix = latest.pivot_table(index='store_id', columns='item_id', values='price', aggfunc='last')
+        basket = matrix.reindex(index=stores_df['store_id'], columns=list(item_ids)).to_numpy(dtype=np.float64)
+        if quantities is not None:
+            basket = basket * np.asarray(quantities, dtype=np.float64)
+        coords = stores_df[['lat', 'lon']].to_numpy(dtype=np.float64)
+        return cls(basket, distances_from(home, coords[:, 0], coords[:, 1]), coords, cost_per_mile)
+
+    def tour(self, stores: Sequence[int]) -> Tuple[float, List[int]]:
+        """Shortest round trip from home through stores: (miles, visiting order)
+
+        Exact up to EXACT_TOUR_STORES stores; longer routes use nearest neighbour
+        followed by 2-opt.
+        """
+        stores = list(stores)
+        if len(stores) <= 1:
+            return (2 * self.miles[0, stores[0] + 1] if stores else 0.0), stores
+        nodes = np.asarray(stores, dtype=np.intp) + 1
+        if len(stores) <= EXACT_TOUR_STORES:
+            routes = nodes[_all_orders(len(stores))]
+            lengths = self.miles[0, routes[:, 0]] + self.miles[routes[:, :-1], routes[:, 1:]].sum(axis=1) \
+                + self.miles[routes[:, -1], 0]
+            best = int(np.argmin(lengths))
+            return float(lengths[best]), (routes[best] - 1).tolist()
+
+        route, left = [0], set(nodes.tolist())
+        while left:
+            nearest = min(left, key=lambda node: self.miles[route[-1], node])
+            route.append(nearest)
+            left.remove(nearest)
+        route.append(0)
+        improved = True
+        while improved:
+            improved = False
+            for i in range(1, len(route) - 2):
+                for j in range(i + 1, len(route) - 1):
+                    a, b, c, d = route[i - 1], route[i], route[j], route[j + 1]
+                    if self.miles[a, c] + self.miles[b, d] < self.miles[a, b] + self.miles[c, d] - 1e-12:
+                        route[i:j + 1] = route[i:j + 1][::-1]
+                        improved = True
+        miles = float(self.miles[route[:-1], route[1:]].sum())
+        return miles, [node - 1 for node in route[1:-1]]
+
+    def plan(self, stores: Sequence[int], method: str = 'given', evaluated: int = 1) -> BasketPlan:
+        """Cost of buying every item where it's cheapest among stores"""
+        stores = list(stores)
+        miles, order = self.tour(stores)
+        assignment = np.full(len(self.available), -1, dtype=np.int64)
+        if stores:
+            rows = self.prices[stores]
+            cheapest = rows.argmin(axis=0)
+            item_cost = float(rows[cheapest, np.arange(rows.shape[1])].sum())
+            assignment[self.available] = np.asarray(stores)[cheapest]
+        else:
+            item_cost = float('inf') if self.full_mask else 0.0
+        return BasketPlan(order, assignment, item_cost, miles, item_cost + miles * self.cost_per_mile,
+                          method, evaluated)
+
+    def _insertion_miles(self, route: List[int]) -> np.ndarray:
+        """Miles added by inserting each store into route (store indices, home excluded) at its best spot"""
+        nodes = [0] + [s + 1 for s in route] + [0]
+        before, after = np.array(nodes[:-1]), np.array(nodes[1:])
+        added = self.miles[before, 1:] + self.miles[after, 1:] - self.miles[before, after][:, None]
+        return added.min(axis=0)
+
+    def local_search(self, max_stores: int) -> BasketPlan:
+        """Greedy additions, then drop and swap moves until none lowers the total
+
+        Candidate moves are scored all at once: the basket cost with each store
+        added comes from one vectorized minimum, and the route cost from cheapest
+        insertion, which is an achievable route and so never understates a gain.
+        Items a store doesn't sell are priced at a large penalty while searching,
+        so partial coverage still steers towards subsets that sell everything.
+        """
+        max_stores = min(max_stores, len(self.prices))
+        rate, penalized = self.cost_per_mile, self._penalized
+        nothing = np.full(penalized.shape[1], np.inf)
+
+        def score(stores: List[int]) -> Tuple[float, List[int]]:
+            miles, order = self.tour(stores)
+            basket = penalized[stores].min(axis=0).sum() if stores else np.inf
+            return basket + rate * miles, order
+
+        def best_addition(stores: List[int], order: List[int]) -> Tuple[float, int]:
+            base = penalized[stores].min(axis=0) if stores else nothing
+            totals = np.minimum(base, penalized).sum(axis=1) \
+                + rate * (self.tour(order)[0] + self._insertion_miles(order))
+            totals[chosen] = np.inf
+            candidate = int(np.argmin(totals))
+            return float(totals[candidate]), candidate
+
+        chosen, order, current, evaluated = [], [], np.inf, 0
+        improved = True
+        while improved:
+            improved = False
+            # Swaps: every way of removing one store, then adding the best other store (or none)
+            for removed in (chosen if len(chosen) > 1 else []):
+                rest = [s for s in chosen if s != removed]
+                rest_total, rest_order = score(rest)
+                total, candidate = best_addition(rest, rest_order)
+                evaluated += len(self.prices) - len(chosen) + 1
+                if min(rest_total, total) < current - 1e-9:
+                    chosen, order = (rest, rest_order) if rest_total <= total else (rest + [candidate], None)
+                    improved = True
+                    break
+            # Additions (all there is until the first store is chosen)
+            if not improved and len(chosen) < max_stores:
+                total, candidate = best_addition(chosen, order)
+                evaluated += len(self.prices) - len(chosen)
+                if total < current - 1e-9:
+                    chosen, order, improved = chosen + [candidate], None, True
+            if improved:
+                current, order = score(chosen)
+        return self.plan(chosen)._replace(method='local search', evaluated=evaluated)
+
+    def exact(self, max_stores: int, start: Optional[BasketPlan] = None) -> BasketPlan:
+        """Cheapest subset of at most max_stores stores, by branch and bound
+
+        Subsets are grown in a fixed store order, starting from the local-search
+        plan as the bound to beat. A branch is cut when
+          - the stores it could still add can't sell every item (item bitsets), or
+          - its basket, even at the best price of every store it could still add,
+            plus its route so far (adding stores never shortens a route), already
+            costs more than the best plan found.
+        Stores whose round trip alone would lose to the best plan are never tried.
+        """
+        max_stores = min(max_stores, len(self.prices))
+        best = start or self.local_search(max_stores)
+        rate = self.cost_per_mile
+        floor = self.item_floor.sum()
+        candidates = np.flatnonzero(floor + rate * 2 * self.miles[0, 1:] < best.total_cost)
+        candidates = candidates[np.argsort(self.miles[0, candidates + 1], kind='stable')]
+        count = len(candidates)
+        suffix_min = np.full((count + 1, self.prices.shape[1]), np.inf)
+        suffix_mask = [0] * (count + 1)
+        for i in range(count - 1, -1, -1):
+            suffix_min[i] = np.minimum(suffix_min[i + 1], self.prices[candidates[i]])
+            suffix_mask[i] = suffix_mask[i + 1] | self.masks[candidates[i]]
+
+        evaluated = 0
+        best_total, best_stores = best.total_cost, None
+        stack = [(0, [], np.full(self.prices.shape[1], np.inf), 0)]
+        while stack:
+            first, chosen, chosen_min, chosen_mask = stack.pop()
+            for i in range(first, count):
+                if chosen_mask | suffix_mask[i] != self.full_mask:
+                    break  # The stores from i on can't complete the basket
+                store = int(candidates[i])
+                mask = chosen_mask | self.masks[store]
+                if mask | suffix_mask[i + 1] != self.full_mask and mask != self.full_mask:
+                    continue
+                stores = chosen + [store]
+                if floor + rate * 2 * self.miles[0, store + 1] >= best_total:
+                    continue
+                miles = self.tour(stores)[0]
+                new_min = np.minimum(chosen_min, self.prices[store])
+                evaluated += 1
+                if np.minimum(new_min, suffix_min[i + 1]).sum() + rate * miles >= best_total:
+                    continue
+                if mask == self.full_mask:
+                    total = new_min.sum() + rate * miles
+                    if total < best_total - 1e-9:
+                        best_total, best_stores = total, stores
+                if len(stores) < max_stores:
+                    stack.append((i + 1, stores, new_min, mask))
+        plan = self.plan(best_stores) if best_stores is not None else best
+        return plan._replace(method='exact', evaluated=evaluated + best.evaluated)
+
+    def solve(self, max_stores: int = 2, exact_limit: int = EXACT_MAX_STORES) -> BasketPlan:
+        """Exact plan for up to exact_limit stores, local search beyond"""
+        if max_stores < 1:
+            raise ValueError(f"max_stores must be at least 1, got {max_stores}")
+        if max_stores <= exact_limit:
+            return self.exact(max_stores)
+        return self.local_search(max_stores)
+
+    def brute_force(self, max_stores: int) -> BasketPlan:
+        """Every subset of at most max_stores stores, kept only to check exact() and time it against"""
+        best, evaluated = None, 0
+        for size in range(1, min(max_stores, len(self.prices)) + 1):
+            for stores in combinations(range(len(self.prices)), size):
+                stores = list(stores)
+                evaluated += 1
+                item_cost = self.prices[stores].min(axis=0).sum()
+                if not np.isfinite(item_cost):
+                    continue
+                total = item_cost + self.cost_per_mile * self.tour(stores)[0]
+                if best is None or total < best[0] - 1e-9:
+                    best = (total, stores)
+        plan = self.plan(best[1]) if best else self.plan([])
+        return plan._replace(method='brute force', evaluated=evaluated)
+
+
+def _synthetic_problem(stores: int, items: int, seed: int = 0, radius_miles: float = 25.0,
+                       in_stock: float = 0.98) -> BasketOptimizer:
+    """Stores scattered around home with chain-like price levels and some items out of stock"""
+    rng = np.random.default_rng(seed)
+    home = (30.5594, -91.5557)
+    radius = radius_miles * np.sqrt(rng.random(stores))
+    angle = rng.uniform(0, 2 * np.pi, stores)
+    coords = np.column_stack([home[0] + radius * np.cos(angle) / 69.05,
+                              home[1] + radius * np.sin(angle) / (69.05 * np.cos(np.radians(home[0])))])
+    base = rng.uniform(1, 15, items)
+    prices = np.round(base * rng.uniform(0.85, 1.25, (stores, 1)) * rng.uniform(0.9, 1.1, (stores, items)), 2)
+    prices[rng.random((stores, items)) > in_stock] = np.nan
+    return BasketOptimizer(prices, distances_from(home, coords[:, 0], coords[:, 1]), coords)
+
+
+def benchmark_baskets(stores: int = 100, items: int = 200, brute_force_stores: int = 3):
+    """Exact branch and bound vs enumerating every subset, and local search vs exact, on one basket"""
+    optimizer = _synthetic_problem(stores, items)
+    print(f"{stores} stores x {items} items (2% out of stock), ${optimizer.cost_per_mile:.2f}/mile")
+    for k in range(1, brute_force_stores + 1):
+        start = time.perf_counter()
+        reference = optimizer.brute_force(k)
+        brute = time.perf_counter() - start
+        start = time.perf_counter()
+        exact = optimizer.exact(k)
+        bnb = time.perf_counter() - start
+        assert np.isclose(exact.total_cost, reference.total_cost, rtol=0, atol=1e-6), (k, exact, reference)
+        start = time.perf_counter()
+        search = optimizer.local_search(k)
+        local = time.perf_counter() - start
+        print(f"k={k}: ${exact.total_cost:.2f} ({len(exact.stores)} stores, {exact.travel_miles:.1f} mi); "
+              f"every subset {brute:.2f}s ({reference.evaluated:,} subsets), "
+              f"branch and bound {bnb * 1000:.0f} ms ({exact.evaluated:,}), "
+              f"local search {local * 1000:.0f} ms ${search.total_cost:.2f} "
+              f"(+{(search.total_cost / exact.total_cost - 1) * 100:.2f}%)")
+    for k in (5, 8):
+        start = time.perf_counter()
+        search = optimizer.local_search(k)
+        print(f"k={k}: local search {(time.perf_counter() - start) * 1000:.0f} ms, ${search.total_cost:.2f} "
+              f"({len(search.stores)} stores, {search.travel_miles:.1f} mi, {search.evaluated:,} moves scored)")
+
+
+if __name__ == "__main__":
+    benchmark_baskets()
@@ -0,0 +1,241 @@
+import time
+import warnings
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+from price_recommendations import calculate_price_recommendations
+from price_snapshot import build_snapshot
+
+# Offset between stores that share a location, so their markers don't overlap
+JITTER = 0.0005
+
+# Livonia, LA: map centre without store coordinates, and the basket page's default home
+DEFAULT_HOME = (30.5594, -91.5557)
+
+SOPRANOS_ICON = {
+    "url": "https://cdn-icons-png.flaticon.com/512/25/25694.png",  # white house PNG
+    "width": 512,
+    "height": 512,
+    "anchorY": 512
+}
+
+# Recommendation columns and their display names, in display order
+RECOMMENDATION_COLUMNS = {
+    'item_name': 'Item', 'my_price': 'Your Price', 'avg_price': 'Market Average',
+    'min_price': 'Market Min', 'max_price': 'Market Max', 'recommended_price': 'Recommended Price',
+    'price_difference_percent': 'Price Difference (%)', 'current_margin': 'Current Margin',
+    'target_margin': 'Target Margin', 'margin_gap': 'Margin Gap'
+}
+PRICE_COLUMNS = ['Your Price', 'Market Average', 'Market Min', 'Market Max', 'Recommended Price']
+MARGIN_COLUMNS = ['Current Margin', 'Target Margin', 'Margin Gap']
+
+
+class ItemMap(NamedTuple):
+    """Everything the store table and map show for one item"""
+    table: pd.DataFrame    # Store Name / Address / Price / 7-Day Avg / 30-Day Avg
+    points: pd.DataFrame   # One row per store with jittered position, price_str and label
+    icons: pd.DataFrame    # Soprano's rows (IconLayer)
+    others: pd.DataFrame   # Everyone else (ScatterplotLayer)
+    center: Tuple[float, float]
+
+
+class DashboardFrames(NamedTuple):
+    """Frames derived from one version of the tables; treat as read-only"""
+    version: str
+    recommendations: pd.DataFrame
+    recommendations_display: pd.DataFrame
+    latest_date: str
+    item_names: List[str]
+    item_ids: Dict[str, int]
+    item_maps: Dict[int, ItemMap]
+
+
+def format_recommendations(recommendations: pd.DataFrame) -> pd.DataFrame:
+    """Recommendations table with display names, prices as $X.XX and margins as percentages"""
+    display = recommendations[list(RECOMMENDATION_COLUMNS)].rename(columns=RECOMMENDATION_COLUMNS)
+    for col in PRICE_COLUMNS:
+        display[col] = display[col].map('${:.2f}'.format)
+    for col in MARGIN_COLUMNS:
+        display[col] = (display[col] * 100).map('{:.1f}%'.format)
+    return display
+
+
+def _money(values: pd.Series) -> pd.Series:
+    return values.map('${:.2f}'.format).where(values.notna(), 'N/A')
+
+
+def _store_points(stores_df: pd.DataFrame, item_prices: pd.DataFrame) -> pd.DataFrame:
+    """Stores joined with one item's latest prices, labelled and jittered"""
+    columns = [c for c in ('store_id', 'price', 'mean_7d', 'mean_30d') if c in item_prices.columns]
+    points = stores_df.merge(item_prices[columns], on='store_id', how='left')
+    points = points.rename(columns={'lat': 'latitude', 'lon': 'longitude'})
+    points['price_str'] = _money(points['price'])
+    points['label'] = points['store_name'] + '\n' + points['price_str']
+    points['is_sopranos'] = points['store_name'].str.lower().str.contains('soprano')
+    offset = points.groupby(['latitude', 'longitude']).cumcount() * JITTER
+    points['latitude_jitter'] = points['latitude'] + offset
+    points['longitude_jitter'] = points['longitude'] + offset
+    points['icon_data'] = [SOPRANOS_ICON if mine else None for mine in points['is_sopranos'].tolist()]
+    return points
+
+
+def build_item_maps(stores_df: pd.DataFrame, items_df: pd.DataFrame, latest_df: pd.DataFrame,
+                    latest_date) -> Dict[int, ItemMap]:
+    """Map frames for every item at the latest date, so a selectbox change is a dict lookup"""
+    latest = latest_df.loc[latest_df['date'] == latest_date]
+    by_item = dict(iter(latest.groupby('item_id', sort=False)))
+    no_prices = latest.iloc[:0]
+    item_maps = {}
+    for item_id in items_df['item_id'].drop_duplicates().tolist():
+        points = _store_points(stores_df, by_item.get(item_id, no_prices))
+        table = points[['store_name', 'address', 'price_str']].copy()
+        table.columns = ['Store Name', 'Address', 'Price']
+        if 'mean_7d' in points.columns:
+            table['7-Day Avg'] = _money(points['mean_7d'])
+            table['30-Day Avg'] = _money(points['mean_30d'])
+        center = (points['latitude'].mean() if not points.empty else DEFAULT_HOME[0],
+                  points['longitude'].mean() if not points.empty else DEFAULT_HOME[1])
+        item_maps[item_id] = ItemMap(table, points, points[points['is_sopranos']],
+                                     points[~points['is_sopranos']], center)
+    return item_maps
+
+
+def build_frames(stores_df: pd.DataFrame, items_df: pd.DataFrame, latest_df: pd.DataFrame,
+                 version: str) -> DashboardFrames:
+    """All derived frames the dashboard renders, computed once per data version
+
+    latest_df is the latest-price snapshot (price_store.read_latest); a full
+    price history works too, only slower.
+    """
+    recommendations = calculate_price_recommendations(latest_df, stores_df, items_df)
+    latest_date = latest_df['date'].max()
+    first_listing = items_df.drop_duplicates('name')
+    return DashboardFrames(
+        version=version,
+        recommendations=recommendations,
+        recommendations_display=format_recommendations(recommendations),
+        latest_date=latest_date,
+        item_names=items_df['name'].tolist(),
+        item_ids=dict(zip(first_listing['name'].tolist(), first_listing['item_id'].tolist())),
+        item_maps=build_item_maps(stores_df, items_df, latest_df, latest_date)
+    )
+
+
+def build_trend_frames(report, stores_df: pd.DataFrame, items_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Per-item volatility table and named outlier table from a price_trends.TrendReport"""
+    item_names = items_df.drop_duplicates('item_id').set_index('item_id')['name']
+    store_names = stores_df.drop_duplicates('store_id').set_index('store_id')['store_name']
+    with np.errstate(invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # items with no full window yet
+        items = pd.DataFrame({
+            'Item': item_names.reindex(report.item_ids).to_numpy(),
+            'Rolling Avg': np.nanmean(report.rolling_mean, axis=0),
+            'Volatility': np.nanmean(report.volatility, axis=0),
+            'Price Changes': report.change_counts.sum(axis=0),
+            'Outliers': report.anomaly_counts.sum(axis=0),
+        }).sort_values('Volatility', ascending=False, ignore_index=True)
+    items['Rolling Avg'] = _money(items['Rolling Avg'])
+    items['Volatility'] = (items['Volatility'] * 100).map('{:.1f}%'.format).where(items['Volatility'].notna(), 'N/A')
+    anomalies = report.top_anomalies.assign(
+        store_id=report.top_anomalies['store_id'].map(store_names),
+        item_id=report.top_anomalies['item_id'].map(item_names),
+    ).rename(columns={'date': 'Date', 'store_id': 'Store', 'item_id': 'Item', 'price': 'Price',
+                      'expected': 'Expected', 'score': 'Score'})
+    return items, anomalies
+
+
+def build_basket_frames(plan, optimizer, stores_df: pd.DataFrame,
+                        item_names: List[str]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Stops (in driving order) and per-item purchases for a basket_optimizer.BasketPlan
+
+    stores_df rows are in the optimizer's store order, item_names in basket order.
+    """
+    assignment = plan.assignment
+    bought = np.flatnonzero(assignment >= 0)
+    costs = np.full(len(assignment), np.nan)
+    costs[bought] = optimizer.prices[assignment[bought], np.cumsum(optimizer.available)[bought] - 1]
+    home = optimizer.miles[0, 1:]
+    stops = pd.DataFrame({
+        'Stop': np.arange(1, len(plan.stores) + 1),
+        'Store': stores_df['store_name'].to_numpy()[plan.stores],
+        'Address': stores_df['address'].to_numpy()[plan.stores],
+        'Miles from Home': np.round(home[plan.stores], 1),
+        'Items': [int((assignment == store).sum()) for store in plan.stores],
+        'Subtotal': _money(pd.Series([costs[assignment == store].sum() for store in plan.stores], dtype=float)),
+    })
+    where = np.where(assignment >= 0, assignment, 0)
+    items = pd.DataFrame({
+        'Item': item_names,
+        'Store': np.where(assignment >= 0, stores_df['store_name'].to_numpy()[where], 'Not sold nearby'),
+        'Price': _money(pd.Series(costs)),
+    })
+    return stops, items
+
+
+def _rerun_before(stores_df, items_df, prices_df, selected_item):
+    """What the app recomputed on every rerun before these frames were cached (the parity reference)"""
+    price_recommendations = calculate_price_recommendations(prices_df, stores_df, items_df)
+    display = price_recommendations[list(RECOMMENDATION_COLUMNS)].copy()
+    display.columns = list(RECOMMENDATION_COLUMNS.values())
+    for col in PRICE_COLUMNS:
+        display[col] = display[col].apply(lambda x: f"${x:.2f}")
+    for col in MARGIN_COLUMNS:
+        display[col] = display[col].apply(lambda x: f"{x*100:.1f}%")
+    selected_item_id = items_df[items_df['name'] == selected_item]['item_id'].iloc[0]
+    latest_date = prices_df['date'].max()
+    item_map_prices = prices_df[(prices_df['item_id'] == selected_item_id) & (prices_df['date'] == latest_date)]
+    map_df = stores_df.merge(item_map_prices[['store_id', 'price']], on='store_id', how='left')
+    map_df = map_df.rename(columns={'lat': 'latitude', 'lon': 'longitude'})
+    map_df['price_str'] = map_df['price'].apply(lambda x: f"${x:.2f}" if pd.notnull(x) else "N/A")
+    map_df['label'] = map_df.apply(lambda row: f"{row['store_name']}\n{row['price_str']}", axis=1)
+    map_df['is_sopranos'] = map_df['store_name'].str.lower().str.contains('soprano')
+    map_df['latitude_jitter'] = map_df['latitude'] + map_df.groupby(['latitude', 'longitude']).cumcount() * JITTER
+    map_df['longitude_jitter'] = map_df['longitude'] + map_df.groupby(['latitude', 'longitude']).cumcount() * JITTER
+    map_df['icon_data'] = map_df['is_sopranos'].apply(lambda x: SOPRANOS_ICON if x else None)
+    return display, map_df
+
+
+def benchmark_rerun(stores: int = 300, items: int = 200, days: int = 30, changes: int = 20):
+    """Per-selectbox-change cost: recompute everything (before) vs cached frames (after)"""
+    from price_simulator import simulate_price_cube, cube_to_frame, cube_dates
+
+    rng = np.random.default_rng(0)
+    store_ids = np.arange(1, stores + 1, dtype=np.int32)
+    item_ids = np.arange(1, items + 1, dtype=np.int32)
+    # A few stores share a plaza, so the jitter has something to do
+    stores_df = pd.DataFrame({
+        'store_id': store_ids,
+        'store_name': ["Soprano's Supermarket" if i == 1 else f"Store {i}" for i in store_ids],
+        'address': [f"{i} Main Street" for i in store_ids],
+        'lat': np.round(30.5 + rng.integers(0, stores // 2, stores) * 0.01, 4),
+        'lon': np.round(-91.5 + rng.integers(0, stores // 2, stores) * 0.01, 4),
+    })
+    items_df = pd.DataFrame({'item_id': item_ids, 'name': [f"item {i}" for i in item_ids]})
+    cube = simulate_price_cube(rng.uniform(1, 25, items), rng.uniform(0.8, 1.3, stores), days)
+    prices_df = cube_to_frame(cube, cube_dates(days), store_ids, item_ids)
+    selections = [f"item {i}" for i in rng.integers(1, items + 1, changes)]
+
+    start = time.perf_counter()
+    for selected in selections:
+        _rerun_before(stores_df, items_df, prices_df, selected)
+    before = (time.perf_counter() - start) / changes
+
+    latest_df = build_snapshot(prices_df)
+    start = time.perf_counter()
+    frames = build_frames(stores_df, items_df, latest_df, 'bench')
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    for selected in selections:
+        frames.item_maps[frames.item_ids[selected]]
+    after = (time.perf_counter() - start) / changes
+
+    # Parity with the per-rerun frames is checked in tests/test_dashboard_frames.py
+    print(f"{stores} stores x {items} items x {days} days ({len(prices_df):,} rows)")
+    print(f"selectbox change: recompute {before * 1000:.1f} ms, cached frames {after * 1e6:.1f} us "
+          f"(one-off build per data version from the snapshot {build:.2f}s)")
+
+
+if __name__ == "__main__":
+    benchmark_rerun()
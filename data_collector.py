@@ -1,12 +1,86 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
 import os
-from geopy.distance import geodesic
-from geopy.geocoders import Nominatim
-import requests
+from geo_distance import distances_from
+from response_cache import fetch_overpass
+from price_store import (has_parquet, stored_dates, read_stores, write_stores, write_items, write_prices,
+                         ingest_prices)
+from price_simulator import simulate_price_days, cube_to_frame, cube_dates, DEFAULT_SEED
 
-def get_nearby_stores(center_lat, center_lon, radius_miles=50):
+# Store price multipliers (to create price variations between stores)
+STORE_MULTIPLIERS = {
+    'Sopranos Supermarket': 1.0,    # Base price (your store)
+    'Walmart Supercenter': 0.9,     # 10% cheaper
+    'Target': 1.0,                  # Average price
+    'Rouses Market': 1.05,          # 5% more expensive
+    'Winn-Dixie': 1.0,             # Average price
+    'Dollar General': 0.85,         # 15% cheaper
+    'Family Dollar': 0.85,          # 15% cheaper
+    'ALDI': 0.8,                    # 20% cheaper
+    'Publix': 1.05,                 # 5% more expensive
+    'Safeway': 1.0,                 # Average price
+    'Walmart Neighborhood Market': 0.9,  # 10% cheaper
+    'Circle K': 1.2,                # 20% more expensive
+    'CVS Pharmacy': 1.3,            # 30% more expensive
+    'Walgreens': 1.3,               # 30% more expensive
+    'Save-A-Lot': 0.85              # 15% cheaper
+}
+
+BASE_PRICES = {
+    'Milk (1 gallon)': 3.99,
+    'Eggs (dozen)': 4.99,
+    'Butter (1lb)': 4.49,
+    'Cheese (8oz)': 3.99,
+    'Chicken Breast (1lb)': 5.99,
+    'Ground Beef (1lb)': 6.99,
+    'Pork Chops (1lb)': 5.49,
+    'Bacon (12oz)': 6.99,
+    'Bananas (1lb)': 0.69,
+    'Apples (1lb)': 1.99,
+    'Tomatoes (1lb)': 2.49,
+    'Lettuce (head)': 1.99,
+    'Rice (5lb bag)': 8.99,
+    'Pasta (1lb)': 1.49,
+    'Cereal (box)': 4.49,
+    'Flour (5lb bag)': 4.99,
+    'Coffee (12oz)': 7.99,
+    'Orange Juice (1/2 gal)': 3.99,
+    'Soda (12-pack)': 5.99,
+    'Bread (loaf)': 2.99,
+    'Cake (whole)': 24.99,
+    'Cookies (dozen)': 4.99,
+    'Rotisserie Chicken': 7.99,
+    'Deli Sandwich': 5.99,
+    'Ready Meal': 8.99,
+    'Toilet Paper (12pk)': 12.99,
+    'Paper Towels (8pk)': 8.99,
+    'Laundry Detergent': 9.99,
+    'Dish Soap': 2.99,
+    'Shampoo': 5.99,
+    'Toothpaste': 3.99,
+    'Multivitamin': 12.99,
+    'Pain Reliever': 8.99,
+    'Organic Apples (1lb)': 3.99,
+    'Gluten-Free Bread': 5.99
+}
+
+def known_store_ids(data_dir='data'):
+    """OSM node id -> store_id from the stores saved by an earlier run (empty before the first)"""
+    if os.path.exists(os.path.join(data_dir, 'stores.parquet')):
+        stores_df = read_stores(data_dir)
+    elif os.path.exists(os.path.join(data_dir, 'stores.csv')):
+        stores_df = pd.read_csv(os.path.join(data_dir, 'stores.csv'))
+    else:
+        return {}
+    if 'osm_id' not in stores_df.columns:
+        return {}
+    return dict(zip(stores_df['osm_id'].astype('int64'), stores_df['store_id'].astype(int)))
+
+def get_nearby_stores(center_lat, center_lon, radius_miles=50, known_ids=None):
+    # store_id is keyed by the OSM node id, so a store keeps its id (and its price
+    # history) when Overpass returns elements in a different order or adds new ones
+    known_ids = dict(known_ids or {})
+    next_id = max(known_ids.values(), default=0) + 1
     radius_meters = int(radius_miles * 1609.34)
     query = f"""
     [out:json][timeout:25];
@@ -17,44 +91,49 @@ def get_nearby_stores(center_lat, center_lon, radius_miles=50):
       node["shop"="discount"](around:{radius_meters},{center_lat},{center_lon});
     );
     out body;
-    >;
-    out skel qt;
     """
-    url = "https://overpass-api.de/api/interpreter"
-    response = requests.get(url, params={'data': query})
-    data = response.json()
+    data = fetch_overpass(query, (center_lat, center_lon))
     stores = []
-    store_id = 1
+    seen = set()
     for element in data['elements']:
+        if element['id'] in seen:
+            continue
+        seen.add(element['id'])
+        if element['id'] not in known_ids:
+            known_ids[element['id']] = next_id
+            next_id += 1
+        store_id = known_ids[element['id']]
         tags = element.get('tags', {})
         name = tags.get('name', f"Store {store_id}")
         category = tags.get('shop', 'unknown')
         address = tags.get('addr:city', '')
         stores.append({
             'store_id': store_id,
+            'osm_id': element['id'],
             'store_name': name,
             'category': category,
             'lat': element['lat'],
             'lon': element['lon'],
             'address': address
         })
-        store_id += 1
     return stores
 
-def generate_sample_data():
+def generate_sample_data(days=30, seed=DEFAULT_SEED):
     # Livonia, LA coordinates
     LIVONIA_LAT = 30.5594
     LIVONIA_LON = -91.5557
     
     # Get nearby stores
-    stores = get_nearby_stores(LIVONIA_LAT, LIVONIA_LON)
+    stores = get_nearby_stores(LIVONIA_LAT, LIVONIA_LON, known_ids=known_store_ids('data'))
     
-    # Add distance from center to each store
-    for store in stores:
-        store['distance'] = round(geodesic(
-            (LIVONIA_LAT, LIVONIA_LON),
-            (store['lat'], store['lon'])
-        ).miles, 2)
+    # Add distance from center to each store (one vectorized call)
+    distances = np.round(distances_from(
+        (LIVONIA_LAT, LIVONIA_LON),
+        [store['lat'] for store in stores],
+        [store['lon'] for store in stores]
+    ), 2)
+    for store, distance in zip(stores, distances):
+        store['distance'] = float(distance)
     
     # Create sample items with categories and margin targets
     items = [
@@ -118,107 +197,40 @@ def generate_sample_data():
         {'item_id': 35, 'name': 'Gluten-Free Bread', 'category': 'Specialty Items', 'target_margin': 0.45}
     ]
     
-    # Store price multipliers (to create price variations between stores)
-    store_multipliers = {
-        'Sopranos Supermarket': 1.0,    # Base price (your store)
-        'Walmart Supercenter': 0.9,     # 10% cheaper
-        'Target': 1.0,                  # Average price
-        'Rouses Market': 1.05,          # 5% more expensive
-        'Winn-Dixie': 1.0,             # Average price
-        'Dollar General': 0.85,         # 15% cheaper
-        'Family Dollar': 0.85,          # 15% cheaper
-        'ALDI': 0.8,                    # 20% cheaper
-        'Publix': 1.05,                 # 5% more expensive
-        'Safeway': 1.0,                 # Average price
-        'Walmart Neighborhood Market': 0.9,  # 10% cheaper
-        'Circle K': 1.2,                # 20% more expensive
-        'CVS Pharmacy': 1.3,            # 30% more expensive
-        'Walgreens': 1.3,               # 30% more expensive
-        'Save-A-Lot': 0.85              # 15% cheaper
-    }
-    
-    # Generate prices for the last 30 days
-    prices = []
-    base_prices = {
-        'Milk (1 gallon)': 3.99,
-        'Eggs (dozen)': 4.99,
-        'Butter (1lb)': 4.49,
-        'Cheese (8oz)': 3.99,
-        'Chicken Breast (1lb)': 5.99,
-        'Ground Beef (1lb)': 6.99,
-        'Pork Chops (1lb)': 5.49,
-        'Bacon (12oz)': 6.99,
-        'Bananas (1lb)': 0.69,
-        'Apples (1lb)': 1.99,
-        'Tomatoes (1lb)': 2.49,
-        'Lettuce (head)': 1.99,
-        'Rice (5lb bag)': 8.99,
-        'Pasta (1lb)': 1.49,
-        'Cereal (box)': 4.49,
-        'Flour (5lb bag)': 4.99,
-        'Coffee (12oz)': 7.99,
-        'Orange Juice (1/2 gal)': 3.99,
-        'Soda (12-pack)': 5.99,
-        'Bread (loaf)': 2.99,
-        'Cake (whole)': 24.99,
-        'Cookies (dozen)': 4.99,
-        'Rotisserie Chicken': 7.99,
-        'Deli Sandwich': 5.99,
-        'Ready Meal': 8.99,
-        'Toilet Paper (12pk)': 12.99,
-        'Paper Towels (8pk)': 8.99,
-        'Laundry Detergent': 9.99,
-        'Dish Soap': 2.99,
-        'Shampoo': 5.99,
-        'Toothpaste': 3.99,
-        'Multivitamin': 12.99,
-        'Pain Reliever': 8.99,
-        'Organic Apples (1lb)': 3.99,
-        'Gluten-Free Bread': 5.99
-    }
-    
-    # Generate prices for the last 30 days
-    for day in range(30):
-        current_date = datetime.now() - timedelta(days=day)
-        date_str = current_date.strftime('%Y-%m-%d')
-        
-        for store in stores:
-            for item in items:
-                # Get base price and apply store multiplier
-                base_price = base_prices[item['name']]
-                store_multiplier = store_multipliers.get(store['store_name'], 1.0)
-                
-                # Add some random variation (±5%)
-                variation = np.random.uniform(0.95, 1.05)
-                
-                # Calculate final price
-                price = round(base_price * store_multiplier * variation, 2)
-                
-                prices.append({
-                    'date': date_str,
-                    'store_id': store['store_id'],
-                    'item_id': item['item_id'],
-                    'price': price
-                })
+    # Only simulate the days that aren't stored yet; each day is seeded by its date,
+    # so the result matches a full regeneration
+    existing = set(stored_dates('data')) if has_parquet('data') else set()
+    dates = [d for d in cube_dates(days) if d not in existing]
+    multipliers = [STORE_MULTIPLIERS.get(store['store_name'], 1.0) for store in stores]
+    cube = simulate_price_days([BASE_PRICES[item['name']] for item in items], multipliers, dates, seed)
+    store_ids = [store['store_id'] for store in stores]
+    item_ids = [item['item_id'] for item in items]
+    prices_df = cube_to_frame(cube, dates, store_ids, item_ids)
     
     # Create DataFrames
     stores_df = pd.DataFrame(stores)
     items_df = pd.DataFrame(items)
-    prices_df = pd.DataFrame(prices)
     
     # Create data directory if it doesn't exist
     if not os.path.exists('data'):
         os.makedirs('data')
     
-    # Save to CSV files
+    # Save stores and items (small, rewritten every run)
     stores_df.to_csv('data/stores.csv', index=False)
     items_df.to_csv('data/items.csv', index=False)
-    prices_df.to_csv('data/prices.csv', index=False)
+    write_stores(stores_df, 'data')
+    write_items(items_df, 'data')
+    
+    # Append only the new days of prices; the first run writes the full history
+    if existing:
+        ingest_prices(prices_df, 'data')
+    else:
+        write_prices(prices_df, 'data')
     
-    print("Sample data generated and saved to CSV files:")
+    print("Sample data generated and saved to data/:")
     print(f"- {len(stores_df)} stores within 50 miles of Livonia, LA")
     print(f"- {len(items_df)} items")
-    print(f"- {len(prices_df)} price records")
+    print(f"- {len(prices_df)} new price records ({len(dates)} new days)")
 
 if __name__ == "__main__":
     generate_sample_data() 
\ No newline at end of file
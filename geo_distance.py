@@ -0,0 +1,88 @@
+import time
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+# Mean Earth radius in miles (IUGG)
+EARTH_RADIUS_MILES = 3958.7613
+
+
+def haversine_miles(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in miles between broadcastable arrays of coordinates
+
+    A sphere of the mean Earth radius: within 0.6% of the ellipsoidal (geodesic)
+    distance anywhere, and within 0.35% at Louisiana's latitudes.
+    """
+    lat1 = np.radians(np.asarray(lat1, dtype=np.float64))
+    lon1 = np.radians(np.asarray(lon1, dtype=np.float64))
+    lat2 = np.radians(np.asarray(lat2, dtype=np.float64))
+    lon2 = np.radians(np.asarray(lon2, dtype=np.float64))
+
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def geodesic_miles(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Exact ellipsoidal distance in miles using geopy (slow, one call per pair)"""
+    from geopy.distance import geodesic
+
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(
+        np.asarray(lat1, dtype=np.float64), np.asarray(lon1, dtype=np.float64),
+        np.asarray(lat2, dtype=np.float64), np.asarray(lon2, dtype=np.float64)
+    )
+    out = np.empty(lat1.shape, dtype=np.float64)
+    for idx in np.ndindex(out.shape):
+        out[idx] = geodesic((lat1[idx], lon1[idx]), (lat2[idx], lon2[idx])).miles
+    return out
+
+
+def distances_from(center: Tuple[float, float], lats: Sequence[float], lons: Sequence[float],
+                   method: str = 'haversine') -> np.ndarray:
+    """Distances in miles from a centre point to every (lat, lon) pair"""
+    if method == 'haversine':
+        return haversine_miles(center[0], center[1], lats, lons)
+    if method == 'geodesic':
+        return geodesic_miles(center[0], center[1], lats, lons)
+    raise ValueError(f"Unknown distance method: {method}")
+
+
+def accuracy_report(center: Tuple[float, float], lats: Sequence[float],
+                    lons: Sequence[float]) -> Dict[str, float]:
+    """Compare haversine against geopy's geodesic for the given points"""
+    fast = distances_from(center, lats, lons, 'haversine')
+    exact = distances_from(center, lats, lons, 'geodesic')
+    abs_err = np.abs(fast - exact)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rel_err = np.where(exact > 0, abs_err / exact, 0.0)
+    return {
+        'points': int(exact.size),
+        'max_abs_error_miles': float(abs_err.max()) if abs_err.size else 0.0,
+        'mean_abs_error_miles': float(abs_err.mean()) if abs_err.size else 0.0,
+        'max_rel_error': float(rel_err.max()) if rel_err.size else 0.0
+    }
+
+
+def benchmark_distances(count: int = 5000):
+    """Time haversine vs geodesic over random points around Baton Rouge"""
+    center = (30.4515, -91.1871)
+    rng = np.random.default_rng(0)
+    lats = center[0] + rng.uniform(-1.0, 1.0, count)
+    lons = center[1] + rng.uniform(-1.0, 1.0, count)
+
+    start = time.perf_counter()
+    distances_from(center, lats, lons, 'haversine')
+    fast = time.perf_counter() - start
+
+    start = time.perf_counter()
+    distances_from(center, lats, lons, 'geodesic')
+    exact = time.perf_counter() - start
+
+    print(f"{count} points: haversine {fast * 1e3:.2f} ms, geodesic {exact * 1e3:.2f} ms "
+          f"({exact / fast:.0f}x)")
+    print(accuracy_report(center, lats, lons))
+
+
+if __name__ == "__main__":
+    benchmark_distances()
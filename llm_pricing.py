@@ -0,0 +1,312 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import openai
+
+from price_parser import parse_price
+from response_cache import ResponseCache, get_default_cache, make_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = 'gpt-3.5-turbo'
+# LLM answers for a given day don't change; keep them for a year
+ESTIMATE_TTL = 365 * 24 * 3600
+
+# Errors worth retrying; anything else (bad request, auth) fails the pair immediately
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+def default_prompt(store_name: str, item_name: str) -> str:
+    return f"""What is the exact current price of {item_name} at {store_name} in Louisiana?
+    Please respond with ONLY a single number representing the price in dollars.
+    For example, if the price is $3.99, just respond with: 3.99
+    Do not include any other text or explanation."""
+
+
+def default_basket_prompt(store_name: str, item_names: List[str]) -> str:
+    listing = '\n'.join(f"- {name}" for name in item_names)
+    return f"""Estimate the current price in dollars of each of these items at {store_name} in Louisiana:
+{listing}
+Respond with ONLY a JSON list with one entry per item, for example:
+[{{"item": "<item name exactly as given>", "price": 3.99}}]
+Do not include any other text or explanation."""
+
+
+def basket_max_tokens(item_names: List[str]) -> int:
+    """Completion cap for a basket answer, so a full JSON list is never cut short
+
+    Every entry repeats its item name: counted at one token per 3 characters
+    (English averages about 4), plus 14 for the keys, quotes, punctuation and price.
+    """
+    return sum(-(-len(name) // 3) + 14 for name in item_names) + 16
+
+
+def parse_basket(text: str, item_names: List[str],
+                 parse_fn: Callable[[str], Optional[float]] = parse_price) -> Dict[str, float]:
+    """Validated {item name: price} from a JSON-list basket answer
+
+    Entries for items that weren't asked for, duplicates, and prices that aren't
+    positive numbers under $1,000 are dropped, so the caller re-queries them.
+    """
+    start, end = text.find('['), text.rfind(']')
+    if start < 0 or end <= start:
+        return {}
+    try:
+        entries = json.loads(text[start:end + 1])
+    except ValueError:
+        return {}
+    if not isinstance(entries, list):
+        return {}
+
+    wanted = {name.strip().lower(): name for name in item_names}
+    prices = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        name = wanted.get(str(entry.get('item', '')).strip().lower())
+        raw = entry.get('price')
+        price = float(raw) if isinstance(raw, (int, float)) and not isinstance(raw, bool) else (
+            parse_fn(raw) if isinstance(raw, str) else None)
+        if name is None or name in prices or price is None or not 0 < price < 1000:
+            continue
+        prices[name] = round(price, 2)
+    return prices
+
+
+class TokenBucket:
+    """Async token bucket: refills at rate tokens/second up to capacity"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+class EstimationPipeline:
+    """Concurrent, rate-limited, cached chat-completion price estimates
+
+    Answers are cached on (model, store, item, date), so re-running a day is free.
+    """
+
+    def __init__(self, model: str = DEFAULT_MODEL, concurrency: int = 8, requests_per_minute: float = 500,
+                 max_retries: int = 5, backoff: float = 1.0, temperature: float = 0.3,
+                 max_tokens: Optional[int] = None,
+                 prompt_fn: Callable[[str, str], str] = default_prompt,
+                 parse_fn: Callable[[str], Optional[float]] = parse_price,
+                 basket_prompt_fn: Callable[[str, List[str]], str] = default_basket_prompt,
+                 cache: Optional[ResponseCache] = None, client: Optional[Any] = None):
+        self.model = model
+        self.concurrency = concurrency
+        self.requests_per_minute = requests_per_minute
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.prompt_fn = prompt_fn
+        self.parse_fn = parse_fn
+        self.basket_prompt_fn = basket_prompt_fn
+        self.cache = cache or get_default_cache()
+        # Retries are handled here, with jitter, rather than by the client
+        self.client = client or openai.AsyncOpenAI(max_retries=0)
+        self.stats = {'cached': 0, 'requested': 0, 'retries': 0, 'failed': 0}
+        # Measured cost of uncached calls per mode, for savings_report()
+        self.usage = {mode: {'calls': 0, 'rows': 0, 'tokens': 0, 'seconds': 0.0}
+                      for mode in ('single', 'batch')}
+
+    def cache_key(self, store_name: str, item_name: str, day: str) -> str:
+        return make_key('llm_price', f"{self.model}|{store_name}|{item_name}|{day}")
+
+    def basket_cache_key(self, store_name: str, item_names: List[str], day: str) -> str:
+        return make_key('llm_basket', f"{self.model}|{store_name}|{'|'.join(sorted(item_names))}|{day}")
+
+    async def _complete(self, prompt: str, bucket: TokenBucket, mode: str = 'single',
+                        max_tokens: Optional[int] = None) -> str:
+        """One chat completion with retry, exponential backoff and full jitter"""
+        kwargs = {'model': self.model, 'messages': [{'role': 'user', 'content': prompt}],
+                  'temperature': self.temperature}
+        if max_tokens:
+            kwargs['max_tokens'] = max_tokens
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            try:
+                start = time.perf_counter()
+                response = await self.client.chat.completions.create(**kwargs)
+                usage = self.usage[mode]
+                usage['calls'] += 1
+                usage['seconds'] += time.perf_counter() - start
+                usage['tokens'] += response.usage.total_tokens if response.usage else 0
+                return response.choices[0].message.content.strip()
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                self.stats['retries'] += 1
+                delay = random.uniform(0, self.backoff * (2 ** attempt))
+                logger.warning(f"Retrying after {type(e).__name__} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _estimate(self, store_name: str, item_name: str, day: str,
+                        semaphore: asyncio.Semaphore, bucket: TokenBucket) -> Dict[str, Any]:
+        key = self.cache_key(store_name, item_name, day)
+        text = self.cache.get(key)
+        fresh = text is None
+        if not fresh:
+            self.stats['cached'] += 1
+        else:
+            async with semaphore:
+                try:
+                    text = await self._complete(self.prompt_fn(store_name, item_name), bucket,
+                                                'single', self.max_tokens)
+                except Exception as e:
+                    self.stats['failed'] += 1
+                    logger.error(f"Error estimating price for {store_name} - {item_name}: {e}")
+                    return {'store': store_name, 'item': item_name, 'price': None, 'text': None}
+            self.stats['requested'] += 1
+            self.usage['single']['rows'] += 1
+        price = self.parse_fn(text)
+        # An answer without a price is asked again next time rather than kept for a year
+        if fresh and price is not None:
+            self.cache.set(key, text, ESTIMATE_TTL)
+        return {'store': store_name, 'item': item_name, 'price': price, 'text': text}
+
+    async def _estimate_basket(self, store_name: str, item_names: List[str], day: str,
+                               semaphore: asyncio.Semaphore, bucket: TokenBucket) -> List[Dict[str, Any]]:
+        """Ask for a store's whole basket in one request; re-query only missing or invalid items"""
+        key = self.basket_cache_key(store_name, item_names, day)
+        text = self.cache.get(key)
+        fresh = text is None
+        if not fresh:
+            self.stats['cached'] += 1
+        else:
+            async with semaphore:
+                try:
+                    max_tokens = basket_max_tokens(item_names) if self.max_tokens else None
+                    text = await self._complete(self.basket_prompt_fn(store_name, item_names), bucket,
+                                                'batch', max_tokens)
+                except Exception as e:
+                    logger.error(f"Basket request failed for {store_name}; falling back to single items: {e}")
+                    text = None
+            if text is not None:
+                self.stats['requested'] += 1
+
+        prices = parse_basket(text, item_names, self.parse_fn) if text is not None else {}
+        if fresh and prices:
+            self.cache.set(key, text, ESTIMATE_TTL)
+        if fresh:
+            self.usage['batch']['rows'] += len(prices)
+        missing = [name for name in item_names if name not in prices]
+        retried = await asyncio.gather(*(
+            self._estimate(store_name, name, day, semaphore, bucket) for name in missing
+        ))
+        fallback = {result['item']: result for result in retried}
+
+        results = []
+        for name in item_names:
+            if name in prices:
+                results.append({'store': store_name, 'item': name, 'price': prices[name],
+                                'text': text, 'mode': 'batch'})
+            else:
+                results.append(dict(fallback[name], mode='single'))
+        return results
+
+    async def estimate_async(self, pairs: Iterable[Tuple[str, str]],
+                             day: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Estimate prices for (store_name, item_name) pairs, preserving input order"""
+        day = day or date.today().isoformat()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        bucket = TokenBucket(self.requests_per_minute / 60.0)
+        return await asyncio.gather(*(
+            self._estimate(store_name, item_name, day, semaphore, bucket)
+            for store_name, item_name in pairs
+        ))
+
+    async def estimate_baskets_async(self, baskets: Iterable[Tuple[str, List[str]]],
+                                     day: Optional[str] = None,
+                                     baseline_samples: int = 0,
+                                     bucket: Optional[TokenBucket] = None) -> List[List[Dict[str, Any]]]:
+        """Estimate (store_name, [item names]) baskets, one request per store where possible
+
+        baseline_samples one-item requests are also made for the first pairs, so
+        savings_report() has a one-item baseline even when no item needs a re-query.
+        Pass a bucket to share one rate limit across concurrent calls.
+        """
+        day = day or date.today().isoformat()
+        baskets = [(store_name, list(item_names)) for store_name, item_names in baskets]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        bucket = bucket or TokenBucket(self.requests_per_minute / 60.0)
+        samples = [(store_name, name) for store_name, item_names in baskets for name in item_names]
+        results = await asyncio.gather(*(
+            self._estimate_basket(store_name, item_names, day, semaphore, bucket)
+            for store_name, item_names in baskets
+        ), *(
+            self._estimate(store_name, name, day, semaphore, bucket)
+            for store_name, name in samples[:baseline_samples]
+        ))
+        return list(results[:len(baskets)])
+
+    def estimate_baskets(self, baskets: Iterable[Tuple[str, List[str]]], day: Optional[str] = None,
+                         baseline_samples: int = 0) -> List[List[Dict[str, Any]]]:
+        """Blocking wrapper around estimate_baskets_async"""
+        start = time.perf_counter()
+        results = asyncio.run(self.estimate_baskets_async(baskets, day, baseline_samples))
+        elapsed = time.perf_counter() - start
+        rows = sum(len(basket) for basket in results)
+        logger.info(f"{rows} estimates in {len(results)} baskets in {elapsed:.1f}s: {self.stats}")
+        report = self.savings_report()
+        if report:
+            logger.info(f"Batch mode saved {report['tokens_saved_per_row']:.0f} tokens and "
+                        f"{report['seconds_saved_per_row'] * 1000:.0f} ms per row")
+        return results
+
+    def savings_report(self) -> Optional[Dict[str, float]]:
+        """Per-row tokens and latency of batch vs one-item calls, from measured usage
+
+        Needs at least one uncached call in each mode (the single-item fallbacks
+        provide the baseline); returns None otherwise.
+        """
+        single, batch = self.usage['single'], self.usage['batch']
+        if not single['calls'] or not batch['rows']:
+            return None
+        single_tokens = single['tokens'] / single['calls']
+        single_seconds = single['seconds'] / single['calls']
+        batch_tokens = batch['tokens'] / batch['rows']
+        batch_seconds = batch['seconds'] / batch['rows']
+        return {
+            'single_tokens_per_row': single_tokens,
+            'batch_tokens_per_row': batch_tokens,
+            'tokens_saved_per_row': single_tokens - batch_tokens,
+            'single_seconds_per_row': single_seconds,
+            'batch_seconds_per_row': batch_seconds,
+            'seconds_saved_per_row': single_seconds - batch_seconds,
+        }
+
+    def estimate(self, pairs: Iterable[Tuple[str, str]], day: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Blocking wrapper around estimate_async"""
+        start = time.perf_counter()
+        results = asyncio.run(self.estimate_async(list(pairs), day))
+        elapsed = time.perf_counter() - start
+        logger.info(f"{len(results)} estimates in {elapsed:.1f}s "
+                    f"({len(results) / max(elapsed, 1e-9) * 3600:.0f}/hour): {self.stats}")
+        return results
@@ -1,13 +1,11 @@
 import os
 import openai
 import pandas as pd
-import time
 from dotenv import load_dotenv
 from datetime import date
-
-# Remove old output file if it exists
-if os.path.exists("data/prices.csv"):
-    os.remove("data/prices.csv")
+from price_store import ingest_prices
+from llm_pricing import EstimationPipeline
+from price_parser import parse_price
 
 # Load environment variables from .env file
 load_dotenv()
@@ -29,50 +27,40 @@ stores = [
 ]
 items = ["milk", "eggs", "bread"]
 
-def get_price_from_openai(store, item):
-    prompt = (
-        f"What is the current price for {item} at {store['name']}? "
+def build_prompt(store_name, item):
+    return (
+        f"What is the current price for {item} at {store_name}? "
         "If you don't know, estimate based on typical prices in Louisiana."
     )
-    try:
-        response = openai.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=30,
-            temperature=0.2,
-        )
-        answer = response.choices[0].message.content
-        print(f"OpenAI response for {store['name']} - {item}: {answer}")
-        import re
-        match = re.search(r"\$[0-9]+(?:\.[0-9]{2})?", answer)
-        if match:
-            print(f"Extracted price: {match.group(0)}")
-            return float(match.group(0).replace("$", ""))
-        else:
-            print("No price found in response.")
-            return None
-    except Exception as e:
-        print(f"OpenAI API error for {store['name']} - {item}: {e}")
-        return None
 
-results = []
 today = date.today().isoformat()
-for store in stores:
-    for item in items:
-        price = get_price_from_openai(store, item)
-        print(f"DEBUG: Store: {store['name']}, Item: {item}, Price: {price}")
-        if price is not None and store["name"] in store_map and item in item_map:
-            print(f"Writing row: {store['name']} ({store_map[store['name']]}) - {item} ({item_map[item]}) - {price}")
-            results.append({
-                "store_id": store_map[store["name"]],
-                "item_id": item_map[item],
-                "price": price,
-                "date": today
-            })
-        else:
-            print(f"Skipping: {store['name']} or {item} not found in map, or price is None")
-        time.sleep(1)
+# Concurrent, rate-limited requests replace the old one-call-per-second loop
+pipeline = EstimationPipeline(
+    model="gpt-4o-mini",
+    max_tokens=30,
+    temperature=0.2,
+    prompt_fn=build_prompt,
+    parse_fn=parse_price,
+)
+estimates = pipeline.estimate([(store["name"], item) for store in stores for item in items], today)
+
+results = []
+for estimate in estimates:
+    store_name, item, price = estimate["store"], estimate["item"], estimate["price"]
+    print(f"OpenAI response for {store_name} - {item}: {estimate['text']}")
+    print(f"DEBUG: Store: {store_name}, Item: {item}, Price: {price}")
+    if price is not None and store_name in store_map and item in item_map:
+        print(f"Writing row: {store_name} ({store_map[store_name]}) - {item} ({item_map[item]}) - {price}")
+        results.append({
+            "store_id": store_map[store_name],
+            "item_id": item_map[item],
+            "price": price,
+            "date": today
+        })
+    else:
+        print(f"Skipping: {store_name} or {item} not found in map, or price is None")
 
 df = pd.DataFrame(results, columns=["store_id", "item_id", "price", "date"])
-df.to_csv("data/prices.csv", index=False)
-print("Saved results to data/prices.csv") 
\ No newline at end of file
+# Upsert today's rows; earlier days stay in the price store
+ingest_prices(df)
+print(f"Ingested {len(df)} prices for {today}")
@@ -0,0 +1,115 @@
+import math
+import time
+import random
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Tuple, Optional
+
+import numpy as np
+import requests
+
+from geo_distance import haversine_miles
+from response_cache import fetch_overpass, OverpassError, ResponseCache
+
+logger = logging.getLogger(__name__)
+
+MILES_PER_DEGREE = 69.05
+
+# Tag filters used by GroceryPriceComparer.find_nearby_stores
+STORE_SELECTORS = [
+    ('shop', 'supermarket'),
+    ('shop', 'convenience'),
+    ('shop', 'wholesale'),
+    ('shop', 'department_store'),
+    ('amenity', 'marketplace'),
+    ('shop', 'general'),
+    ('shop', 'variety_store'),
+    ('shop', 'mall'),
+]
+
+# Status codes worth retrying: rate limited, gateway timeout, server busy
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+
+def make_tiles(center: Tuple[float, float], radius_miles: float,
+               tile_miles: float) -> List[Tuple[float, float, float, float]]:
+    """Split the circle's bounding box into (south, west, north, east) tiles that touch the circle"""
+    lat, lng = center
+    lat_span = radius_miles / MILES_PER_DEGREE
+    lng_span = lat_span / max(math.cos(math.radians(lat)), 1e-6)
+    steps = max(1, math.ceil(2 * radius_miles / tile_miles))
+    lat_edges = np.linspace(lat - lat_span, lat + lat_span, steps + 1)
+    lng_edges = np.linspace(lng - lng_span, lng + lng_span, steps + 1)
+
+    tiles = []
+    for i in range(steps):
+        for j in range(steps):
+            south, north = lat_edges[i], lat_edges[i + 1]
+            west, east = lng_edges[j], lng_edges[j + 1]
+            # Closest point of the tile to the centre decides whether it overlaps the circle
+            near_lat = min(max(lat, south), north)
+            near_lng = min(max(lng, west), east)
+            if haversine_miles(lat, lng, near_lat, near_lng) <= radius_miles:
+                tiles.append((float(south), float(west), float(north), float(east)))
+    return tiles
+
+
+def build_tile_query(bbox: Tuple[float, float, float, float], timeout: int = 25,
+                     selectors: List[Tuple[str, str]] = STORE_SELECTORS) -> str:
+    """Overpass QL query for store nodes inside one bounding box"""
+    south, west, north, east = bbox
+    area = f"{south:.6f},{west:.6f},{north:.6f},{east:.6f}"
+    clauses = '\n'.join(f'  node["{key}"="{value}"]({area});' for key, value in selectors)
+    return f"[out:json][timeout:{timeout}];\n(\n{clauses}\n);\nout body;"
+
+
+def fetch_tile(bbox: Tuple[float, float, float, float], retries: int = 4, backoff: float = 1.0,
+               timeout: int = 25, url: Optional[str] = None,
+               cache: Optional[ResponseCache] = None) -> List[Dict[str, Any]]:
+    """Fetch one tile, retrying transient failures with exponential backoff and jitter"""
+    query = build_tile_query(bbox, timeout)
+    center = ((bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2)
+    for attempt in range(retries + 1):
+        try:
+            data = fetch_overpass(query, center, cache=cache, url=url, timeout=timeout + 5)
+            return data.get('elements', [])
+        except (OverpassError, requests.RequestException, ValueError) as e:
+            retryable = not isinstance(e, OverpassError) or e.status_code in RETRY_STATUS_CODES
+            if not retryable or attempt == retries:
+                raise
+            delay = backoff * (2 ** attempt) * (0.5 + random.random())
+            logger.warning(f"Tile {bbox} failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def fetch_stores_tiled(center: Tuple[float, float], radius_miles: float, tile_miles: float = 25,
+                       max_workers: int = 4, retries: int = 4, backoff: float = 1.0,
+                       timeout: int = 25, url: Optional[str] = None,
+                       cache: Optional[ResponseCache] = None) -> Dict[str, Any]:
+    """Fetch store nodes within radius_miles of center as concurrent bounding-box tiles
+
+    Returns an Overpass-style payload whose 'elements' are de-duplicated by node id
+    and clipped to the circle.
+    """
+    tiles = make_tiles(center, radius_miles, tile_miles)
+    logger.info(f"Fetching {len(tiles)} Overpass tiles with {max_workers} workers")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = pool.map(
+            lambda bbox: fetch_tile(bbox, retries, backoff, timeout, url, cache),
+            tiles
+        )
+        merged = {}
+        for elements in results:
+            for element in elements:
+                if element.get('type') == 'node':
+                    # Nodes on a tile edge come back from both neighbours
+                    merged.setdefault(element['id'], element)
+
+    elements = list(merged.values())
+    if elements:
+        distances = haversine_miles(center[0], center[1],
+                                    [e['lat'] for e in elements],
+                                    [e['lon'] for e in elements])
+        elements = [e for e, d in zip(elements, distances) if d <= radius_miles]
+    return {'elements': elements}
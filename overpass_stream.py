@@ -0,0 +1,162 @@
+import os
+import re
+import sys
+import json
+import codecs
+import shutil
+import logging
+import tempfile
+import subprocess
+from typing import Any, Dict, Iterable, Iterator, Optional, Union
+
+import requests
+
+from response_cache import OVERPASS_URL, OverpassError
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+_SEPARATORS = re.compile(r'[\s,]*')
+
+# Character expected next while between the tokens of the top-level object
+_PUNCTUATION = {'start': '{', 'colon': ':', 'open': '['}
+
+# What can follow a complete JSON value; '0.' or '1e' decode as a number that is still arriving
+_DELIMITERS = frozenset(' \t\r\n,:]}')
+
+
+def iter_elements(chunks: Iterable[Union[bytes, str]], key: str = 'elements') -> Iterator[Dict[str, Any]]:
+    """Yield the entries of a top-level JSON array (Overpass 'elements') as chunks arrive
+
+    Only the element being decoded is buffered, so memory doesn't grow with the
+    size of the payload. The top-level object is walked key by key, so the same
+    name inside another value or a string is not mistaken for the array.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buffer, pos, state, name = '', 0, 'start', None
+    chunks = iter(chunks)
+    while True:
+        pos = _SEPARATORS.match(buffer, pos).end()
+        if pos < len(buffer):
+            char = buffer[pos]
+            if state == 'array':
+                if char == ']':
+                    return
+                try:
+                    element, end = decoder.raw_decode(buffer, pos)
+                except ValueError:
+                    pass  # Element continues in the next chunk
+                else:
+                    if end < len(buffer) and buffer[end] in _DELIMITERS:
+                        yield element
+                        pos = end
+                        continue
+            elif state == 'key' and char == '}':
+                return
+            elif state in _PUNCTUATION:
+                if char != _PUNCTUATION[state]:
+                    raise ValueError(f"Expected '{_PUNCTUATION[state]}' in payload, found {char!r}")
+                pos += 1
+                if state == 'start':
+                    state = 'key'
+                elif state == 'colon':
+                    state = 'open' if name == key else 'value'
+                else:
+                    state = 'array'
+                continue
+            else:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                except ValueError:
+                    end = len(buffer)  # Value continues in the next chunk
+                if end < len(buffer) and buffer[end] in _DELIMITERS:
+                    pos = end
+                    if state == 'key':
+                        name, state = value, 'colon'
+                    else:
+                        state = 'key'  # Another top-level value, skipped
+                    continue
+
+        chunk = next(chunks, None)
+        if chunk is None:
+            if state == 'array':
+                raise ValueError(f"Payload ended inside '{key}'")
+            return
+        buffer = buffer[pos:] + (utf8.decode(chunk) if isinstance(chunk, bytes) else chunk)
+        pos = 0
+
+
+def stream_elements(query: str, url: Optional[str] = None, timeout: Optional[float] = None,
+                    chunk_size: int = CHUNK_SIZE,
+                    session: Optional[requests.Session] = None) -> Iterator[Dict[str, Any]]:
+    """Run an Overpass QL query and yield its elements while the response downloads
+
+    Bypasses the response cache, which would hold the whole payload.
+    """
+    http = session or requests
+    with http.get(url or OVERPASS_URL, params={'data': query}, timeout=timeout, stream=True) as response:
+        if response.status_code != 200:
+            raise OverpassError(response.status_code)
+        yield from iter_elements(response.iter_content(chunk_size))
+
+
+def _synthetic_payload(path: str, count: int):
+    """Write an Overpass-shaped payload with count store nodes, one element at a time"""
+    with open(path, 'w') as f:
+        f.write('{"version": 0.6, "generator": "Overpass API", "osm3s": {"copyright": "OpenStreetMap"},\n'
+                '"elements": [\n')
+        for i in range(count):
+            element = {
+                'type': 'node', 'id': 1000000 + i,
+                'lat': 30.0 + (i % 1000) * 0.001, 'lon': -91.0 - (i // 1000) * 0.001,
+                'tags': {'name': f"Store {i}", 'shop': 'supermarket', 'brand': 'Brand',
+                         'addr:street': f"{i} Main Street", 'opening_hours': 'Mo-Su 07:00-22:00'}
+            }
+            f.write(('' if i == 0 else ',\n') + json.dumps(element))
+        f.write('\n]\n}\n')
+
+
+_BENCH_SNIPPET = """
+import sys
+sys.path.insert(0, {here!r})
+import requests
+from overpass_stream import stream_elements
+from peak_rss import peak_rss_mb, format_mb
+url = {url!r}
+if {mode!r} == 'json':
+    count = sum(1 for e in requests.get(url, params={{'data': 'q'}}).json()['elements'] if e['type'] == 'node')
+else:
+    count = sum(1 for e in stream_elements('q', url=url) if e['type'] == 'node')
+print(count, format_mb(peak_rss_mb()))
+"""
+
+
+def benchmark_stream_rss(sizes=(20000, 100000, 300000)):
+    """Peak RSS of response.json() vs the streaming parser, each in a fresh process"""
+    from store_scrapers import serve_fixtures
+
+    directory = tempfile.mkdtemp()
+    server = serve_fixtures(directory)
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        for count in sizes:
+            path = os.path.join(directory, f"payload_{count}.json")
+            _synthetic_payload(path, count)
+            url = f"http://127.0.0.1:{server.server_port}/payload_{count}.json"
+            peaks = {}
+            for mode in ('json', 'stream'):
+                snippet = _BENCH_SNIPPET.format(here=here, url=url, mode=mode)
+                out = subprocess.run([sys.executable, '-c', snippet], capture_output=True, text=True, check=True)
+                parsed, peaks[mode] = out.stdout.split()
+                assert int(parsed) == count, (mode, parsed, count)
+            print(f"{count:>7,} elements ({os.path.getsize(path) / 1e6:.0f} MB): peak RSS "
+                  f"response.json() {peaks['json']} MB, streaming {peaks['stream']} MB")
+    finally:
+        server.shutdown()
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    benchmark_stream_rss()
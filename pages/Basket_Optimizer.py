@@ -0,0 +1,74 @@
+import time
+import streamlit as st
+from price_store import load_dashboard_tables, data_version
+from basket_optimizer import BasketOptimizer, DEFAULT_COST_PER_MILE, EXACT_MAX_STORES
+from dashboard_frames import DEFAULT_HOME, build_basket_frames
+
+st.set_page_config(
+    page_title="Basket Optimizer",
+    page_icon="🛒",
+    layout="wide"
+)
+
+@st.cache_data
+def load_data(version):
+    # Stores, items and the latest-price snapshot, reloaded when the data version changes
+    return load_dashboard_tables()
+
+def main():
+    st.title("🛒 Shopping Basket Optimizer")
+    st.write("Which stores give the cheapest full basket once the drive is counted? "
+             "Every item is bought where it is cheapest among the chosen stores, on one round trip from home.")
+
+    stores_df, items_df, latest_df = load_data(data_version())
+    items_df = items_df.drop_duplicates('name')
+    names = items_df['name'].tolist()
+
+    with st.form("basket_form"):
+        basket = st.multiselect("Shopping list", names, default=names[:10])
+        col1, col2, col3, col4 = st.columns(4)
+        max_stores = col1.slider("Stores to visit (at most)", 1, 6, 2)
+        cost_per_mile = col2.number_input("Driving cost per mile ($)", min_value=0.0, max_value=5.0,
+                                          value=DEFAULT_COST_PER_MILE, step=0.05)
+        home_lat = col3.number_input("Home latitude", value=DEFAULT_HOME[0], format="%.4f")
+        home_lon = col4.number_input("Home longitude", value=DEFAULT_HOME[1], format="%.4f")
+        submitted = st.form_submit_button("Find cheapest stores")
+
+    if not basket:
+        st.info("Add items to the shopping list.")
+        return
+    if submitted:
+        st.session_state['basket_submitted'] = True
+    if not st.session_state.get('basket_submitted'):
+        return
+
+    item_ids = items_df.set_index('name').loc[basket, 'item_id'].tolist()
+    start = time.perf_counter()
+    optimizer = BasketOptimizer.from_frames(stores_df, latest_df, item_ids, (home_lat, home_lon),
+                                            cost_per_mile=cost_per_mile)
+    plan = optimizer.solve(max_stores)
+    one_store = optimizer.exact(1) if max_stores > 1 else plan
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    if not plan.stores or plan.total_cost == float('inf'):
+        st.warning(f"No set of {max_stores} stores sells everything on the list; try visiting more stores.")
+        return
+    stops, purchases = build_basket_frames(plan, optimizer, stores_df, basket)
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Total", f"${plan.total_cost:.2f}")
+    col2.metric("Groceries", f"${plan.item_cost:.2f}")
+    col3.metric("Driving", f"{plan.travel_miles:.1f} mi", f"${plan.travel_miles * cost_per_mile:.2f}",
+                delta_color="off")
+    if one_store is not plan and one_store.total_cost < float('inf'):
+        col4.metric("Saved vs best single store", f"${one_store.total_cost - plan.total_cost:.2f}")
+    st.caption(f"{'Exact' if max_stores <= EXACT_MAX_STORES else 'Local search'} solution over "
+               f"{len(stores_df)} stores in {elapsed_ms:.0f} ms ({plan.evaluated:,} store sets scored)")
+
+    st.subheader("Route")
+    st.dataframe(stops, use_container_width=True, hide_index=True)
+    st.subheader("Where to buy each item")
+    st.dataframe(purchases, use_container_width=True, hide_index=True)
+
+if __name__ == "__main__":
+    main()
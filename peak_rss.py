@@ -0,0 +1,32 @@
+import sys
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB, or None where it can't be measured
+
+    Prefers VmHWM from /proc (Linux): ru_maxrss can carry over the parent's peak when
+    the benchmark child was started with vfork/exec. Falls back to ru_maxrss, which
+    is in kilobytes on Linux and bytes on macOS.
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+
+def format_mb(value: Optional[float]) -> str:
+    """'123' for a measured peak, 'n/a' where the platform doesn't report one"""
+    return 'n/a' if value is None else f"{value:.0f}"
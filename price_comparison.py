@@ -1,12 +1,24 @@
 import os
+import re
 import requests
 from datetime import datetime
-from geopy.distance import geodesic
 from geopy.geocoders import Nominatim
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import json
 import csv
+from dataclasses import asdict
+import numpy as np
+from price_pivot import write_pivot_report
+from geo_distance import distances_from
+from response_cache import cached_geocode, fetch_overpass, get_http_cache
+from store_index import StoreIndex
+from overpass_fetcher import fetch_stores_tiled
+from overpass_stream import stream_elements
+from price_simulator import simulate_flat_prices, DEFAULT_SEED
+from price_records import Store, PriceTable, STORE_FIELDS, brand_key
+from basket_optimizer import BasketOptimizer, BasketPlan, DEFAULT_COST_PER_MILE
+from road_network import DriveTimes
 
 # Set up logging
 logging.basicConfig(
@@ -15,10 +27,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Radii above this are fetched as concurrent Overpass tiles
+TILED_RADIUS_MILES = 50
+
 class GroceryPriceComparer:
-    def __init__(self, zip_code: str, radius_miles: int = 50):
+    def __init__(self, zip_code: str, radius_miles: int = 50, distance_method: str = 'haversine',
+                 seed: int = DEFAULT_SEED, drive_times: Optional[DriveTimes] = None,
+                 center: Optional[Tuple[float, float]] = None):
+        # Place to geocode (a ZIP code or "City, ST"); Baton Rouge, LA when empty
         self.zip_code = zip_code
+        # Known (lat, lng) of the search centre; skips geocoding
+        self.center = center
         self.radius_miles = radius_miles
+        # Seed for simulated prices
+        self.seed = seed
+        # 'haversine' (vectorized) or 'geodesic' (exact, per-point geopy)
+        self.distance_method = distance_method
+        # Precomputed road distances (road_network.build_drive_times); straight-line when None
+        self.drive_times = drive_times
         self.geolocator = Nominatim(user_agent="grocery_price_comparer")
         
         # Store types to search for in OpenStreetMap
@@ -64,39 +90,49 @@ class GroceryPriceComparer:
         
         self.stores = []
         self.price_data = []
+        self.store_index = None
+        # Built on first use from store_categories; names repeat across branches
+        self._category_matcher = None
+        self._category_cache = {}
 
     def get_location_from_zip(self) -> tuple:
-        """Convert city/state to latitude/longitude using Nominatim"""
+        """Convert the ZIP code or city/state to latitude/longitude using Nominatim (cached)"""
+        if self.center is not None:
+            return self.center
         try:
-            # Use Baton Rouge, Louisiana, USA for geocoding
-            location = self.geolocator.geocode("Baton Rouge, Louisiana, USA")
-            if location:
-                return (location.latitude, location.longitude)
-            else:
-                raise Exception(f"Could not find location for Baton Rouge, Louisiana, USA")
+            return cached_geocode(self.geolocator, self.zip_code or "Baton Rouge, Louisiana, USA")
         except Exception as e:
             logger.error(f"Error getting location: {str(e)}")
             raise
 
-    def categorize_store(self, store_name: str) -> str:
-        """Categorize store based on its name"""
-        store_name_lower = store_name.lower()
+    def _build_category_matcher(self):
+        """One compiled alternation over every keyword, mapped to its highest-priority category"""
+        keyword_category = {}
         for category, keywords in self.store_categories.items():
-            if any(keyword in store_name_lower for keyword in keywords):
-                return category
-        return 'other'
+            for keyword in keywords:
+                keyword_category.setdefault(keyword, category)
+        priority = {category: rank for rank, category in enumerate(self.store_categories)}
+        # Longest first, inside a lookahead so matches can start at every position
+        alternation = '|'.join(re.escape(k) for k in sorted(keyword_category, key=len, reverse=True))
+        return re.compile(f"(?=({alternation}))"), keyword_category, priority
 
-    def find_nearby_stores(self) -> List[Dict[str, Any]]:
-        """Find all types of stores that sell groceries within specified radius using Overpass API"""
-        try:
-            lat, lng = self.get_location_from_zip()
-            all_stores = []
-            
-            # Convert radius from miles to meters
-            radius_meters = self.radius_miles * 1609.34
-            
-            # Build Overpass QL query
-            query = f"""
+    def categorize_store(self, store_name: str) -> str:
+        """Categorize store based on its name (first matching category wins; memoized per name)"""
+        category = self._category_cache.get(store_name)
+        if category is None:
+            if self._category_matcher is None:
+                self._category_matcher = self._build_category_matcher()
+            pattern, keyword_category, priority = self._category_matcher
+            found = {keyword_category[m.group(1)] for m in pattern.finditer(store_name.lower())}
+            category = min(found, key=priority.get) if found else 'other'
+            self._category_cache[store_name] = category
+        return category
+
+    def _overpass_query(self, lat: float, lng: float, radius_miles: Optional[float] = None) -> str:
+        """Overpass QL query for store nodes within the radius (nodes only; no skeleton recursion)"""
+        # Convert radius from miles to meters
+        radius_meters = (radius_miles or self.radius_miles) * 1609.34
+        return f"""
             [out:json][timeout:25];
             (
               node["shop"="supermarket"](around:{radius_meters},{lat},{lng});
@@ -109,153 +145,167 @@ class GroceryPriceComparer:
               node["shop"="mall"](around:{radius_meters},{lat},{lng});
             );
             out body;
-            >;
-            out skel qt;
             """
+
+    def _store_record(self, element: Dict[str, Any], distance: float) -> Store:
+        """Normalized store entry for one Overpass node"""
+        # Get store name from tags with better fallbacks
+        tags = element.get('tags', {})
+        
+        # Try different name variations
+        name = (
+            tags.get('name') or  # Try standard name
+            tags.get('name:en') or  # Try English name
+            tags.get('brand') or  # Try brand name
+            tags.get('operator') or  # Try operator name
+            f"{tags.get('shop', 'Store')} at {tags.get('addr:street', 'this location')}"  # Fallback with shop type and street
+        )
+        
+        # Clean up the name
+        if name:
+            # Remove common prefixes/suffixes
+            name = name.replace('Supermercado', '').replace('Tienda', '').strip()
+            # Remove extra whitespace
+            name = ' '.join(name.split())
+            # If name is too generic, add more context
+            if name.lower() in ['store', 'shop', 'market']:
+                name = f"{name.title()} on {tags.get('addr:street', 'this street')}"
+        
+        # Chain identity for brand-level rollups; placeholder names get none
+        brand_source = tags.get('brand') or tags.get('name') or tags.get('name:en') or tags.get('operator')
+        chain = brand_key(brand_source) if brand_source and brand_source.lower() not in ['store', 'shop', 'market'] else ''
+        
+        # Create store entry
+        return Store(
+            name=name or 'Unknown Store',
+            address=tags.get('addr:street', 'N/A'),
+            lat=element['lat'],
+            lng=element['lon'],
+            distance=float(distance),
+            category=self.categorize_store(name or ''),
+            type=tags.get('shop', 'other'),
+            brand=tags.get('brand', 'N/A'),
+            operator=tags.get('operator', 'N/A'),
+            osm_id=element.get('id', 0),
+            chain=chain
+        )
+
+    def iter_nearby_stores(self, batch_size: int = 1000) -> Iterator[Store]:
+        """Streaming find_nearby_stores: yield store entries while the Overpass response downloads
+
+        Memory stays flat however many stores match; entries come in response order
+        and are not de-duplicated or cached.
+        """
+        lat, lng = self.get_location_from_zip()
+        batch = []
+        for element in stream_elements(self._overpass_query(lat, lng)):
+            if element.get('type') == 'node':
+                batch.append(element)
+            if len(batch) == batch_size:
+                yield from self._store_batch((lat, lng), batch)
+                batch = []
+        yield from self._store_batch((lat, lng), batch)
+
+    def _store_batch(self, center: tuple, nodes: List[Dict[str, Any]]) -> Iterator[Store]:
+        distances = distances_from(center, [e['lat'] for e in nodes], [e['lon'] for e in nodes],
+                                   self.distance_method)
+        for element, distance in zip(nodes, distances):
+            yield self._store_record(element, distance)
+
+    def fetch_stores(self, center: Tuple[float, float], radius_miles: float) -> List[Store]:
+        """Stores within radius_miles of center from Overpass, nearest first, one per branch"""
+        lat, lng = center
+        # Make request to Overpass API (served from the local cache when warm,
+        # revalidated with a conditional request when stale).
+        # Wide circles time out as one query, so fetch them as parallel tiles.
+        if radius_miles > TILED_RADIUS_MILES:
+            data = fetch_stores_tiled((lat, lng), radius_miles)
+        else:
+            data = fetch_overpass(self._overpass_query(lat, lng, radius_miles), (lat, lng))
+        logger.info(f"HTTP cache: {get_http_cache().stats}")
+        
+        # Calculate all distances in one vectorized call
+        nodes = [e for e in data.get('elements', []) if e.get('type') == 'node']
+        all_stores = list(self._store_batch((lat, lng), nodes))
+        
+        # Remove duplicates (tiles overlap, so a node can come back more than once)
+        unique_stores = []
+        seen_ids = set()
+        for store in sorted(all_stores, key=lambda x: x.distance):
+            # The OSM node id identifies a branch; same-named branches stay separate
+            if store.key not in seen_ids:
+                seen_ids.add(store.key)
+                unique_stores.append(store)
+        return unique_stores
+
+    def find_nearby_stores(self) -> List[Store]:
+        """Find all types of stores that sell groceries within specified radius using Overpass API"""
+        try:
+            lat, lng = self.get_location_from_zip()
+            unique_stores = self.fetch_stores((lat, lng), self.radius_miles)
             
-            # Make request to Overpass API
-            response = requests.get(
-                "https://overpass-api.de/api/interpreter",
-                params={'data': query}
-            )
+            if self.drive_times is not None:
+                # Road miles from the nearest precomputed origin, looked up rather than routed;
+                # outside the matrix's area every store keeps its straight-line distance
+                origin = self.drive_times.nearest_origin((lat, lng))
+                if origin is None:
+                    logger.warning(f"No drive-time origin within {self.drive_times.snap_miles:.1f} miles of "
+                                   f"({lat:.4f}, {lng:.4f}); using straight-line distances")
+                else:
+                    unique_stores = sorted(self.drive_times.recenter(unique_stores, origin),
+                                           key=lambda x: x.distance)
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                for element in data.get('elements', []):
-                    if element.get('type') == 'node':
-                        # Calculate distance
-                        distance = geodesic(
-                            (lat, lng),
-                            (element['lat'], element['lon'])
-                        ).miles
-                        
-                        # Get store name from tags with better fallbacks
-                        tags = element.get('tags', {})
-                        
-                        # Try different name variations
-                        name = (
-                            tags.get('name') or  # Try standard name
-                            tags.get('name:en') or  # Try English name
-                            tags.get('brand') or  # Try brand name
-                            tags.get('operator') or  # Try operator name
-                            f"{tags.get('shop', 'Store')} at {tags.get('addr:street', 'this location')}"  # Fallback with shop type and street
-                        )
-                        
-                        # Clean up the name
-                        if name:
-                            # Remove common prefixes/suffixes
-                            name = name.replace('Supermercado', '').replace('Tienda', '').strip()
-                            # Remove extra whitespace
-                            name = ' '.join(name.split())
-                            # If name is too generic, add more context
-                            if name.lower() in ['store', 'shop', 'market']:
-                                name = f"{name.title()} on {tags.get('addr:street', 'this street')}"
-                        
-                        # Create store entry
-                        store = {
-                            'name': name or 'Unknown Store',
-                            'address': tags.get('addr:street', 'N/A'),
-                            'location': {
-                                'lat': element['lat'],
-                                'lng': element['lon']
-                            },
-                            'distance': distance,
-                            'category': self.categorize_store(name or ''),
-                            'type': tags.get('shop', 'other'),
-                            'brand': tags.get('brand', 'N/A'),
-                            'operator': tags.get('operator', 'N/A')
-                        }
-                        all_stores.append(store)
-                
-                # Remove duplicates
-                unique_stores = []
-                seen_names = set()
-                for store in sorted(all_stores, key=lambda x: x['distance']):
-                    # Use a combination of name and location to identify unique stores
-                    store_id = f"{store['name']}_{store['location']['lat']}_{store['location']['lng']}"
-                    if store_id not in seen_names:
-                        seen_names.add(store_id)
-                        unique_stores.append(store)
-                
-                return unique_stores
-            else:
-                raise Exception(f"Overpass API request failed with status code {response.status_code}")
-                
+            return unique_stores
+
         except Exception as e:
             logger.error(f"Error finding nearby stores: {str(e)}")
             raise
 
-    def get_prices(self) -> List[Dict[str, Any]]:
+    def build_store_index(self, cell_degrees: float = 0.1) -> StoreIndex:
+        """Index the fetched stores so other centres and radii can be answered locally"""
+        self.store_index = StoreIndex(self.stores, cell_degrees)
+        return self.store_index
+
+    def stores_within(self, center: tuple, radius_miles: float) -> List[Store]:
+        """Stores within radius_miles of center, with distances measured from center"""
+        if self.store_index is None:
+            self.build_store_index()
+        return self.store_index.recenter(center, radius_miles)
+
+    def get_prices(self) -> PriceTable:
         """Get simulated prices for items at each store"""
-        prices = []
-        for store in self.stores:
-            for item in self.items:
-                # Simulate price data
-                price = round(2 + (hash(f"{store['name']}{item}") % 100) / 100, 2)
-                prices.append({
-                    'item': item,
-                    'store': store['name'],
-                    'price': price,
-                    'distance': round(store['distance'], 1),
-                    'date': datetime.now().strftime('%Y-%m-%d')
-                })
-        return prices
+        # Simulate the whole stores x items matrix at once (seeded per branch, so reproducible)
+        matrix = simulate_flat_prices([store.key for store in self.stores], len(self.items), self.seed)
+        today = datetime.now().strftime('%Y-%m-%d')
+        return PriceTable.from_matrix(self.stores, self.items, matrix, today)
 
-    def save_to_csv(self, data: List[Dict[str, Any]], filename: str):
+    def save_to_csv(self, data, filename: str):
         """Save data to CSV file in a more readable format"""
-        if not data:
+        if not len(data):
             return
         
-        if filename == 'price_comparison_report.csv':
+        if filename in ('price_comparison_report.csv', 'brand_comparison_report.csv'):
             # Create a pivot table format for price comparison
-            stores = sorted(set(item['store'] for item in data))
-            items = sorted(set(item['item'] for item in data))
-            
-            # Create headers
-            headers = ['Item'] + stores
-            
-            with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(headers)
-                
-                # Write each item's prices across all stores
-                for item in items:
-                    row = [item]
-                    for store in stores:
-                        # Find price for this item at this store
-                        price_data = next(
-                            (p for p in data if p['item'] == item and p['store'] == store),
-                            None
-                        )
-                        price = f"${price_data['price']:.2f}" if price_data else "N/A"
-                        row.append(price)
-                    writer.writerow(row)
-                
-                # Add a summary row with average prices
-                writer.writerow(['Average Price'] + [
-                    f"${sum(p['price'] for p in data if p['store'] == store) / len(items):.2f}"
-                    for store in stores
-                ])
-                
-                # Add a row with store distances
-                writer.writerow(['Distance (miles)'] + [
-                    f"{next((p['distance'] for p in data if p['store'] == store), 'N/A'):.1f}"
-                    for store in stores
-                ])
+            write_pivot_report(data, filename)
         else:
-            # Original format for other files
-            fieldnames = data[0].keys()
+            # One row per store (lat/lng as plain columns) or per price observation
+            if isinstance(data, PriceTable):
+                fieldnames = ['item', 'store', 'price', 'distance', 'date']
+                rows = (asdict(observation) for observation in data.observations())
+            else:
+                fieldnames = STORE_FIELDS
+                rows = (store.to_row() for store in data)
             with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
                 writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
                 writer.writeheader()
-                writer.writerows(data)
+                writer.writerows(rows)
 
-    def generate_report(self) -> List[Dict[str, Any]]:
+    def generate_report(self) -> PriceTable:
         """Generate a comprehensive store and price comparison report"""
         try:
             # Find all stores
             self.stores = self.find_nearby_stores()
+            self.store_index = None
             logger.info(f"Found {len(self.stores)} stores in the area")
             
             # Save stores to CSV
@@ -269,14 +319,32 @@ class GroceryPriceComparer:
             self.save_to_csv(self.price_data, 'price_comparison_report.csv')
             logger.info("Price comparison report saved to price_comparison_report.csv")
             
+            # Brand rollup, cached on the table for brand-level analysis
+            brands = self.price_data.rollup()
+            self.save_to_csv(brands, 'brand_comparison_report.csv')
+            logger.info(f"{len(brands.stores)} brands across {len(self.stores)} branches; "
+                        "brand report saved to brand_comparison_report.csv")
+            
             return self.price_data
         except Exception as e:
             logger.error(f"Error generating report: {str(e)}")
             raise
 
-    def analyze_price_patterns(self, price_data: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Analyze price patterns across stores and items"""
+    def analyze_price_patterns(self, price_data: PriceTable, level: str = 'branch') -> Dict[str, Any]:
+        """Analyze price patterns across stores and items
+
+        Store results are keyed by store id (the store's position in
+        analysis['stores']). At level='branch' each store is one branch; at
+        level='brand' branches of a chain are combined using the table's cached
+        rollup, so nothing is re-fetched.
+        """
+        if level == 'brand':
+            price_data = price_data.rollup()
+        elif level != 'branch':
+            raise ValueError(f"Unknown analysis level: {level}")
         analysis = {
+            'stores': price_data.stores,
+            'labels': price_data.store_labels,
             'cheapest_stores': {},
             'most_expensive_stores': {},
             'price_variation': {},
@@ -295,67 +363,70 @@ class GroceryPriceComparer:
                 'condiments': ['ketchup', 'mustard', 'mayonnaise', 'hot sauce']
             }
         }
-        
-        # Calculate store averages and price variations
-        store_prices = {}
-        item_prices = {}
-        
-        for price in price_data:
-            store = price['store']
-            item = price['item']
-            price_value = price['price']
-            
-            # Store prices
-            if store not in store_prices:
-                store_prices[store] = []
-            store_prices[store].append(price_value)
-            
-            # Item prices
-            if item not in item_prices:
-                item_prices[item] = []
-            item_prices[item].append(price_value)
-        
-        # Calculate store statistics
-        for store, prices in store_prices.items():
-            avg_price = sum(prices) / len(prices)
-            min_price = min(prices)
-            max_price = max(prices)
-            price_range = max_price - min_price
-            
-            analysis['cheapest_stores'][store] = avg_price
-            analysis['price_variation'][store] = price_range
-            
-            # Calculate value score (lower is better)
-            # Consider both average price and distance
-            store_data = next(s for s in self.stores if s['name'] == store)
-            value_score = avg_price * (1 + (store_data['distance'] / 50))  # Distance penalty
-            analysis['best_value_stores'][store] = value_score
-        
-        # Sort stores by price and value
-        analysis['cheapest_stores'] = dict(sorted(analysis['cheapest_stores'].items(), key=lambda x: x[1]))
-        analysis['most_expensive_stores'] = dict(sorted(analysis['cheapest_stores'].items(), key=lambda x: x[1], reverse=True))
-        analysis['best_value_stores'] = dict(sorted(analysis['best_value_stores'].items(), key=lambda x: x[1]))
-        
-        # Calculate category averages
-        category_averages = {}
-        for category, items in analysis['item_categories'].items():
-            category_prices = []
-            for item in items:
-                if item in item_prices:
-                    category_prices.extend(item_prices[item])
-            if category_prices:
-                category_averages[category] = sum(category_prices) / len(category_prices)
-        
+        if not len(price_data):
+            analysis['category_averages'] = {}
+            return analysis
+
+        # Store statistics in one pass: sort by store id, then reduce each run
+        store_count = len(price_data.stores)
+        codes, prices = price_data.store_codes, price_data.prices
+        order = np.argsort(codes, kind='stable')
+        sorted_codes, sorted_prices = codes[order], prices[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        store_ids = sorted_codes[starts]
+        counts = np.diff(np.r_[starts, len(sorted_codes)])
+        averages = np.add.reduceat(sorted_prices, starts) / counts
+        ranges = np.maximum.reduceat(sorted_prices, starts) - np.minimum.reduceat(sorted_prices, starts)
+
+        # Value score (lower is better): average price with a distance penalty on a fixed 50-mile scale
+        distances = np.array([store.distance for store in price_data.stores], dtype=np.float64)
+        value_scores = averages * (1 + distances[store_ids] / 50)
+
+        ids = store_ids.tolist()
+        # Sort stores by price and value (stable, so ties keep store order)
+        by_price = np.argsort(averages, kind='stable')
+        analysis['cheapest_stores'] = {ids[i]: float(averages[i]) for i in by_price}
+        analysis['most_expensive_stores'] = {ids[i]: float(averages[i])
+                                           for i in np.argsort(-averages, kind='stable')}
+        analysis['price_variation'] = dict(zip(ids, ranges.tolist()))
+        analysis['best_value_stores'] = {ids[i]: float(value_scores[i])
+                                         for i in np.argsort(value_scores, kind='stable')}
+
+        # Category averages: map item codes to category codes, then one weighted bincount
+        categories = list(analysis['item_categories'])
+        item_category = {}
+        for rank, category in enumerate(categories):
+            for item in analysis['item_categories'][category]:
+                item_category.setdefault(item, rank)
+        category_of_item = np.array([item_category.get(item, -1) for item in price_data.items], dtype=np.int64)
+        category_codes = category_of_item[price_data.item_codes]
+        known = category_codes >= 0
+        totals = np.bincount(category_codes[known], weights=prices[known], minlength=len(categories))
+        sizes = np.bincount(category_codes[known], minlength=len(categories))
+        category_averages = {categories[c]: totals[c] / sizes[c] for c in range(len(categories)) if sizes[c]}
         analysis['category_averages'] = dict(sorted(category_averages.items(), key=lambda x: x[1]))
         
         return analysis
 
+    def optimize_basket(self, price_data: PriceTable, items: List[str] = None, max_stores: int = 2,
+                        cost_per_mile: float = DEFAULT_COST_PER_MILE) -> BasketPlan:
+        """Cheapest set of at most max_stores stores to buy items at, including the drive
+
+        Store distances are the ones find_nearby_stores measured from the search
+        centre, and legs between stores are road miles too when drive times are
+        loaded; BasketPlan.stores are positions in price_data.stores.
+        """
+        store_miles = self.drive_times.between(price_data.stores) if self.drive_times is not None else None
+        optimizer = BasketOptimizer.from_table(price_data, items, cost_per_mile=cost_per_mile, store_miles=store_miles)
+        return optimizer.solve(max_stores)
+
 def main():
     try:
         # This script is configured for Baton Rouge, LA
         print("\nGrocery Price Comparison for Baton Rouge, LA (within 50 miles)")
-        # Initialize the comparer (zip_code argument is ignored)
-        comparer = GroceryPriceComparer("")
+        # An empty zip_code geocodes Baton Rouge (see get_location_from_zip); road distances when they've been built
+        drive_times = DriveTimes() if DriveTimes.exists() else None
+        comparer = GroceryPriceComparer("", drive_times=drive_times)
         
         # Generate and display the report
         report = comparer.generate_report()
@@ -367,40 +438,57 @@ def main():
         print(f"Total stores found: {len(comparer.stores)}")
         print("\nStore categories:")
         for store in comparer.stores:
-            print(f"- {store['name']} ({store['category']}, {store['distance']:.1f} miles)")
+            print(f"- {store.name} ({store.category}, {store.distance:.1f} miles)")
         
         print("\nPrice Analysis:")
         print("\nTop 5 Cheapest Stores (Average Price):")
-        for store, price in list(analysis['cheapest_stores'].items())[:5]:
-            print(f"- {store}: ${price:.2f}")
+        stores = analysis['labels']
+        for store_id, price in list(analysis['cheapest_stores'].items())[:5]:
+            print(f"- {stores[store_id]}: ${price:.2f}")
         
         print("\nTop 5 Most Expensive Stores (Average Price):")
-        for store, price in list(analysis['most_expensive_stores'].items())[:5]:
-            print(f"- {store}: ${price:.2f}")
+        for store_id, price in list(analysis['most_expensive_stores'].items())[:5]:
+            print(f"- {stores[store_id]}: ${price:.2f}")
         
         print("\nTop 5 Best Value Stores (Price + Distance):")
-        for store, score in list(analysis['best_value_stores'].items())[:5]:
-            print(f"- {store}: Value Score {score:.2f}")
+        for store_id, score in list(analysis['best_value_stores'].items())[:5]:
+            print(f"- {stores[store_id]}: Value Score {score:.2f}")
         
         print("\nPrice Variation by Store (Highest to Lowest):")
         sorted_variation = dict(sorted(analysis['price_variation'].items(), key=lambda x: x[1], reverse=True))
-        for store, variation in list(sorted_variation.items())[:5]:
-            print(f"- {store}: ${variation:.2f} range")
+        for store_id, variation in list(sorted_variation.items())[:5]:
+            print(f"- {stores[store_id]}: ${variation:.2f} range")
+        
+        brand_analysis = comparer.analyze_price_patterns(report, level='brand')
+        brands = brand_analysis['labels']
+        branch_counts = np.bincount(report.brand_codes(), minlength=len(brands))
+        print("\nTop 5 Cheapest Brands (Average over Branches):")
+        for brand_id, price in list(brand_analysis['cheapest_stores'].items())[:5]:
+            print(f"- {brands[brand_id]} ({branch_counts[brand_id]} branches): ${price:.2f}")
         
         print("\nAverage Prices by Category:")
         for category, avg_price in analysis['category_averages'].items():
             print(f"- {category.title()}: ${avg_price:.2f}")
         
+        plan = comparer.optimize_basket(report)
+        print(f"\nCheapest Full Basket (up to 2 stores, ${DEFAULT_COST_PER_MILE:.2f}/mile):")
+        for store_id in plan.stores:
+            bought = [item for item, where in zip(report.items, plan.assignment.tolist()) if where == store_id]
+            print(f"- {report.store_labels[store_id]} ({report.stores[store_id].distance:.1f} miles): "
+                  f"{len(bought)} items")
+        print(f"  Items ${plan.item_cost:.2f} + {plan.travel_miles:.1f} miles = ${plan.total_cost:.2f}")
+        
         print("\nPrice Comparison Report:")
         for item in comparer.items:
             print(f"\n{item.upper()}:")
-            item_prices = [p for p in report if p['item'] == item]
-            for price in sorted(item_prices, key=lambda x: x['price']):
-                print(f"  {price['store']}: ${price['price']:.2f} ({price['distance']:.1f} miles)")
+            item_prices = [p for p in report.observations() if p.item == item]
+            for price in sorted(item_prices, key=lambda x: x.price):
+                print(f"  {price.store}: ${price.price:.2f} ({price.distance:.1f} miles)")
         
         print("\nReports have been saved as CSV files:")
         print("- stores.csv (Store information)")
         print("- price_comparison_report.csv (Price comparisons)")
+        print("- brand_comparison_report.csv (Prices averaged per brand)")
         
     except Exception as e:
         logger.error(f"Error in main execution: {str(e)}")
@@ -1,3 +1,4 @@
+import time
 import streamlit as st
 import pandas as pd
 import plotly.express as px
@@ -5,6 +6,9 @@ import plotly.graph_objects as go
 from datetime import datetime
 import numpy as np
 import pydeck as pdk
+from price_store import load_dashboard_tables, data_version
+from dashboard_frames import build_frames, build_trend_frames
+from price_trends import analyze_history
 
 # Set page config
 st.set_page_config(
@@ -15,104 +19,44 @@ st.set_page_config(
 
 # Load data
 @st.cache_data
-def load_data():
-    stores_df = pd.read_csv('data/stores.csv')
-    items_df = pd.read_csv('data/items.csv')
-    prices_df = pd.read_csv('data/prices.csv')
-    # Force all IDs to string for reliable merging
-    stores_df['store_id'] = stores_df['store_id'].astype(str)
-    prices_df['store_id'] = prices_df['store_id'].astype(str)
-    prices_df['item_id'] = prices_df['item_id'].astype(str)
-    items_df['item_id'] = items_df['item_id'].astype(str)
-    return stores_df, items_df, prices_df
+def load_data(version):
+    # Stores, items and the latest-price snapshot (kept up to date at ingest), not the history.
+    # version (price_store.data_version) changes when the files do, so new data is picked up
+    return load_dashboard_tables()
 
-def calculate_price_recommendations(prices_df, stores_df, items_df, my_store_id='1'):
-    # Get latest prices
-    latest_date = prices_df['date'].max()
-    latest_prices = prices_df[prices_df['date'] == latest_date]
-    
-    # Calculate price statistics for each item
-    price_stats = []
-    for item_id in items_df['item_id']:
-        item_prices = latest_prices[latest_prices['item_id'] == item_id]
-        my_store_prices = item_prices[item_prices['store_id'] == my_store_id]['price']
-        my_price = my_store_prices.iloc[0] if not my_store_prices.empty else np.nan
-        
-        # Calculate statistics excluding my store
-        other_prices = item_prices[item_prices['store_id'] != my_store_id]['price']
-        avg_price = other_prices.mean()
-        min_price = other_prices.min()
-        max_price = other_prices.max()
-        
-        # Get item details
-        item_details = items_df[items_df['item_id'] == item_id].iloc[0]
-        
-        # Use default target margin of 20%
-        target_margin = 0.20
-        
-        # Calculate current margin (assuming cost is 70% of market average)
-        estimated_cost = avg_price * 0.7 if not np.isnan(avg_price) else np.nan
-        current_margin = (my_price - estimated_cost) / my_price if not np.isnan(my_price) and not np.isnan(estimated_cost) else np.nan
-        
-        # Calculate margin gap
-        margin_gap = current_margin - target_margin if not np.isnan(current_margin) else np.nan
-        
-        # Recommend price based on target margin
-        recommended_price = estimated_cost / (1 - target_margin) if not np.isnan(estimated_cost) else np.nan
-        
-        price_stats.append({
-            'item_id': item_id,
-            'item_name': item_details['name'],
-            'target_margin': target_margin,
-            'current_margin': current_margin,
-            'margin_gap': margin_gap,
-            'my_price': my_price,
-            'avg_price': avg_price,
-            'min_price': min_price,
-            'max_price': max_price,
-            'recommended_price': round(recommended_price, 2) if not np.isnan(recommended_price) else np.nan,
-            'price_difference': round(my_price - avg_price, 2) if not np.isnan(my_price) and not np.isnan(avg_price) else np.nan,
-            'price_difference_percent': round((my_price - avg_price) / avg_price * 100, 1) if not np.isnan(my_price) and not np.isnan(avg_price) and avg_price != 0 else np.nan
-        })
-    
-    return pd.DataFrame(price_stats)
+@st.cache_resource(max_entries=2)
+def derived_frames(version):
+    # Recommendations, formatted tables and per-item map frames, built once per data version.
+    # cache_resource returns the same objects on every rerun (no copy), so they are read-only here
+    stores_df, items_df, latest_df = load_data(version)
+    return build_frames(stores_df, items_df, latest_df, version)
+
+@st.cache_resource(max_entries=1)
+def price_trends(version):
+    # The whole history as a date x store x item cube (a temporary memmap), analyzed in
+    # fixed-memory chunks once per data version
+    stores_df, items_df, _ = load_data(version)
+    report = analyze_history()
+    return report, build_trend_frames(report, stores_df, items_df)
 
 def main():
+    rerun_start = time.perf_counter()
     st.title("🛒 Sopranos Supermarket Price Intelligence")
     st.subheader("Livonia, LA")
 
-    # Load data
-    stores_df, items_df, prices_df = load_data()
+    # Load data and everything derived from it (cached per data version)
+    frames = derived_frames(data_version())
 
     # Price Recommendations Section
     st.header("Price Recommendations")
     
-    # Calculate price recommendations
-    price_recommendations = calculate_price_recommendations(prices_df, stores_df, items_df)
+    price_recommendations = frames.recommendations
     
     # Display price recommendations table
     st.subheader("Current Prices vs. Market")
     
-    # Format the recommendations table
-    recommendations_display = price_recommendations[[
-        'item_name', 'my_price', 'avg_price', 'min_price', 'max_price',
-        'recommended_price', 'price_difference_percent', 'current_margin', 'target_margin', 'margin_gap'
-    ]].copy()
-    
-    recommendations_display.columns = [
-        'Item', 'Your Price', 'Market Average', 'Market Min', 'Market Max',
-        'Recommended Price', 'Price Difference (%)', 'Current Margin', 'Target Margin', 'Margin Gap'
-    ]
-    
-    # Format price columns as $X.00
-    price_cols = ['Your Price', 'Market Average', 'Market Min', 'Market Max', 'Recommended Price']
-    for col in price_cols:
-        recommendations_display[col] = recommendations_display[col].apply(lambda x: f"${x:.2f}")
-    
-    # Format margin columns as percentages
-    margin_cols = ['Current Margin', 'Target Margin', 'Margin Gap']
-    for col in margin_cols:
-        recommendations_display[col] = recommendations_display[col].apply(lambda x: f"{x*100:.1f}%")
+    # Prices as $X.00 and margins as percentages, formatted once per data version
+    recommendations_display = frames.recommendations_display
     
     # Add color coding for price differences and margin gaps
     def color_price_diff(val):
@@ -204,49 +148,47 @@ def main():
             # Save the new prices
             st.success("Prices updated successfully!")
     
+    # --- Price Trends and Outliers (full history) ---
+    # Scans the whole history, so it only runs on request; the rest of the page reads the snapshot
+    st.header("Price Trends and Outliers")
+    if st.button("Analyze full price history", key="analyze_trends"):
+        st.session_state['trends_requested'] = True
+    if st.session_state.get('trends_requested'):
+        report, (item_trends, outliers) = price_trends(frames.version)
+        if not report.dates:
+            st.info("No price history stored yet.")
+        else:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Days of history", len(report.dates))
+            col2.metric("Price changes > 10%", f"{int(report.daily_changes.sum()):,}")
+            col3.metric("Outliers", f"{int(report.daily_anomalies.sum()):,}")
+            st.subheader("Volatility by Item (14-day window, averaged over stores)")
+            st.dataframe(item_trends, use_container_width=True)
+            if not outliers.empty:
+                st.subheader("Largest Outliers (z-score against the previous 14 days)")
+                st.dataframe(outliers, use_container_width=True)
+    
     # --- Store Locations Table and Map ---
     st.header("Store Locations and Prices")
-    item_options = items_df['name'].tolist()
-    selected_item = st.selectbox("Choose a food item to display on the map:", item_options, key="item_selectbox_main")
-    selected_item_id = items_df[items_df['name'] == selected_item]['item_id'].iloc[0]
-    latest_date = prices_df['date'].max()
+    selected_item = st.selectbox("Choose a food item to display on the map:", frames.item_names, key="item_selectbox_main")
+    rerun_caption = st.empty()
+    latest_date = frames.latest_date
 
-    # Prepare map data with price for selected item
-    item_map_prices = prices_df[(prices_df['item_id'] == selected_item_id) & (prices_df['date'] == latest_date)]
-    stores_df['store_id'] = stores_df['store_id'].astype(str)
-    item_map_prices['store_id'] = item_map_prices['store_id'].astype(str)
-    map_df = stores_df.merge(item_map_prices[['store_id', 'price']], on='store_id', how='left')
-    map_df = map_df.rename(columns={'lat': 'latitude', 'lon': 'longitude'})
-    map_df['price_str'] = map_df['price'].apply(lambda x: f"${x:.2f}" if pd.notnull(x) else "N/A")
-    map_df['label'] = map_df.apply(lambda row: f"{row['store_name']}\n{row['price_str']}", axis=1)
-    map_df['is_sopranos'] = map_df['store_name'].str.lower().str.contains('soprano')
+    # Map data for every item was prepared with the other derived frames
+    item_map = frames.item_maps[frames.item_ids[selected_item]]
+    map_df = item_map.points
 
     # Remove lat/lon from table
     st.subheader(f"Store Locations and Prices for {selected_item} (as of {latest_date})")
-    display_df = map_df[['store_name', 'address', 'price_str']].copy()
-    display_df.columns = ['Store Name', 'Address', 'Price']
-    st.dataframe(display_df, use_container_width=True)
+    st.dataframe(item_map.table, use_container_width=True)
 
     if map_df[['latitude', 'longitude']].dropna().empty:
         st.warning('No store location data available for the map. Please check your stores.csv for lat/lon columns and values.')
     else:
-        # Add slight jitter to overlapping points (optional, only if needed)
-        jitter = 0.0005
-        map_df['latitude_jitter'] = map_df['latitude'] + map_df.groupby(['latitude', 'longitude']).cumcount() * jitter
-        map_df['longitude_jitter'] = map_df['longitude'] + map_df.groupby(['latitude', 'longitude']).cumcount() * jitter
-
-        # IconLayer for Soprano's
-        icon_data = {
-            "url": "https://cdn-icons-png.flaticon.com/512/25/25694.png",  # white house PNG
-            "width": 512,
-            "height": 512,
-            "anchorY": 512
-        }
-        map_df['icon_data'] = map_df['is_sopranos'].apply(lambda x: icon_data if x else None)
-
+        # Overlapping points are already jittered (dashboard_frames.JITTER)
         icon_layer = pdk.Layer(
             "IconLayer",
-            data=map_df[map_df['is_sopranos']],
+            data=item_map.icons,
             get_icon="icon_data",
             get_position='[longitude_jitter, latitude_jitter]',
             get_size=4,
@@ -257,7 +199,7 @@ def main():
         # ScatterplotLayer for other stores
         scatter_layer = pdk.Layer(
             "ScatterplotLayer",
-            data=map_df[~map_df['is_sopranos']],
+            data=item_map.others,
             get_position='[longitude_jitter, latitude_jitter]',
             get_color=[0, 102, 204, 180],
             get_radius=400,
@@ -278,8 +220,8 @@ def main():
         )
 
         view_state = pdk.ViewState(
-            latitude=map_df['latitude'].mean() if not map_df.empty else 30.5594,
-            longitude=map_df['longitude'].mean() if not map_df.empty else -91.5557,
+            latitude=item_map.center[0],
+            longitude=item_map.center[1],
             zoom=9,
             pitch=0,
         )
@@ -292,8 +234,24 @@ def main():
         st.pydeck_chart(pdk.Deck(
             layers=[icon_layer, scatter_layer, text_layer],
             initial_view_state=view_state,
-            tooltip=tooltip
-        ), use_container_width=True, height=700)
+            tooltip=tooltip,
+            height=700
+        ), use_container_width=True)
+
+    # Rerun latency, recorded when this rerun was triggered by a new selectbox choice
+    elapsed_ms = (time.perf_counter() - rerun_start) * 1000
+    previous_item = st.session_state.get('map_item')
+    latencies = st.session_state.setdefault('selectbox_rerun_ms', [])
+    if previous_item is not None and previous_item != selected_item:
+        latencies.append(elapsed_ms)
+        del latencies[:-20]
+    st.session_state['map_item'] = selected_item
+    if latencies:
+        rerun_caption.caption(f"Rerun after item change: {latencies[-1]:.0f} ms "
+                              f"(median {np.median(latencies):.0f} ms over the last {len(latencies)}; "
+                              f"data version {frames.version})")
+    else:
+        rerun_caption.caption(f"Rerun: {elapsed_ms:.0f} ms (data version {frames.version})")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
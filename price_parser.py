@@ -0,0 +1,287 @@
+import re
+import time
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+# Anything at or above this is a year, a SKU or a phone number, not a grocery price
+MAX_PRICE = 1000.0
+
+# Package sizes are normalized to ounces (weight), fluid ounces (volume) or a count
+UNITS = {
+    'oz': ('oz', 1.0), 'ounce': ('oz', 1.0),
+    'lb': ('oz', 16.0), 'pound': ('oz', 16.0),
+    'g': ('oz', 0.035274), 'gram': ('oz', 0.035274),
+    'kg': ('oz', 35.274), 'kilogram': ('oz', 35.274),
+    'floz': ('fl oz', 1.0), 'fluidounce': ('fl oz', 1.0),
+    'gal': ('fl oz', 128.0), 'gallon': ('fl oz', 128.0),
+    'qt': ('fl oz', 32.0), 'quart': ('fl oz', 32.0),
+    'pt': ('fl oz', 16.0), 'pint': ('fl oz', 16.0),
+    'l': ('fl oz', 33.814), 'liter': ('fl oz', 33.814), 'litre': ('fl oz', 33.814),
+    'ml': ('fl oz', 0.033814), 'milliliter': ('fl oz', 0.033814),
+    'ct': ('ct', 1.0), 'count': ('ct', 1.0),
+    'pk': ('ct', 1.0), 'pack': ('ct', 1.0), 'piece': ('ct', 1.0), 'pc': ('ct', 1.0),
+    'dozen': ('ct', 12.0), 'doz': ('ct', 12.0),
+}
+
+_NUM = r'\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?|\.\d+'
+_UNIT = (r'(?:fl\.?\s*oz|fluid\s+ounces?|ounces?|oz|pounds?|lbs?|grams?|g|kilograms?|kg|gallons?|gal'
+         r'|quarts?|qt|pints?|pt|lit(?:er|re)s?|l|milliliters?|ml|count|ct|packs?|pk'
+         r'|pieces?|pcs?|dozen|doz)(?![a-z])')
+
+
+def _per(name: str) -> str:
+    """A per-unit suffix ("/oz", " per lb", " a dozen", "/2 lb") with groups <name>_size and <name>_unit"""
+    return rf'\s*(?:/|\bper\b|\ban?\b)\s*(?:(?P<{name}_size>{_NUM})\s*)?(?P<{name}_unit>{_UNIT})'
+
+
+# One alternation scanned left to right in a single pass; earlier branches win at
+# the same position, so "2 for $5" is an offer, "12 oz" and "1/2 gal" sizes, not prices
+_TOKEN = re.compile(rf'''
+    (?P<multi>\d+)\s*(?:for\s*\$?|/\s*\$)\s*(?P<multi_total>{_NUM})         # 2 for $5, 3/$10
+  | \$\s*(?P<for_total>{_NUM})\s*for\s*(?P<for_count>\d+)                 # $5 for 2
+        (?!\d|\.\d|\s*{_UNIT}|\s*%)
+  | (?:\$\s*)?(?P<low>{_NUM})\s*(?:-|–|to)\s*\$?\s*(?P<high>{_NUM})
+        (?!\s*{_UNIT}|\s*%|\d)(?:{_per('range_per')})?     # $3.50 - $4.00 per lb
+  | (?P<numerator>\d+)\s*/\s*(?P<denominator>\d+)\s*-?\s*(?P<fraction_unit>{_UNIT})  # 1/2 gal
+  | (?:(?P<size_low>{_NUM})\s*(?:-|–|to)\s*)?(?P<size>{_NUM})\s*-?\s*(?P<unit>{_UNIT})  # 12 oz, 1.5-lb
+  | \b(?:was|reg(?:ular(?:ly)?)?\.?)(?:\s+price)?\s*:?\s*                    # was $4.99, reg. 2 for $6
+        (?:(?P<was_count>[1-9]\d*)\s*for\s*)?\$?\s*(?P<was>{_NUM})
+        (?:\s*(?P<was_cents>¢|cents?\b))?(?!\s*{_UNIT}|\s*%|\d)
+  | (?P<dozen>\bdozen\b)                                                    # a dozen eggs
+  | (?P<cents>\d+)\s*(?:¢|cents?\b)                                         # 99¢
+  | (?:(?P<dollar>\$)\s*)?(?P<amount>{_NUM})(?!\s*%|\d)                    # $3.99, 3.99
+        (?:{_per('per')})?                                     # $0.25/oz
+''', re.IGNORECASE | re.VERBOSE)
+_PUNCTUATION = re.compile(r'[\s.]')
+
+
+class ParsedPrice(NamedTuple):
+    price: Optional[float]       # shelf price of one item (a range's midpoint, or the multi-buy price per item)
+    low: Optional[float]         # range bounds; equal to price for a single price
+    high: Optional[float]
+    multi_buy: Optional[int]     # N in "N for $X"
+    deal_price: Optional[float]  # $X / N
+    size: Optional[float]        # package size in unit
+    unit: Optional[str]          # 'oz', 'fl oz' or 'ct'
+    unit_price: Optional[float]  # price per unit, comparable across package sizes
+
+
+EMPTY = ParsedPrice(None, None, None, None, None, None, None, None)
+
+
+def _number(text: str) -> float:
+    return float(text.replace(',', ''))
+
+
+def _plausible(price: float) -> bool:
+    return 0 < price < MAX_PRICE
+
+
+@lru_cache(maxsize=None)
+def normalize_unit(unit: str):
+    """(base unit, factor) for a unit as written ('Fl. Oz', 'lbs', 'Gallons'), or None"""
+    key = _PUNCTUATION.sub('', unit.lower())
+    if key not in UNITS and key.endswith('s'):
+        key = key[:-1]
+    return UNITS.get(key)
+
+
+def _parse(text: str) -> ParsedPrice:
+    price = low = high = multi_buy = deal_price = bare = was = None
+    size = unit = per_price = per_size = per_unit = None
+    for match in _TOKEN.finditer(text):
+        group = match.group
+        if group('was') is not None:
+            amount = _number(group('was')) / int(group('was_count') or 1)
+            if group('was_cents'):
+                amount /= 100
+            if was is None and _plausible(amount):
+                was = amount
+        elif group('multi') is not None or group('for_count') is not None:
+            count = int(group('multi') or group('for_count'))
+            total = _number(group('multi_total') or group('for_total'))
+            if multi_buy is None and count > 0 and _plausible(total / count):
+                multi_buy = count
+                deal_price = total / count
+        elif group('low') is not None:
+            bounds = sorted((_number(group('low')), _number(group('high'))))
+            if price is None and _plausible(bounds[0]) and _plausible(bounds[1]):
+                low, high = bounds
+                price = (low + high) / 2
+                if group('range_per_unit') is not None and normalize_unit(group('range_per_unit')):
+                    per_unit, factor = normalize_unit(group('range_per_unit'))
+                    per_price = price
+                    per_size = (_number(group('range_per_size')) if group('range_per_size') else 1.0) * factor
+        elif group('fraction_unit') is not None:
+            denominator = int(group('denominator'))
+            if size is None and denominator and normalize_unit(group('fraction_unit')):
+                unit, factor = normalize_unit(group('fraction_unit'))
+                size = int(group('numerator')) / denominator * factor
+        elif group('unit') is not None:
+            if size is None and normalize_unit(group('unit')):
+                unit, factor = normalize_unit(group('unit'))
+                amount = _number(group('size'))
+                if group('size_low') is not None:
+                    amount = (amount + _number(group('size_low'))) / 2
+                size = amount * factor
+        elif group('dozen') is not None:
+            if size is None:
+                size, unit = 12.0, 'ct'
+        elif group('cents') is not None:
+            if price is None:
+                price = low = high = int(group('cents')) / 100
+        else:
+            amount = _number(group('amount'))
+            if group('per_unit') is not None and normalize_unit(group('per_unit')):
+                if per_price is None and _plausible(amount):
+                    per_unit, factor = normalize_unit(group('per_unit'))
+                    per_price = amount
+                    per_size = (_number(group('per_size')) if group('per_size') else 1.0) * factor
+            elif not _plausible(amount):
+                continue
+            elif group('dollar') is not None:
+                if price is None:
+                    price = low = high = amount
+            elif bare is None:
+                bare = amount
+
+    # Precedence: $ price or range, then a per-unit quote ("$3.48 per gallon"),
+    # then a multi-buy offer, then a bare number (the reply to "answer with a number"),
+    # then a superseded "was" price when nothing else is quoted
+    if price is None and per_price is not None:
+        price = low = high = per_price
+        if size is None:
+            size, unit = per_size, per_unit
+    if price is None and deal_price is not None:
+        price = low = high = deal_price
+    if price is None and bare is not None:
+        price = low = high = bare
+    if price is None and was is not None:
+        price = low = high = was
+    if price is None:
+        return EMPTY._replace(size=size, unit=unit)
+
+    if size:
+        unit_price = price / size
+    elif per_price is not None:
+        size, unit, unit_price = per_size, per_unit, per_price / per_size
+    else:
+        unit_price = None
+    return ParsedPrice(
+        round(price, 2), round(low, 2), round(high, 2), multi_buy,
+        round(deal_price, 2) if deal_price is not None else None,
+        round(size, 3) if size else None, unit if size else None,
+        round(unit_price, 4) if unit_price is not None else None
+    )
+
+
+# Scraped listings repeat the same strings ("$3.98", "2 for $5") over and over
+parse_price_text = lru_cache(maxsize=65536)(_parse)
+parse_price_text.__doc__ = """Parse a price string from an LLM answer or a scraped listing into a ParsedPrice"""
+
+
+def parse_price(text) -> Optional[float]:
+    """Shelf price of one item in text, or None; the parse_fn for LLM answers and scrapers"""
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text) if 0 < text < MAX_PRICE else None
+    return parse_price_text(str(text)).price
+
+
+def _legacy_extract_price(text):
+    """The old openai_price_estimator.extract_price, kept only for the benchmark"""
+    prices = re.findall(r'\$?\d+\.?\d*', text)
+    if not prices:
+        return None
+    prices = [float(price.replace('$', '')) for price in prices]
+    if len(prices) > 1:
+        return round(sum(prices) / len(prices), 2)
+    return round(prices[0], 2)
+
+
+_SAMPLES = [
+    ('3.99', 3.99),
+    ('$3.98', 3.98),
+    ('The price of milk at Walmart is $3.48 per gallon.', 3.48),
+    ('Eggs typically cost between $2.50 and $3.00 - about $2.50 - $3.00 for a dozen.', 2.5),
+    ('$3.50 - $4.00', 3.75),
+    ('2 for $5', 2.5),
+    ('$2.99 each, or 2 for $5', 2.99),
+    ('Bread (20 oz loaf): $2.79', 2.79),
+    ('12oz box of cereal, $4.29', 4.29),
+    ('99¢', 0.99),
+    ('Butter, 1 lb: 4.49', 4.49),
+    ('$0.25/oz', 0.25),
+    ('Around 3.25 to 3.75 dollars', 3.5),
+    ('Price not found', None),
+    ('N/A', None),
+    ('In 2024 prices rose 10%', None),
+    ('As of 2025-05-20, milk costs $3.29', 3.29),
+    ('$4.99 a dozen', 4.99),
+    ('Orange Juice (1/2 gal) $3.99', 3.99),
+    ('$3.99 – $4.49 per lb', 4.24),
+    ('Was $4.99 now $3.99', 3.99),
+    ('$5 for 2', 2.5),
+]
+
+
+def benchmark_parser(n: int = 200000, seed: int = 0):
+    """Check the samples, then time cold and memoized parsing over a generated corpus"""
+    for text, expected in _SAMPLES:
+        assert parse_price(text) == expected, (text, parse_price_text(text), expected)
+    assert parse_price_text('Bread (20 oz loaf): $2.79').unit_price == round(2.79 / 20, 4)
+    assert parse_price_text('$3.48 per gallon').unit_price == round(3.48 / 128, 4)
+    assert parse_price_text('Orange Juice (1/2 gal) $3.99').size == 64.0
+    assert parse_price_text('$3.99 – $4.49 per lb')[5:7] == (16.0, 'oz')
+    print(f"{len(_SAMPLES)} sample strings parse as expected")
+
+    rng = np.random.default_rng(seed)
+    templates = [
+        '{p:.2f}', '${p:.2f}', 'About ${p:.2f} for a {s} oz package', '${p:.2f} - ${q:.2f}',
+        '{k} for ${t:.2f}', 'The current price is ${p:.2f} per gallon.', '{s} ct, ${p:.2f}',
+        'Estimated price: {p:.2f} dollars ({s}-lb bag)', '{c}¢', 'Price not found',
+    ]
+    prices = rng.uniform(0.5, 30, n)
+    picks = rng.integers(0, len(templates), n)
+    sizes = rng.integers(1, 64, n)
+    multis = rng.integers(2, 6, n)
+    corpus = [templates[t].format(p=p, q=p + 1, s=s, k=k, t=p * k * 0.9, c=int(p * 10) % 99 + 1)
+              for t, p, s, k in zip(picks, prices, sizes, multis)]
+
+    start = time.perf_counter()
+    for text in corpus:
+        _legacy_extract_price(text)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for text in corpus:
+        _parse(text)
+    cold = time.perf_counter() - start
+
+    # The memo only pays off when strings repeat; one pass over the corpus barely does
+    parse_price_text.cache_clear()
+    start = time.perf_counter()
+    for text in corpus:
+        parse_price_text(text)
+    unique = time.perf_counter() - start
+
+    # Scraper-like input: a few thousand distinct strings, heavily repeated
+    repeated = [corpus[i] for i in rng.integers(0, 5000, n)]
+    parse_price_text.cache_clear()
+    start = time.perf_counter()
+    for text in repeated:
+        parse_price_text(text)
+    memoized = time.perf_counter() - start
+    parse_price_text.cache_clear()
+
+    print(f"{n:,} strings/s (x legacy regex): legacy {n / legacy:,.0f}, "
+          f"parser {n / cold:,.0f} ({legacy / cold:.2f}x), "
+          f"memoized one pass {n / unique:,.0f} ({legacy / unique:.2f}x), "
+          f"memoized 5,000 repeated {n / memoized:,.0f} ({legacy / memoized:.2f}x)")
+
+
+if __name__ == "__main__":
+    benchmark_parser()
@@ -0,0 +1,109 @@
+import csv
+import os
+import tempfile
+import time
+from typing import List, Dict, Any, Iterator, Tuple, Union
+
+from price_records import PriceTable
+
+
+def _price_tuples(data) -> Iterator[Tuple[str, str, float, float]]:
+    """(item, store, price, distance) from a PriceTable or a list of price dicts"""
+    if isinstance(data, PriceTable):
+        for p in data.observations():
+            yield p.item, p.store, p.price, p.distance
+    else:
+        for p in data:
+            yield p['item'], p['store'], p['price'], p['distance']
+
+
+class PriceIndex:
+    """Single-pass (item, store) -> price index over a PriceTable or a list of price records"""
+
+    def __init__(self, data: Union[PriceTable, List[Dict[str, Any]]]):
+        self.prices: Dict[Tuple[str, str], float] = {}
+        self.store_totals: Dict[str, float] = {}
+        self.store_distances: Dict[str, float] = {}
+        items = set()
+
+        for item, store, price, distance in _price_tuples(data):
+            items.add(item)
+            # Keep the first observation for a cell, like the old next(...) scan did
+            self.prices.setdefault((item, store), price)
+            self.store_totals[store] = self.store_totals.get(store, 0.0) + price
+            self.store_distances.setdefault(store, distance)
+
+        self.stores = sorted(self.store_totals)
+        self.items = sorted(items)
+
+    def get(self, item: str, store: str):
+        """Return the price for an item at a store, or None"""
+        return self.prices.get((item, store))
+
+
+def iter_report_rows(data: Union[PriceTable, List[Dict[str, Any]]]) -> Iterator[List[str]]:
+    """Yield the rows of the item x store price comparison report"""
+    index = PriceIndex(data)
+    stores = index.stores
+    prices = index.prices
+
+    yield ['Item'] + stores
+
+    for item in index.items:
+        row = [item]
+        for store in stores:
+            price = prices.get((item, store))
+            row.append(f"${price:.2f}" if price is not None else "N/A")
+        yield row
+
+    # Summary row with average prices (averaged over the full item list)
+    item_count = len(index.items)
+    yield ['Average Price'] + [
+        f"${index.store_totals[store] / item_count:.2f}"
+        for store in stores
+    ]
+
+    # Row with store distances
+    yield ['Distance (miles)'] + [
+        f"{index.store_distances[store]:.1f}"
+        for store in stores
+    ]
+
+
+def write_pivot_report(data: Union[PriceTable, List[Dict[str, Any]]], filename: str):
+    """Stream the pivot report to a CSV file"""
+    with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerows(iter_report_rows(data))
+
+
+def _make_price_records(store_count: int, item_count: int) -> List[Dict[str, Any]]:
+    """Build synthetic price records for benchmarking"""
+    return [
+        {
+            'item': f"item {i}",
+            'store': f"store {s}",
+            'price': round(2 + ((s * 31 + i * 17) % 100) / 100, 2),
+            'distance': s / 10,
+            'date': '2025-01-01'
+        }
+        for s in range(store_count)
+        for i in range(item_count)
+    ]
+
+
+def benchmark_pivot_writer():
+    """Time the pivot writer at increasing record counts"""
+    filename = os.path.join(tempfile.gettempdir(), 'pivot_benchmark.csv')
+    print(f"{'stores':>8} {'items':>8} {'records':>10} {'seconds':>10} {'us/record':>10}")
+    for store_count, item_count in [(77, 57), (200, 200), (500, 500), (1000, 1000)]:
+        data = _make_price_records(store_count, item_count)
+        start = time.perf_counter()
+        write_pivot_report(data, filename)
+        elapsed = time.perf_counter() - start
+        print(f"{store_count:>8} {item_count:>8} {len(data):>10} {elapsed:>10.3f} "
+              f"{elapsed / len(data) * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    benchmark_pivot_writer()
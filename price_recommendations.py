@@ -0,0 +1,85 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+# Use default target margin of 20%
+TARGET_MARGIN = 0.20
+# Estimated cost as a share of the market average
+COST_RATIO = 0.7
+
+
+def calculate_price_recommendations(prices_df, stores_df, items_df, my_store_id=1):
+    """Per-item price and margin recommendations for my_store_id against the latest market prices"""
+    # Get latest prices
+    latest_date = prices_df['date'].max()
+    latest_prices = prices_df.loc[prices_df['date'] == latest_date, ['store_id', 'item_id', 'price']]
+    is_mine = (latest_prices['store_id'] == my_store_id).to_numpy()
+
+    # My price per item (first listing wins) and market statistics excluding my store
+    my_prices = latest_prices[is_mine].drop_duplicates('item_id').set_index('item_id')['price']
+    market = latest_prices[~is_mine].groupby('item_id', sort=False)['price'].agg(['mean', 'min', 'max'])
+
+    # Item details: first listing per item id
+    names = items_df.drop_duplicates('item_id').set_index('item_id')['name']
+    item_ids = items_df['item_id']
+
+    my_price = item_ids.map(my_prices).to_numpy(dtype=np.float64)
+    avg_price = item_ids.map(market['mean']).to_numpy(dtype=np.float64)
+    min_price = item_ids.map(market['min']).to_numpy(dtype=np.float64)
+    max_price = item_ids.map(market['max']).to_numpy(dtype=np.float64)
+
+    # NaN propagates through the arithmetic, so no per-value guards are needed
+    with np.errstate(divide='ignore', invalid='ignore'):
+        estimated_cost = avg_price * COST_RATIO
+        current_margin = (my_price - estimated_cost) / my_price
+        recommended_price = estimated_cost / (1 - TARGET_MARGIN)
+        difference = my_price - avg_price
+        difference_percent = np.where(avg_price != 0, difference / avg_price * 100, np.nan)
+
+    return pd.DataFrame({
+        'item_id': item_ids.to_numpy(),
+        'item_name': item_ids.map(names).to_numpy(),
+        'target_margin': TARGET_MARGIN,
+        'current_margin': current_margin,
+        'margin_gap': current_margin - TARGET_MARGIN,
+        'my_price': my_price,
+        'avg_price': avg_price,
+        'min_price': min_price,
+        'max_price': max_price,
+        'recommended_price': np.round(recommended_price, 2),
+        'price_difference': np.round(difference, 2),
+        'price_difference_percent': np.round(difference_percent, 1)
+    })
+
+
+def _benchmark_frames(items: int, stores: int, seed: int = 0):
+    """Two days of prices with gaps, so NaN paths are exercised"""
+    rng = np.random.default_rng(seed)
+    store_ids = np.repeat(np.arange(1, stores + 1, dtype=np.int32), items)
+    item_ids = np.tile(np.arange(1, items + 1, dtype=np.int32), stores)
+    keep = rng.random(store_ids.size) > 0.05
+    latest = pd.DataFrame({
+        'store_id': store_ids[keep],
+        'item_id': item_ids[keep],
+        'price': np.round(rng.uniform(0.5, 25, keep.sum()), 2),
+        'date': '2025-05-21'
+    })
+    previous = latest.head(1000).assign(date='2025-05-20')
+    prices_df = pd.concat([previous, latest], ignore_index=True)
+    stores_df = pd.DataFrame({'store_id': np.arange(1, stores + 1, dtype=np.int32)})
+    items_df = pd.DataFrame({'item_id': np.arange(1, items + 2, dtype=np.int32),
+                             'name': [f"item {i}" for i in range(1, items + 2)]})
+    return prices_df, stores_df, items_df
+
+
+def benchmark_recommendations(items: int = 10000, stores: int = 500):
+    """Time the vectorized recommendations at full size (parity: tests/test_price_recommendations.py)"""
+    prices_df, stores_df, items_df = _benchmark_frames(items, stores)
+    start = time.perf_counter()
+    calculate_price_recommendations(prices_df, stores_df, items_df)
+    elapsed = time.perf_counter() - start
+    print(f"{items} items x {stores} stores ({len(prices_df):,} rows): {elapsed:.3f}s")
+
+if __name__ == "__main__":
+    benchmark_recommendations()
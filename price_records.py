@@ -0,0 +1,242 @@
+import re
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import MISSING, asdict, dataclass, fields
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Sequence
+
+import numpy as np
+
+
+# Store-format words that don't change the chain: "Walmart Neighborhood Market", "Rouse's Market"
+_FORMAT_SUFFIX = re.compile(r'\s+(?:supercenter|neighborhood market|super market|supermarket|market|store|no \d+|\d+)$')
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+@lru_cache(maxsize=None)
+def brand_key(text: str) -> str:
+    """Normalized chain key for a brand tag or store name ('' for none)"""
+    key = _NON_ALNUM.sub(' ', text.lower().replace("'", '').replace('\u2019', '')).strip()
+    while True:
+        stripped = _FORMAT_SUFFIX.sub('', key)
+        if stripped == key or not stripped:
+            return key
+        key = stripped
+
+
+@dataclass(slots=True)
+class Store:
+    """One store branch; flat lat/lng instead of a nested location dict
+
+    osm_id is the branch's OpenStreetMap node id (0 when unknown); chain is the
+    brand_key of its brand tag or name, '' for unbranded placeholders.
+    """
+    name: str
+    address: str
+    lat: float
+    lng: float
+    distance: float
+    category: str
+    type: str
+    brand: str
+    operator: str
+    osm_id: int = 0
+    chain: str = ''
+
+    @property
+    def key(self) -> str:
+        """Stable per-branch identity"""
+        return f"osm:{self.osm_id}" if self.osm_id else f"{self.name}@{self.lat},{self.lng}"
+
+    def to_row(self) -> Dict[str, Any]:
+        """Flat dict for CSV output (lat and lng as their own columns)"""
+        return asdict(self)
+
+
+def branch_labels(stores: Sequence[Store]) -> List[str]:
+    """Display names that tell same-named branches apart by street, or node id"""
+    counts = Counter(store.name for store in stores)
+    streets = Counter((store.name, store.address) for store in stores)
+    labels = []
+    for store in stores:
+        if counts[store.name] == 1:
+            labels.append(store.name)
+        elif store.address != 'N/A' and streets[(store.name, store.address)] == 1:
+            labels.append(f"{store.name} ({store.address})")
+        else:
+            labels.append(f"{store.name} #{store.osm_id}" if store.osm_id else
+                          f"{store.name} ({store.lat:.4f}, {store.lng:.4f})")
+    return labels
+
+
+STORE_FIELDS = [f.name for f in fields(Store)]
+# Rows saved before osm_id/chain existed carry only these
+REQUIRED_STORE_FIELDS = {f.name for f in fields(Store) if f.default is MISSING}
+
+
+@dataclass(slots=True)
+class PriceObservation:
+    """One row of a PriceTable, materialized only for display"""
+    item: str
+    store: str
+    price: float
+    distance: float
+    date: str
+
+
+class PriceTable:
+    """Struct-of-arrays price observations
+
+    Each observation is an int32 store code, an int32 item code, a float64 price and
+    an int16 date code; names and dates are stored once, interned, in the lookup
+    lists, and distance comes from the store rather than being repeated per row.
+    """
+
+    __slots__ = ('stores', 'items', 'dates', 'store_codes', 'item_codes', 'date_codes', 'prices', '_cache')
+
+    def __init__(self, stores: Sequence[Store], items: Sequence[str], dates: Sequence[str],
+                 store_codes: np.ndarray, item_codes: np.ndarray, date_codes: np.ndarray, prices: np.ndarray):
+        self.stores = list(stores)
+        self.items = [sys.intern(item) for item in items]
+        self.dates = [sys.intern(day) for day in dates]
+        self.store_codes = np.asarray(store_codes, dtype=np.int32)
+        self.item_codes = np.asarray(item_codes, dtype=np.int32)
+        self.date_codes = np.asarray(date_codes, dtype=np.int16)
+        self.prices = np.asarray(prices, dtype=np.float64)
+        # Derived views (labels, brand rollup), computed once per table
+        self._cache = {}
+
+    @classmethod
+    def from_matrix(cls, stores: Sequence[Store], items: Sequence[str], matrix: np.ndarray,
+                    day: str) -> 'PriceTable':
+        """One day's stores x items price matrix, flattened store-major"""
+        store_count, item_count = matrix.shape
+        return cls(
+            stores, items, [day],
+            np.repeat(np.arange(store_count, dtype=np.int32), item_count),
+            np.tile(np.arange(item_count, dtype=np.int32), store_count),
+            np.zeros(store_count * item_count, dtype=np.int16),
+            np.round(matrix, 2).reshape(-1)
+        )
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    @property
+    def store_names(self) -> List[str]:
+        return [store.name for store in self.stores]
+
+    @property
+    def store_labels(self) -> List[str]:
+        """Per-branch display names (see branch_labels)"""
+        if 'labels' not in self._cache:
+            self._cache['labels'] = branch_labels(self.stores)
+        return self._cache['labels']
+
+    @property
+    def distances(self) -> np.ndarray:
+        """Per-observation distance, looked up through the store code"""
+        return np.array([store.distance for store in self.stores], dtype=np.float64)[self.store_codes]
+
+    def observations(self) -> Iterator[PriceObservation]:
+        """Iterate rows as PriceObservation objects, one at a time"""
+        names = self.store_labels
+        distances = [store.distance for store in self.stores]
+        for s, i, d, price in zip(self.store_codes.tolist(), self.item_codes.tolist(),
+                                  self.date_codes.tolist(), self.prices.tolist()):
+            yield PriceObservation(self.items[i], names[s], price, distances[s], self.dates[d])
+
+    def brand_codes(self) -> np.ndarray:
+        """Per-store brand index into rollup().stores"""
+        self.rollup()
+        return self._cache['brand_codes']
+
+    def rollup(self) -> 'PriceTable':
+        """Brand-level table: one row per (brand, item, date) holding the mean branch price
+
+        Each brand is a Store named after its most common brand tag (or name),
+        with the address and distance of its nearest branch. Unbranded stores stay on their own. Cached,
+        so brand-level analysis and reports never re-fetch or re-aggregate.
+        """
+        if 'rollup' in self._cache:
+            return self._cache['rollup']
+
+        groups, brand_codes = {}, np.empty(len(self.stores), dtype=np.int32)
+        for code, (store, label) in enumerate(zip(self.stores, self.store_labels)):
+            brand_codes[code] = groups.setdefault(store.chain or f"\0{label}", len(groups))
+        members = [[] for _ in groups]
+        for code, brand in enumerate(brand_codes.tolist()):
+            members[brand].append(self.stores[code])
+        brands = []
+        for branches in members:
+            nearest = min(branches, key=lambda store: store.distance)
+            names = Counter(s.brand if s.brand != 'N/A' else s.name for s in branches)
+            name = names.most_common(1)[0][0] if nearest.chain else self.store_labels[self.stores.index(nearest)]
+            brands.append(Store(name, nearest.address, nearest.lat, nearest.lng, nearest.distance, nearest.category, nearest.type,
+                                nearest.brand, nearest.operator, 0, nearest.chain))
+
+        # Mean price per (brand, item, date) with one bincount over a combined key
+        item_count, date_count = len(self.items), len(self.dates)
+        keys = (brand_codes[self.store_codes].astype(np.int64) * item_count + self.item_codes) * date_count \
+            + self.date_codes
+        unique, inverse = np.unique(keys, return_inverse=True)
+        means = np.bincount(inverse, weights=self.prices) / np.bincount(inverse)
+        table = PriceTable(brands, self.items, self.dates, unique // (item_count * date_count),
+                           unique // date_count % item_count, unique % date_count, np.round(means, 2))
+        self._cache['brand_codes'] = brand_codes
+        self._cache['rollup'] = table
+        return table
+
+    def nbytes(self) -> int:
+        """Bytes held by the observation arrays"""
+        return sum(a.nbytes for a in (self.store_codes, self.item_codes, self.date_codes, self.prices))
+
+
+def _old_store(i: int) -> Dict[str, Any]:
+    return {'name': f"Store {i}", 'address': f"{i} Main Street",
+            'location': {'lat': 30.0 + i * 1e-4, 'lng': -91.0 - i * 1e-4},
+            'distance': i / 100, 'category': 'supermarket', 'type': 'supermarket',
+            'brand': 'N/A', 'operator': 'N/A'}
+
+
+def benchmark_memory(stores: int = 10000, items: int = 100):
+    """tracemalloc peak for stores x items observations: dicts (before) vs PriceTable (after)"""
+    rng = np.random.default_rng(0)
+    matrix = 2 + rng.integers(0, 100, (stores, items)) / 100
+    item_names = [f"item {i}" for i in range(items)]
+    today = '2025-05-20'
+
+    tracemalloc.start()
+    old_stores = [_old_store(i) for i in range(stores)]
+    prices = []
+    for store, row in zip(old_stores, matrix.tolist()):
+        distance = round(store['distance'], 1)
+        for item, price in zip(item_names, row):
+            prices.append({'item': item, 'store': store['name'], 'price': round(price, 2),
+                           'distance': distance, 'date': today})
+    before = tracemalloc.get_traced_memory()[1]
+    del old_stores, prices
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    new_stores = []
+    for i in range(stores):
+        old = _old_store(i)
+        new_stores.append(Store(sys.intern(old['name']), old['address'], old['location']['lat'],
+                                old['location']['lng'], old['distance'], old['category'], old['type'],
+                                old['brand'], old['operator']))
+    table = PriceTable.from_matrix(new_stores, item_names, matrix, today)
+    after = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print(f"{stores * items:,} observations ({stores:,} stores x {items} items): "
+          f"dicts {before / 1e6:.0f} MB, PriceTable + Store {after / 1e6:.0f} MB "
+          f"(observation arrays {table.nbytes() / 1e6:.0f} MB)")
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    benchmark_memory()
+    print(f"({time.perf_counter() - start:.1f}s)")
@@ -0,0 +1,106 @@
+import time
+import zlib
+from datetime import date, timedelta
+from typing import List, Sequence
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SEED = 20250520
+
+
+def name_seed(name: str) -> int:
+    """Stable 32-bit seed for a name (unlike hash(), not salted per process)"""
+    return zlib.crc32(name.encode('utf-8'))
+
+
+def simulate_flat_prices(store_names: Sequence[str], item_count: int,
+                         seed: int = DEFAULT_SEED) -> np.ndarray:
+    """stores x items matrix of placeholder prices in [2.00, 2.99]
+
+    Each store's row depends only on the seed and the store name, so adding or
+    reordering stores doesn't change the prices of the others.
+    """
+    prices = np.empty((len(store_names), item_count), dtype=np.float64)
+    for row, name in enumerate(store_names):
+        rng = np.random.default_rng([seed, name_seed(name)])
+        prices[row] = 2 + rng.integers(0, 100, item_count) / 100
+    return prices
+
+
+def simulate_price_cube(base_prices: Sequence[float], store_multipliers: Sequence[float],
+                        days: int, seed: int = DEFAULT_SEED, variation: float = 0.05) -> np.ndarray:
+    """days x stores x items price cube: base price x store multiplier x uniform noise"""
+    base = np.asarray(base_prices, dtype=np.float64)
+    multipliers = np.asarray(store_multipliers, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    noise = rng.uniform(1 - variation, 1 + variation, size=(days, multipliers.size, base.size))
+    cube = noise
+    cube *= multipliers[None, :, None]
+    cube *= base[None, None, :]
+    return np.round(cube, 2)
+
+
+def simulate_price_days(base_prices: Sequence[float], store_multipliers: Sequence[float],
+                        dates: Sequence[str], seed: int = DEFAULT_SEED, variation: float = 0.05) -> np.ndarray:
+    """Like simulate_price_cube, but each day's slice is seeded by its date
+
+    A day simulates to the same prices whether it is generated alone or as part of
+    a longer history, so incremental runs only need to simulate the new days.
+    """
+    base = np.asarray(base_prices, dtype=np.float64)
+    multipliers = np.asarray(store_multipliers, dtype=np.float64)
+    cube = np.empty((len(dates), multipliers.size, base.size), dtype=np.float64)
+    for day, date_str in enumerate(dates):
+        rng = np.random.default_rng([seed, date.fromisoformat(date_str).toordinal()])
+        cube[day] = rng.uniform(1 - variation, 1 + variation, size=(multipliers.size, base.size))
+    cube *= multipliers[None, :, None]
+    cube *= base[None, None, :]
+    return np.round(cube, 2)
+
+
+def cube_dates(days: int, end: date = None) -> List[str]:
+    """ISO dates for the cube's day axis, most recent first"""
+    end = end or date.today()
+    return [(end - timedelta(days=day)).isoformat() for day in range(days)]
+
+
+def cube_to_frame(cube: np.ndarray, dates: Sequence[str], store_ids: Sequence,
+                  item_ids: Sequence) -> pd.DataFrame:
+    """Flatten a days x stores x items cube into long (date, store_id, item_id, price) rows"""
+    days, stores, items = cube.shape
+    return pd.DataFrame({
+        'date': np.repeat(np.asarray(dates), stores * items),
+        'store_id': np.tile(np.repeat(np.asarray(store_ids), items), days),
+        'item_id': np.tile(np.asarray(item_ids), days * stores),
+        'price': cube.reshape(-1)
+    })
+
+
+def save_cube(path: str, cube: np.ndarray, dates: Sequence[str], store_ids: Sequence,
+              item_ids: Sequence):
+    """Write the cube and its axes to a compressed .npz file"""
+    np.savez_compressed(
+        path,
+        price=cube.astype(np.float32),
+        date=np.asarray(dates),
+        store_id=np.asarray(store_ids),
+        item_id=np.asarray(item_ids)
+    )
+
+
+def load_cube(path: str):
+    """Read a cube written by save_cube as (cube, dates, store_ids, item_ids)"""
+    with np.load(path) as data:
+        return (data['price'].astype(np.float64), data['date'].tolist(),
+                data['store_id'].tolist(), data['item_id'].tolist())
+
+
+if __name__ == "__main__":
+    days, stores, items = 365, 500, 100
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    cube = simulate_price_cube(rng.uniform(1, 25, items), rng.uniform(0.8, 1.3, stores), days)
+    frame = cube_to_frame(cube, cube_dates(days), np.arange(1, stores + 1), np.arange(1, items + 1))
+    elapsed = time.perf_counter() - start
+    print(f"{len(frame):,} prices ({days} days x {stores} stores x {items} items) in {elapsed:.2f}s")
@@ -0,0 +1,144 @@
+import os
+import time
+from datetime import date, timedelta
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+# Rolling windows kept in the snapshot, in calendar days ending at the latest date
+WINDOWS = {'7d': 7, '30d': 30}
+
+PAIR = ['store_id', 'item_id']
+LATEST_COLUMNS = PAIR + ['date', 'price']
+ROLLING_COLUMNS = [f"{stat}_{window}" for window in WINDOWS for stat in ('mean', 'min', 'max', 'days')]
+
+
+def window_start(as_of: str, days: int) -> str:
+    """First date (inclusive) of a days-long window ending on as_of"""
+    return (date.fromisoformat(as_of) - timedelta(days=days - 1)).isoformat()
+
+
+def _latest_rows(prices_df: pd.DataFrame) -> pd.DataFrame:
+    """Latest observation per (store, item); among equal dates the later row wins"""
+    latest = prices_df[LATEST_COLUMNS].astype({'date': str})
+    latest = latest.sort_values('date', kind='stable').drop_duplicates(PAIR, keep='last')
+    return latest.astype({'store_id': 'int32', 'item_id': 'int32', 'price': 'float64'})
+
+
+def rolling_aggregates(window_df: pd.DataFrame, as_of: str) -> pd.DataFrame:
+    """Mean/min/max price and days observed per (store, item) for each window ending on as_of
+
+    window_df only needs to cover the longest window; older rows are ignored.
+    """
+    dates = window_df['date'].astype(str)
+    frames = []
+    for window, days in WINDOWS.items():
+        in_window = window_df.loc[(dates >= window_start(as_of, days)).to_numpy() & (dates <= as_of).to_numpy()]
+        stats = in_window.groupby(PAIR, sort=False)['price'].agg(['mean', 'min', 'max', 'count'])
+        stats.columns = [f"mean_{window}", f"min_{window}", f"max_{window}", f"days_{window}"]
+        frames.append(stats)
+    return pd.concat(frames, axis=1)
+
+
+def _with_rolling(latest: pd.DataFrame, rolling: pd.DataFrame) -> pd.DataFrame:
+    snapshot = latest.join(rolling, on=PAIR)
+    for window in WINDOWS:
+        snapshot[f"days_{window}"] = snapshot[f"days_{window}"].fillna(0).astype('int16')
+    return snapshot[LATEST_COLUMNS + ROLLING_COLUMNS].sort_values(PAIR, ignore_index=True)
+
+
+def build_snapshot(prices_df: pd.DataFrame) -> pd.DataFrame:
+    """Snapshot of a full price history: latest price per (store, item) plus rolling aggregates"""
+    latest = _latest_rows(prices_df)
+    if latest.empty:
+        return _with_rolling(latest, rolling_aggregates(prices_df.iloc[:0], '1970-01-01'))
+    return _with_rolling(latest, rolling_aggregates(prices_df, latest['date'].max()))
+
+
+def update_snapshot(snapshot: pd.DataFrame, new_prices: pd.DataFrame,
+                    read_window: Callable[[str], pd.DataFrame]) -> pd.DataFrame:
+    """Snapshot after new_prices have been stored, without rescanning the history
+
+    Latest prices are merged in directly. Rolling aggregates are recomputed from
+    read_window(start), the stored prices from start on, only when the new rows
+    fall inside the longest window or move its end; so the cost is bounded by the
+    window, not by how much history there is.
+    """
+    if new_prices.empty:
+        return snapshot
+    old_as_of = snapshot['date'].max() if not snapshot.empty else None
+    latest = _latest_rows(pd.concat([snapshot[LATEST_COLUMNS], new_prices[LATEST_COLUMNS]], ignore_index=True))
+    if latest.empty:
+        return snapshot
+    as_of = latest['date'].max()
+    start = window_start(as_of, max(WINDOWS.values()))
+    if as_of == old_as_of and new_prices['date'].astype(str).max() < start:
+        # Backfill older than every window: aggregates are unchanged
+        rolling = snapshot.set_index(PAIR)[ROLLING_COLUMNS]
+    else:
+        rolling = rolling_aggregates(read_window(start), as_of)
+    return _with_rolling(latest, rolling)
+
+
+def write_snapshot(snapshot: pd.DataFrame, path: str):
+    """Replace the snapshot file atomically, so readers never see a partial write"""
+    tmp_path = f"{path}.tmp"
+    snapshot.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str) -> Optional[pd.DataFrame]:
+    return pd.read_parquet(path) if os.path.exists(path) else None
+
+
+def benchmark_snapshot(days: int = 365, stores: int = 100, items: int = 200):
+    """Dashboard read and ingest cost with the snapshot vs scanning the full history"""
+    import shutil
+    import tempfile
+    import price_store
+    from price_recommendations import calculate_price_recommendations
+    from price_simulator import simulate_price_cube, cube_to_frame, cube_dates
+
+    data_dir = tempfile.mkdtemp()
+    rng = np.random.default_rng(0)
+    base, multipliers = rng.uniform(1, 25, items), rng.uniform(0.8, 1.3, stores)
+    store_ids, item_ids = np.arange(1, stores + 1), np.arange(1, items + 1)
+    dates = cube_dates(days + 1)
+    cube = simulate_price_cube(base, multipliers, days + 1)
+    history = cube_to_frame(cube[:-1], dates[:-1], store_ids, item_ids)
+    new_day = cube_to_frame(cube[-1:], dates[-1:], store_ids, item_ids)
+    # Some pairs go unobserved on the newest day
+    new_day = new_day[rng.random(len(new_day)) > 0.1]
+    stores_df = pd.DataFrame({'store_id': store_ids})
+    items_df = pd.DataFrame({'item_id': item_ids, 'name': [f"item {i}" for i in item_ids]})
+    try:
+        price_store.write_prices(history, data_dir)
+        print(f"{len(history):,} stored price rows ({days} days x {stores} stores x {items} items)")
+
+        start = time.perf_counter()
+        price_store.ingest_prices(new_day, data_dir)
+        ingest = time.perf_counter() - start
+        start = time.perf_counter()
+        full = build_snapshot(price_store.read_prices(data_dir))
+        rebuild = time.perf_counter() - start
+        snapshot = price_store.read_latest(data_dir)
+        pd.testing.assert_frame_equal(snapshot, full)
+        print(f"ingest one day incl. incremental snapshot update {ingest:.2f}s; "
+              f"full snapshot rebuild {rebuild:.2f}s (same result)")
+
+        start = time.perf_counter()
+        before = calculate_price_recommendations(price_store.read_prices(data_dir), stores_df, items_df)
+        scan = time.perf_counter() - start
+        start = time.perf_counter()
+        after = calculate_price_recommendations(price_store.read_latest(data_dir), stores_df, items_df)
+        snap = time.perf_counter() - start
+        pd.testing.assert_frame_equal(after, before)
+        print(f"dashboard recommendations: full history {scan * 1000:.0f} ms, "
+              f"snapshot ({len(snapshot):,} rows) {snap * 1000:.0f} ms")
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    benchmark_snapshot()
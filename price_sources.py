@@ -0,0 +1,480 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from types import SimpleNamespace
+from typing import Dict, Hashable, Iterable, List, NamedTuple, Optional, Protocol, Sequence
+
+import numpy as np
+import pandas as pd
+
+from data_collector import BASE_PRICES, STORE_MULTIPLIERS
+from llm_pricing import EstimationPipeline, TokenBucket
+from price_parser import parse_price
+from price_simulator import DEFAULT_SEED, name_seed, simulate_flat_prices, simulate_price_days
+from price_store import DATA_DIR, ingest_prices, load_dashboard_tables
+from store_scrapers import SCRAPERS, ScrapeSession, StoreScraper, scraper_for_url
+
+logger = logging.getLogger(__name__)
+
+# A unit is filled once it has an observation at least this confident; cheaper
+# answers below it stay in the stream, but the unit goes on to the next cost tier
+MIN_CONFIDENCE = 0.5
+
+OBSERVATION_COLUMNS = ['store_id', 'item_id', 'price', 'date', 'source', 'confidence']
+
+
+class WorkUnit(NamedTuple):
+    """One store x item price to fill"""
+    store_id: int
+    item_id: int
+    store_name: str
+    item_name: str
+    website: str = ''
+    staleness: float = math.inf  # Days since the last stored price (inf when never seen)
+    store_key: str = ''          # Branch identity for the simulator; store_name when empty
+
+
+class Observation(NamedTuple):
+    """A price with where it came from and how far to trust it (0-1)"""
+    store_id: int
+    item_id: int
+    price: float
+    date: str
+    source: str
+    confidence: float
+
+
+class PriceSource(Protocol):
+    """Anything that can price store x item work units
+
+    Sources run in tiers of equal cost, cheapest first; a tier only sees the
+    units earlier tiers left without a confident answer. Units with the same
+    batch_key go to fetch together, at most concurrency fetches per source are
+    in flight, and at most limit units (stalest first) are offered per run.
+    """
+    name: str
+    cost: float
+    concurrency: int
+    limit: Optional[int]
+
+    def covers(self, unit: WorkUnit) -> bool: ...
+
+    def batch_key(self, unit: WorkUnit) -> Hashable: ...
+
+    async def fetch(self, units: List[WorkUnit], day: str) -> List[Optional[Observation]]: ...
+
+
+def observe(unit: WorkUnit, price: Optional[float], day: str, source: str,
+            confidence: float) -> Optional[Observation]:
+    """Observation of unit's price, or None when the source had no answer"""
+    if price is None:
+        return None
+    return Observation(unit.store_id, unit.item_id, float(price), day, source, confidence)
+
+
+class SnapshotSource:
+    """Stored latest prices (price_store.read_latest), trusted less as they age"""
+    name = 'snapshot'
+    cost = 0.0
+    concurrency = 1
+    limit = None
+
+    def __init__(self, latest_df: pd.DataFrame, confidence: float = 0.9, half_life_days: float = 7.0):
+        self.confidence = confidence
+        self.half_life_days = half_life_days
+        self.prices = dict(zip(zip(latest_df['store_id'].tolist(), latest_df['item_id'].tolist()),
+                               zip(latest_df['price'].tolist(), latest_df['date'].astype(str).tolist())))
+
+    def covers(self, unit: WorkUnit) -> bool:
+        return (unit.store_id, unit.item_id) in self.prices
+
+    def batch_key(self, unit: WorkUnit) -> Hashable:
+        return None
+
+    async def fetch(self, units: List[WorkUnit], day: str) -> List[Optional[Observation]]:
+        today = date.fromisoformat(day)
+        decay = {}
+        observations = []
+        for unit in units:
+            price, seen = self.prices[(unit.store_id, unit.item_id)]
+            if seen not in decay:
+                age = max((today - date.fromisoformat(seen)).days, 0)
+                decay[seen] = self.confidence * 0.5 ** (age / self.half_life_days)
+            # Provenance keeps the date the price was actually seen
+            observations.append(observe(unit, price, seen, self.name, decay[seen]))
+        return observations
+
+
+class SampledSource:
+    """data_collector's price model: base price x store multiplier, with noise seeded by day and store"""
+    name = 'sampled'
+    cost = 0.0
+    concurrency = 1
+    limit = None
+
+    def __init__(self, base_prices: Optional[Dict[str, float]] = None,
+                 store_multipliers: Optional[Dict[str, float]] = None,
+                 seed: int = DEFAULT_SEED, confidence: float = 0.2):
+        self.base_prices = base_prices or BASE_PRICES
+        self.store_multipliers = store_multipliers or STORE_MULTIPLIERS
+        self.seed = seed
+        self.confidence = confidence
+        self.items = list(self.base_prices)
+        self.columns = {name: i for i, name in enumerate(self.items)}
+
+    def multiplier(self, store_name: str) -> float:
+        """The multiplier of the longest chain name store_name starts with, else 1.0"""
+        chains = [chain for chain in self.store_multipliers if store_name.startswith(chain)]
+        return self.store_multipliers[max(chains, key=len)] if chains else 1.0
+
+    def covers(self, unit: WorkUnit) -> bool:
+        return unit.item_name in self.columns
+
+    def batch_key(self, unit: WorkUnit) -> Hashable:
+        return None
+
+    async def fetch(self, units: List[WorkUnit], day: str) -> List[Optional[Observation]]:
+        bases = [self.base_prices[name] for name in self.items]
+        rows = {}
+        observations = []
+        for unit in units:
+            if unit.store_name not in rows:
+                # Seeded per store as well as per day, so a price doesn't depend on the batch
+                seed = (self.seed << 32) | name_seed(unit.store_name)
+                rows[unit.store_name] = simulate_price_days(
+                    bases, [self.multiplier(unit.store_name)], [day], seed)[0, 0]
+            price = rows[unit.store_name][self.columns[unit.item_name]]
+            observations.append(observe(unit, price, day, self.name, self.confidence))
+        return observations
+
+
+class SimulatedSource:
+    """GroceryPriceComparer.get_prices' placeholder prices, fixed per branch and item id"""
+    name = 'simulated'
+    cost = 0.0
+    concurrency = 1
+    limit = None
+
+    def __init__(self, seed: int = DEFAULT_SEED, confidence: float = 0.1):
+        self.seed = seed
+        self.confidence = confidence
+
+    def covers(self, unit: WorkUnit) -> bool:
+        return True
+
+    def batch_key(self, unit: WorkUnit) -> Hashable:
+        return None
+
+    async def fetch(self, units: List[WorkUnit], day: str) -> List[Optional[Observation]]:
+        keys = list(dict.fromkeys(unit.store_key or unit.store_name for unit in units))
+        rows = {key: row for key, row in zip(keys, simulate_flat_prices(
+            keys, max(unit.item_id for unit in units) + 1, self.seed))}
+        return [observe(unit, rows[unit.store_key or unit.store_name][unit.item_id], day,
+                        self.name, self.confidence) for unit in units]
+
+
+class ScraperSource:
+    """Prices from the chain's website: one search page per chain and item, however many branches"""
+    name = 'scraper'
+    cost = 1.0
+
+    def __init__(self, session: Optional[ScrapeSession] = None,
+                 scrapers: Optional[Dict[str, StoreScraper]] = None,
+                 concurrency: int = 4, limit: Optional[int] = None, confidence: float = 0.8):
+        self.session = session or ScrapeSession()
+        self.scrapers = scrapers or SCRAPERS
+        self.concurrency = concurrency
+        self.limit = limit
+        self.confidence = confidence
+        self._matches = {}
+
+    def scraper(self, unit: WorkUnit) -> Optional[StoreScraper]:
+        """Adapter for the store's website, or the one whose name appears in the store's name"""
+        key = (unit.website, unit.store_name)
+        if key not in self._matches:
+            found = scraper_for_url(unit.website, self.scrapers) if unit.website else None
+            if found is None:
+                words = set(re.findall(r'[a-z]+', unit.store_name.lower()))
+                found = next((s for s in self.scrapers.values() if s.name in words), None)
+            self._matches[key] = found
+        return self._matches[key]
+
+    def covers(self, unit: WorkUnit) -> bool:
+        return self.scraper(unit) is not None
+
+    def batch_key(self, unit: WorkUnit) -> Hashable:
+        return self.scraper(unit).name
+
+    async def fetch(self, units: List[WorkUnit], day: str) -> List[Optional[Observation]]:
+        scraper = self.scraper(units[0])
+        items = list(dict.fromkeys(unit.item_name for unit in units))
+        pages = await self.session.scrape_async([(scraper, item) for item in items])
+        prices = {page['item']: parse_price(page['price']) for page in pages}
+        return [observe(unit, prices[unit.item_name], day, self.name, self.confidence) for unit in units]
+
+
+class LLMSource:
+    """Chat-model estimates, one basket prompt per store name"""
+    name = 'llm'
+    cost = 10.0
+
+    def __init__(self, pipeline: Optional[EstimationPipeline] = None, concurrency: int = 8,
+                 limit: Optional[int] = None, confidence: float = 0.6):
+        self.pipeline = pipeline or EstimationPipeline()
+        self.concurrency = concurrency
+        self.limit = limit
+        self.confidence = confidence
+        self._bucket = None
+        self._loop = None
+
+    def covers(self, unit: WorkUnit) -> bool:
+        return True
+
+    def batch_key(self, unit: WorkUnit) -> Hashable:
+        return unit.store_name
+
+    async def fetch(self, units: List[WorkUnit], day: str) -> List[Optional[Observation]]:
+        # One rate limit across all of a run's baskets
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._bucket = TokenBucket(self.pipeline.requests_per_minute / 60.0)
+            self._loop = loop
+        items = list(dict.fromkeys(unit.item_name for unit in units))
+        results = await self.pipeline.estimate_baskets_async([(units[0].store_name, items)], day,
+                                                             bucket=self._bucket)
+        prices = {result['item']: result['price'] for result in results[0]}
+        return [observe(unit, prices[unit.item_name], day, self.name, self.confidence) for unit in units]
+
+
+class PriceScheduler:
+    """Fan store x item work units out over price sources, expensive sources only for the gaps"""
+
+    def __init__(self, sources: Sequence[PriceSource], min_confidence: float = MIN_CONFIDENCE):
+        if not sources:
+            raise ValueError("PriceScheduler needs at least one source")
+        names = [source.name for source in sources]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Source names must be distinct: {names}")
+        self.sources = list(sources)
+        self.min_confidence = min_confidence
+        self.stats = {name: {'units': 0, 'batches': 0, 'observations': 0, 'filled': 0, 'seconds': 0.0}
+                      for name in names}
+
+    async def _run_source(self, source: PriceSource, units: List[WorkUnit], day: str) -> List[Observation]:
+        covered = sorted((unit for unit in units if source.covers(unit)), key=lambda u: -u.staleness)
+        if source.limit is not None:
+            covered = covered[:source.limit]
+        # Batches are queued in order of their stalest unit; the semaphore serves them FIFO
+        batches = defaultdict(list)
+        for unit in covered:
+            batches[source.batch_key(unit)].append(unit)
+        semaphore = asyncio.Semaphore(max(1, source.concurrency))
+
+        async def fetch(batch: List[WorkUnit]) -> List[Optional[Observation]]:
+            async with semaphore:
+                try:
+                    return await source.fetch(batch, day)
+                except Exception as e:
+                    logger.error(f"{source.name} failed on {len(batch)} units: {e}")
+                    return []
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(fetch(batch) for batch in batches.values()))
+        found = [observation for result in results for observation in result if observation is not None]
+        stats = self.stats[source.name]
+        stats['units'] += len(covered)
+        stats['batches'] += len(batches)
+        stats['observations'] += len(found)
+        stats['filled'] += sum(observation.confidence >= self.min_confidence for observation in found)
+        stats['seconds'] += time.perf_counter() - start
+        return found
+
+    async def run_async(self, units: Iterable[WorkUnit], day: Optional[str] = None) -> pd.DataFrame:
+        """Every observation made for units, cheapest tier first, with source and confidence"""
+        day = day or date.today().isoformat()
+        units = list(units)
+        filled = set()
+        observations = []
+        for cost in sorted({source.cost for source in self.sources}):
+            pending = [unit for unit in units if (unit.store_id, unit.item_id) not in filled]
+            if not pending:
+                break
+            tier = [source for source in self.sources if source.cost == cost]
+            for found in await asyncio.gather(*(self._run_source(source, pending, day) for source in tier)):
+                observations.extend(found)
+                filled.update((o.store_id, o.item_id) for o in found if o.confidence >= self.min_confidence)
+        frame = pd.DataFrame(observations, columns=OBSERVATION_COLUMNS)
+        return frame.astype({'store_id': 'int32', 'item_id': 'int32', 'price': 'float64', 'confidence': 'float64'})
+
+    def run(self, units: Iterable[WorkUnit], day: Optional[str] = None) -> pd.DataFrame:
+        """Blocking wrapper around run_async"""
+        units = list(units)
+        start = time.perf_counter()
+        frame = asyncio.run(self.run_async(units, day))
+        logger.info(f"{len(frame)} observations for {len(units)} units in {time.perf_counter() - start:.1f}s: "
+                    f"{self.stats}")
+        return frame
+
+
+def store_keys(stores_df: pd.DataFrame) -> List[str]:
+    """Per-branch identity of each row, as Store.key: the OSM node, else name and position, else store_id"""
+    names = stores_df['store_name'].astype(str).tolist()
+    if 'osm_id' in stores_df:
+        osm_ids = stores_df['osm_id'].fillna(0).astype('int64').tolist()
+    else:
+        osm_ids = [0] * len(stores_df)
+    lng = 'lng' if 'lng' in stores_df else 'lon'
+    if 'lat' in stores_df and lng in stores_df:
+        places = [f"{name}@{lat},{lon}" for name, lat, lon in
+                  zip(names, stores_df['lat'].astype(float).tolist(), stores_df[lng].astype(float).tolist())]
+    else:
+        places = [f"{name}#{store_id}" for name, store_id in zip(names, stores_df['store_id'].tolist())]
+    return [f"osm:{osm_id}" if osm_id else place for osm_id, place in zip(osm_ids, places)]
+
+
+def work_units(stores_df: pd.DataFrame, items_df: pd.DataFrame, latest_df: Optional[pd.DataFrame] = None,
+               day: Optional[str] = None) -> List[WorkUnit]:
+    """Every store x item pair, with staleness from the latest-price snapshot"""
+    day = day or date.today().isoformat()
+    stores_df = stores_df.assign(store_key=store_keys(stores_df))
+    pairs = stores_df.merge(items_df.rename(columns={'name': 'item_name'}), how='cross')
+    staleness = np.full(len(pairs), np.inf)
+    if latest_df is not None and len(latest_df):
+        seen = pairs[['store_id', 'item_id']].merge(latest_df[['store_id', 'item_id', 'date']],
+                                                    how='left', on=['store_id', 'item_id'])['date']
+        ages = (pd.Timestamp(day) - pd.to_datetime(seen)).dt.days.to_numpy(dtype=np.float64)
+        staleness = np.where(np.isnan(ages), np.inf, ages)
+    websites = pairs['website'].fillna('').astype(str) if 'website' in pairs else [''] * len(pairs)
+    return [WorkUnit(int(s), int(i), str(store_name), str(item_name), website, float(age), store_key)
+            for s, i, store_name, item_name, website, age, store_key in zip(
+                pairs['store_id'], pairs['item_id'], pairs['store_name'], pairs['item_name'], websites, staleness,
+                pairs['store_key'])]
+
+
+def best_observations(observations: pd.DataFrame) -> pd.DataFrame:
+    """The most confident observation per (store, item); ties go to the cheaper source"""
+    best = observations.sort_values('confidence', ascending=False, kind='stable')
+    return best.drop_duplicates(['store_id', 'item_id']).sort_values(['store_id', 'item_id'], ignore_index=True)
+
+
+def price_rows(observations: pd.DataFrame, min_confidence: float = MIN_CONFIDENCE) -> pd.DataFrame:
+    """New confident prices to ingest: the best per pair, leaving out what was already stored"""
+    best = best_observations(observations)
+    best = best[(best['confidence'] >= min_confidence) & (best['source'] != SnapshotSource.name)]
+    return best[['store_id', 'item_id', 'price', 'date']].reset_index(drop=True)
+
+
+def refresh_prices(sources: Sequence[PriceSource], data_dir: str = DATA_DIR, day: Optional[str] = None,
+                   min_confidence: float = MIN_CONFIDENCE) -> pd.DataFrame:
+    """Fill today's stale or missing prices from sources and ingest the confident new ones
+
+    Stored prices go first (as a SnapshotSource), so sources only see pairs
+    whose last price has aged below min_confidence. Returns every observation.
+    """
+    day = day or date.today().isoformat()
+    stores_df, items_df, latest_df = load_dashboard_tables(data_dir)
+    scheduler = PriceScheduler([SnapshotSource(latest_df), *sources], min_confidence)
+    observations = scheduler.run(work_units(stores_df, items_df, latest_df, day), day)
+    rows = price_rows(observations, min_confidence)
+    if len(rows):
+        ingest_prices(rows, data_dir)
+    logger.info(f"Ingested {len(rows)} new prices for {day}")
+    return observations
+
+
+class _BasketClient:
+    """Stand-in for openai.AsyncOpenAI answering basket and single-item prompts after latency seconds"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        prompt = messages[0]['content']
+        items = [line[2:] for line in prompt.splitlines() if line.startswith('- ')]
+        if items:
+            text = json.dumps([{'item': item, 'price': round(1 + len(item) / 4, 2)} for item in items])
+        else:
+            text = '3.49'
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+                               usage=SimpleNamespace(total_tokens=40 + 12 * len(items)))
+
+
+def benchmark_sources(stores: int = 200, latency: float = 0.2, llm_limit: int = 1500):
+    """Asking the model for every pair vs the scheduler with stored, scraped and sampled prices first"""
+    from response_cache import HttpCache, ResponseCache
+    from store_scrapers import RousesScraper, WalmartScraper, serve_fixtures
+
+    day = date.today().isoformat()
+    rng = np.random.default_rng(0)
+    chains = list(STORE_MULTIPLIERS)
+    stores_df = pd.DataFrame({'store_id': np.arange(1, stores + 1, dtype=np.int32),
+                              'store_name': [f"{chains[i % len(chains)]} #{i}" for i in range(stores)]})
+    items_df = pd.DataFrame({'item_id': np.arange(1, len(BASE_PRICES) + 1, dtype=np.int32),
+                             'name': list(BASE_PRICES)})
+    # 90% of pairs have a stored price, last seen 0-9 days ago
+    pairs = stores_df[['store_id']].merge(items_df[['item_id']], how='cross')
+    latest_df = pairs[rng.random(len(pairs)) < 0.9].copy()
+    latest_df['price'] = 3.0
+    latest_df['date'] = [(date.today() - timedelta(days=int(age))).isoformat()
+                         for age in rng.integers(0, 10, len(latest_df))]
+    units = work_units(stores_df, items_df, latest_df, day)
+
+    server = serve_fixtures()
+    tmp = tempfile.TemporaryDirectory()
+    base = f"http://127.0.0.1:{server.server_port}"
+    try:
+        # Every pair from the model, one basket per store
+        client = _BasketClient(latency)
+        pipeline = EstimationPipeline(client=client, cache=ResponseCache(os.path.join(tmp.name, 'naive.sqlite3')))
+        start = time.perf_counter()
+        naive = asyncio.run(pipeline.estimate_baskets_async(
+            [(name, items_df['name'].tolist()) for name in stores_df['store_name']], day))
+        naive_seconds = time.perf_counter() - start
+        naive_rows = sum(result['price'] is not None for basket in naive for result in basket)
+        naive_tokens = pipeline.usage['batch']['tokens'] + pipeline.usage['single']['tokens']
+        naive_calls = client.calls
+
+        client = _BasketClient(latency)
+        cache = ResponseCache(os.path.join(tmp.name, 'scheduled.sqlite3'))
+        scrapers = {'walmart': WalmartScraper(base + '/walmart_search.html?q={query}'),
+                    'rouses': RousesScraper(base + '/rouses_search.html?s={query}')}
+        llm = LLMSource(EstimationPipeline(client=client, cache=cache), limit=llm_limit)
+        scheduler = PriceScheduler([SnapshotSource(latest_df), SampledSource(), SimulatedSource(),
+                                    ScraperSource(ScrapeSession(http_cache=HttpCache(cache)), scrapers), llm])
+        start = time.perf_counter()
+        observations = scheduler.run(units, day)
+        scheduled_seconds = time.perf_counter() - start
+        cache.close()
+    finally:
+        server.shutdown()
+        tmp.cleanup()
+
+    # The scheduler's guarantees (tier gating, limits, fill rule) are checked in tests/test_price_sources.py
+    best = best_observations(observations)
+    confident = best[best['confidence'] >= MIN_CONFIDENCE]
+
+    print(f"{len(units):,} store x item pairs ({stores} stores), model latency {latency * 1000:.0f} ms")
+    print(f"model for everything: {naive_seconds:.1f}s, {naive_calls} calls, {naive_tokens:,} tokens, "
+          f"{naive_rows:,} prices")
+    print(f"scheduler: {scheduled_seconds:.1f}s, {client.calls} model calls, "
+          f"{llm.pipeline.usage['batch']['tokens'] + llm.pipeline.usage['single']['tokens']:,} tokens, "
+          f"{len(confident):,} pairs at confidence >= {MIN_CONFIDENCE}")
+    for name, stats in scheduler.stats.items():
+        print(f"  {name:>9}: {stats['units']:6,} units offered, {stats['batches']:4} batches, "
+              f"{stats['filled']:6,} filled, {stats['seconds']:.2f}s")
+    print(best['source'].value_counts().rename('best source').to_string())
+
+
+if __name__ == "__main__":
+    benchmark_sources()
@@ -0,0 +1,363 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from price_snapshot import build_snapshot, update_snapshot, read_snapshot, write_snapshot
+
+DATA_DIR = 'data'
+
+STORE_SCHEMA = {'store_id': 'int32'}
+ITEM_SCHEMA = {'item_id': 'int32'}
+PRICE_SCHEMA = pa.schema([
+    ('store_id', pa.int32()),
+    ('item_id', pa.int32()),
+    ('price', pa.float64()),
+    ('date', pa.string()),
+])
+
+# Prices are partitioned as data/prices/date=YYYY-MM-DD/<write time ns>-<n>.parquet.
+# File names sort in write order, so later files win when a key appears twice.
+DATE_PARTITIONING = ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive')
+PRICE_KEY = ['date', 'store_id', 'item_id']
+
+
+def _paths(data_dir: str) -> Tuple[str, str, str]:
+    return (os.path.join(data_dir, 'stores.parquet'),
+            os.path.join(data_dir, 'items.parquet'),
+            os.path.join(data_dir, 'prices'))
+
+
+def _snapshot_path(data_dir: str) -> str:
+    # Latest price per (store, item) with rolling aggregates, maintained on ingest
+    return os.path.join(data_dir, 'latest.parquet')
+
+
+def has_parquet(data_dir: str = DATA_DIR) -> bool:
+    """True once the CSVs have been migrated to the columnar layout"""
+    return all(os.path.exists(path) for path in _paths(data_dir))
+
+
+def _cast_prices(prices_df: pd.DataFrame) -> pd.DataFrame:
+    prices_df = prices_df[['store_id', 'item_id', 'price', 'date']].copy()
+    prices_df['store_id'] = prices_df['store_id'].astype('int32')
+    prices_df['item_id'] = prices_df['item_id'].astype('int32')
+    prices_df['price'] = prices_df['price'].astype('float64')
+    prices_df['date'] = prices_df['date'].astype(str)
+    return prices_df
+
+
+def write_stores(stores_df: pd.DataFrame, data_dir: str = DATA_DIR):
+    stores_df = stores_df.astype(STORE_SCHEMA)
+    stores_df.to_parquet(_paths(data_dir)[0], index=False)
+
+
+def write_items(items_df: pd.DataFrame, data_dir: str = DATA_DIR):
+    items_df = items_df.astype(ITEM_SCHEMA)
+    items_df.to_parquet(_paths(data_dir)[1], index=False)
+
+
+def write_prices(prices_df: pd.DataFrame, data_dir: str = DATA_DIR):
+    """Write prices partitioned by date, replacing any partitions for the same dates"""
+    table = pa.Table.from_pandas(_cast_prices(prices_df), schema=PRICE_SCHEMA, preserve_index=False)
+    ds.write_dataset(
+        table,
+        _paths(data_dir)[2],
+        format='parquet',
+        partitioning=DATE_PARTITIONING,
+        basename_template=f"{time.time_ns():020d}-{{i}}.parquet",
+        existing_data_behavior='delete_matching'
+    )
+    rebuild_latest(data_dir)
+
+
+def append_prices(prices_df: pd.DataFrame, data_dir: str = DATA_DIR) -> int:
+    """Append observations as one new file per touched date, without reading existing data
+
+    Cost is O(new rows). A (date, store_id, item_id) key that is already stored is
+    superseded by the new row on read, and physically replaced by compact_prices().
+    """
+    prices_df = _cast_prices(prices_df).drop_duplicates(PRICE_KEY, keep='last')
+    root = _paths(data_dir)[2]
+    basename = f"{time.time_ns():020d}-0.parquet"
+    file_schema = pa.schema([field for field in PRICE_SCHEMA if field.name != 'date'])
+    for date_value, day_df in prices_df.groupby('date', sort=False):
+        part_dir = os.path.join(root, f"date={date_value}")
+        os.makedirs(part_dir, exist_ok=True)
+        table = pa.Table.from_pandas(day_df.drop(columns='date'), schema=file_schema, preserve_index=False)
+        pq.write_table(table, os.path.join(part_dir, basename))
+    return len(prices_df)
+
+
+def _partition_files(data_dir: str):
+    """Map each date partition directory to its data files in write order"""
+    partitions = defaultdict(list)
+    root = _paths(data_dir)[2]
+    if os.path.exists(root):
+        for entry in sorted(os.listdir(root)):
+            part_dir = os.path.join(root, entry)
+            if entry.startswith('date=') and os.path.isdir(part_dir):
+                partitions[part_dir] = sorted(
+                    os.path.join(part_dir, name) for name in os.listdir(part_dir) if name.endswith('.parquet')
+                )
+    return partitions
+
+
+def _read_partition(files: List[str], date_value: str) -> pd.DataFrame:
+    """Read one partition's files in write order, keeping the latest row per key"""
+    frames = [pq.read_table(path).to_pandas() for path in files]
+    day_df = pd.concat(frames, ignore_index=True).assign(date=date_value)
+    return day_df.drop_duplicates(PRICE_KEY, keep='last')
+
+
+def iter_price_partitions(data_dir: str = DATA_DIR) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """(date, prices) for each stored date in order, one partition in memory at a time
+
+    The partitions are listed once, unlike a read_prices() call per date.
+    """
+    for part_dir, files in _partition_files(data_dir).items():
+        if files:
+            date_value = os.path.basename(part_dir)[len('date='):]
+            yield date_value, _read_partition(files, date_value)
+
+
+def stored_dates(data_dir: str = DATA_DIR) -> List[str]:
+    """Dates that already have a price partition with data"""
+    return [os.path.basename(part_dir)[len('date='):] for part_dir, files in _partition_files(data_dir).items() if files]
+
+
+def compact_prices(data_dir: str = DATA_DIR) -> int:
+    """Merge every multi-file date partition into a single de-duplicated file
+
+    Returns the number of partitions rewritten.
+    """
+    file_schema = pa.schema([field for field in PRICE_SCHEMA if field.name != 'date'])
+    rewritten = 0
+    for part_dir, files in _partition_files(data_dir).items():
+        if len(files) < 2:
+            continue
+        day_df = _read_partition(files, os.path.basename(part_dir)[len('date='):])
+        table = pa.Table.from_pandas(day_df.drop(columns='date'), schema=file_schema, preserve_index=False)
+        # Write the merged file first so a crash never loses data
+        pq.write_table(table, os.path.join(part_dir, f"{time.time_ns():020d}-0.parquet"))
+        for path in files:
+            os.remove(path)
+        rewritten += 1
+    return rewritten
+
+
+def ingest_prices(prices_df: pd.DataFrame, data_dir: str = DATA_DIR, compact_every: int = 8) -> int:
+    """Upsert new observations into the store keyed on (date, store_id, item_id)
+
+    Bootstraps the columnar store from the CSVs on first use, and compacts once any
+    partition has collected compact_every files.
+    """
+    if not has_parquet(data_dir) and os.path.exists(os.path.join(data_dir, 'prices.csv')):
+        migrate_csv(data_dir)
+    if prices_df.empty:
+        return 0
+    written = append_prices(prices_df, data_dir)
+    if any(len(files) >= compact_every for files in _partition_files(data_dir).values()):
+        compact_prices(data_dir)
+    snapshot = read_snapshot(_snapshot_path(data_dir))
+    if snapshot is None:
+        rebuild_latest(data_dir)
+    else:
+        def window(start):
+            return read_prices(data_dir, start=start)
+        write_snapshot(update_snapshot(snapshot, _cast_prices(prices_df), window), _snapshot_path(data_dir))
+    return written
+
+
+def rebuild_latest(data_dir: str = DATA_DIR) -> pd.DataFrame:
+    """Rebuild the latest-price snapshot from the full price history"""
+    snapshot = build_snapshot(read_prices(data_dir))
+    write_snapshot(snapshot, _snapshot_path(data_dir))
+    return snapshot
+
+
+def read_latest(data_dir: str = DATA_DIR) -> pd.DataFrame:
+    """Latest price per (store, item) with 7/30-day mean, min, max and days observed
+
+    Reads the snapshot kept up to date by ingest_prices; falls back to building it
+    from the CSVs before migration.
+    """
+    snapshot = read_snapshot(_snapshot_path(data_dir))
+    if snapshot is not None:
+        return snapshot
+    if os.path.exists(_paths(data_dir)[2]):
+        return rebuild_latest(data_dir)
+    return build_snapshot(load_csv(data_dir)[2])
+
+
+def read_stores(data_dir: str = DATA_DIR) -> pd.DataFrame:
+    return pd.read_parquet(_paths(data_dir)[0])
+
+
+def read_items(data_dir: str = DATA_DIR) -> pd.DataFrame:
+    return pd.read_parquet(_paths(data_dir)[1])
+
+
+def read_prices(data_dir: str = DATA_DIR, start: Optional[str] = None, end: Optional[str] = None,
+                store_ids: Optional[Iterable[int]] = None) -> pd.DataFrame:
+    """Read prices, pushing date range and store filters down to the Parquet scan
+
+    Date filters prune whole partitions; store filters use row-group statistics.
+    """
+    dataset = ds.dataset(_paths(data_dir)[2], format='parquet', partitioning=DATE_PARTITIONING)
+    condition = None
+    for expr in (
+        ds.field('date') >= start if start else None,
+        ds.field('date') <= end if end else None,
+        ds.field('store_id').isin([int(s) for s in store_ids]) if store_ids is not None else None,
+    ):
+        if expr is not None:
+            condition = expr if condition is None else condition & expr
+    if any(len(files) > 1 for files in _partition_files(data_dir).values()):
+        # Uncompacted appends: keep only the latest row per key
+        table = _latest_rows(dataset, condition)
+    else:
+        table = dataset.to_table(columns=['store_id', 'item_id', 'price', 'date'], filter=condition)
+    # A handful of distinct dates repeated per row: keep them as an ordered categorical
+    # so .max() and == 'YYYY-MM-DD' still work without one Python string per row
+    table = table.set_column(3, 'date', table.column('date').dictionary_encode())
+    prices_df = table.to_pandas(split_blocks=True, self_destruct=True)
+    prices_df['date'] = prices_df['date'].cat.reorder_categories(
+        sorted(prices_df['date'].cat.categories), ordered=True)
+    return prices_df
+
+
+def _latest_rows(dataset: ds.Dataset, condition) -> pa.Table:
+    """Scan fragment by fragment in write order and drop superseded rows"""
+    fragments = sorted(dataset.get_fragments(filter=condition), key=lambda fragment: fragment.path)
+    frames = []
+    for fragment in fragments:
+        date_value = os.path.basename(os.path.dirname(fragment.path))[len('date='):]
+        frames.append(fragment.to_table(schema=dataset.schema, columns=['store_id', 'item_id', 'price'],
+                                        filter=condition).to_pandas().assign(date=date_value))
+    if not frames:
+        return dataset.to_table(columns=['store_id', 'item_id', 'price', 'date'], filter=condition)
+    prices_df = pd.concat(frames, ignore_index=True).drop_duplicates(PRICE_KEY, keep='last')
+    return pa.Table.from_pandas(prices_df, schema=PRICE_SCHEMA, preserve_index=False)
+
+
+def data_version(data_dir: str = DATA_DIR) -> str:
+    """Fingerprint of the files load_tables() would read (path, size, mtime)
+
+    Changes whenever prices are ingested, compacted or migrated, so it can key
+    caches of anything derived from the tables.
+    """
+    if has_parquet(data_dir):
+        stores_path, items_path, _ = _paths(data_dir)
+        files = [stores_path, items_path] + [path for files in _partition_files(data_dir).values() for path in files]
+        if os.path.exists(_snapshot_path(data_dir)):
+            files.append(_snapshot_path(data_dir))
+    else:
+        files = [os.path.join(data_dir, name) for name in ('stores.csv', 'items.csv', 'prices.csv')]
+    digest = hashlib.blake2b(digest_size=8)
+    for path in filter(os.path.exists, files):
+        stat = os.stat(path)
+        digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+def load_csv(data_dir: str = DATA_DIR) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Read the legacy CSV files with integer IDs; no prices.csv reads as an empty history"""
+    stores_df = pd.read_csv(os.path.join(data_dir, 'stores.csv'), dtype=STORE_SCHEMA)
+    items_df = pd.read_csv(os.path.join(data_dir, 'items.csv'), dtype=ITEM_SCHEMA)
+    prices_path = os.path.join(data_dir, 'prices.csv')
+    if os.path.exists(prices_path):
+        prices_df = pd.read_csv(prices_path, dtype={'store_id': 'int32', 'item_id': 'int32', 'date': str})
+    else:
+        prices_df = PRICE_SCHEMA.empty_table().to_pandas()
+    return stores_df, items_df, prices_df
+
+
+def load_tables(data_dir: str = DATA_DIR) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Load stores, items and prices, preferring the columnar store over the CSVs"""
+    if has_parquet(data_dir):
+        return read_stores(data_dir), read_items(data_dir), read_prices(data_dir)
+    return load_csv(data_dir)
+
+
+def load_dashboard_tables(data_dir: str = DATA_DIR) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Stores, items and the latest-price snapshot: all the dashboard's default views need"""
+    if has_parquet(data_dir):
+        return read_stores(data_dir), read_items(data_dir), read_latest(data_dir)
+    stores_df, items_df, prices_df = load_csv(data_dir)
+    return stores_df, items_df, build_snapshot(prices_df)
+
+
+def migrate_csv(data_dir: str = DATA_DIR):
+    """One-shot migration of data/*.csv into the columnar layout"""
+    stores_df, items_df, prices_df = load_csv(data_dir)
+    prices_dir = _paths(data_dir)[2]
+    if os.path.exists(prices_dir):
+        shutil.rmtree(prices_dir)
+    write_stores(stores_df, data_dir)
+    write_items(items_df, data_dir)
+    write_prices(prices_df, data_dir)
+    print(f"Migrated {len(stores_df)} stores, {len(items_df)} items and "
+          f"{len(prices_df)} prices to {data_dir}")
+
+
+_BENCH_SNIPPET = """
+import sys, time
+import pandas as pd
+sys.path.insert(0, {here!r})
+import price_store
+from peak_rss import peak_rss_mb, format_mb
+start = time.perf_counter()
+if {mode!r} == 'csv':
+    # The app's original load path: text parse, then IDs cast to str
+    prices = pd.read_csv({csv!r})
+    prices['store_id'] = prices['store_id'].astype(str)
+    prices['item_id'] = prices['item_id'].astype(str)
+else:
+    prices = price_store.read_prices({data_dir!r})
+elapsed = time.perf_counter() - start
+frame_mb = prices.memory_usage(deep=True).sum() / 2**20
+print(f"{{elapsed:.3f}} {{frame_mb:.1f}} {{format_mb(peak_rss_mb())}}")
+"""
+
+
+def benchmark_load(days: int = 90, stores: int = 300, items: int = 200):
+    """Compare CSV and Parquet load time, frame memory and peak RSS in fresh processes"""
+    import tempfile
+    import numpy as np
+    from price_simulator import simulate_price_cube, cube_to_frame, cube_dates
+
+    data_dir = tempfile.mkdtemp()
+    rng = np.random.default_rng(0)
+    cube = simulate_price_cube(rng.uniform(1, 25, items), rng.uniform(0.8, 1.3, stores), days)
+    prices_df = cube_to_frame(cube, cube_dates(days), np.arange(1, stores + 1), np.arange(1, items + 1))
+    csv_path = os.path.join(data_dir, 'prices.csv')
+    prices_df.to_csv(csv_path, index=False)
+    write_prices(prices_df, data_dir)
+    print(f"{len(prices_df):,} price rows")
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    for mode in ('csv', 'parquet'):
+        snippet = _BENCH_SNIPPET.format(here=here, mode=mode, csv=csv_path, data_dir=data_dir)
+        out = subprocess.run([sys.executable, '-c', snippet], capture_output=True, text=True, check=True)
+        elapsed, frame_mb, rss_mb = out.stdout.split()
+        print(f"{mode:>8}: load {elapsed}s, frame {frame_mb} MB, peak RSS {rss_mb} MB")
+    shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'migrate':
+        migrate_csv()
+    elif len(sys.argv) > 1 and sys.argv[1] == 'compact':
+        print(f"Compacted {compact_prices()} partitions")
+    else:
+        benchmark_load()
@@ -0,0 +1,451 @@
+import os
+import sys
+import mmap
+import time
+import shutil
+import tempfile
+import subprocess
+from datetime import date, timedelta
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import price_store
+
+# Working memory for one chunk of days, independent of how long the history is
+MEMORY_BUDGET = 1 << 30
+
+# Median absolute deviation to standard deviation, for normally distributed prices
+MAD_SCALE = 1.4826
+
+
+class TrendReport(NamedTuple):
+    """History analytics per (store, item) cell of a date x store x item cube"""
+    dates: List[str]
+    store_ids: np.ndarray
+    item_ids: np.ndarray
+    rolling_mean: np.ndarray      # stores x items, window mean on the last day
+    volatility: np.ndarray        # stores x items, window std / mean on the last day
+    change_counts: np.ndarray     # stores x items, day-over-day moves above change_threshold
+    anomaly_counts: np.ndarray    # stores x items, prices flagged as outliers
+    daily_changes: np.ndarray     # per day, number of price changes
+    daily_anomalies: np.ndarray   # per day, number of outliers
+    top_anomalies: pd.DataFrame   # date, store_id, item_id, price, expected, score; largest |score| first
+
+
+def date_axis(first: str, last: str) -> List[str]:
+    """Every calendar day from first to last; days without prices become NaN slices"""
+    start, end = date.fromisoformat(first), date.fromisoformat(last)
+    return [(start + timedelta(days=day)).isoformat() for day in range((end - start).days + 1)]
+
+
+def _fill_day(cube: np.ndarray, day: int, prices_df: pd.DataFrame, store_ids: np.ndarray, item_ids: np.ndarray):
+    stores = np.searchsorted(store_ids, prices_df['store_id'].to_numpy())
+    items = np.searchsorted(item_ids, prices_df['item_id'].to_numpy())
+    known = (stores < len(store_ids)) & (items < len(item_ids))
+    known[known] &= (store_ids[stores[known]] == prices_df['store_id'].to_numpy()[known]) \
+        & (item_ids[items[known]] == prices_df['item_id'].to_numpy()[known])
+    cube[day, stores[known], items[known]] = prices_df['price'].to_numpy()[known]
+
+
+def cube_from_frame(prices_df: pd.DataFrame, store_ids: Optional[Sequence] = None,
+                    item_ids: Optional[Sequence] = None) -> Tuple[np.ndarray, List[str], np.ndarray, np.ndarray]:
+    """In-memory float32 cube (oldest day first, NaN where unobserved) from long price rows"""
+    store_ids = np.unique(prices_df['store_id'] if store_ids is None else store_ids)
+    item_ids = np.unique(prices_df['item_id'] if item_ids is None else item_ids)
+    day_values = prices_df['date'].astype(str)
+    dates = date_axis(day_values.min(), day_values.max()) if len(day_values) else []
+    cube = np.full((len(dates), len(store_ids), len(item_ids)), np.nan, dtype=np.float32)
+    day_index = {day: position for position, day in enumerate(dates)}
+    for day, day_df in prices_df.groupby(day_values, sort=False):
+        _fill_day(cube, day_index[day], day_df, store_ids, item_ids)
+    return cube, dates, store_ids, item_ids
+
+
+def load_price_cube(data_dir: str = price_store.DATA_DIR,
+                    path: Optional[str] = None) -> Tuple[np.ndarray, List[str], np.ndarray, np.ndarray]:
+    """Dense date x store x item float32 cube of the stored history, as a .npy memmap
+
+    The memmap is filled one date partition at a time, so building it never holds
+    more than a day of prices in memory. Without path it goes in a new temporary
+    directory, which the caller removes (analyze_history does). The legacy CSVs,
+    read before the first ingest migrates them, are small and built in memory.
+    """
+    if not price_store.has_parquet(data_dir):
+        stores_df, items_df, prices_df = price_store.load_csv(data_dir)
+        return cube_from_frame(prices_df, stores_df['store_id'], items_df['item_id'])
+
+    store_ids = np.unique(price_store.read_stores(data_dir)['store_id'])
+    item_ids = np.unique(price_store.read_items(data_dir)['item_id'])
+    stored = sorted(price_store.stored_dates(data_dir))
+    dates = date_axis(stored[0], stored[-1]) if stored else []
+    shape = (len(dates), len(store_ids), len(item_ids))
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix='price_cube_'), 'cube.npy')
+    cube = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=shape)
+    day_index = {day: position for position, day in enumerate(dates)}
+    for position in range(len(dates)):
+        cube[position] = np.nan
+    for day, prices_df in price_store.iter_price_partitions(data_dir):
+        _fill_day(cube, day_index[day], prices_df, store_ids, item_ids)
+    cube.flush()
+    return cube, dates, store_ids, item_ids
+
+
+# Working bytes per cell for each day of a chunk and each day of window lead-in
+# (float32 block, running sums and temporaries), measured with tracemalloc;
+# MAD also holds a sorted float32 copy of every day's window
+BYTES_PER_CELL_DAY = 40
+BYTES_PER_CELL_LEAD = 22
+BYTES_PER_CELL_WINDOW_DAY = {'zscore': 0, 'mad': 8}
+
+
+def chunk_shape(store_count: int, item_count: int, window: int, method: str,
+                memory_budget: int) -> Tuple[int, int]:
+    """(stores, days) per chunk that keep the working set under memory_budget
+
+    All stores at once when a chunk still spans at least a window of days;
+    otherwise the stores are split into blocks, since the window lead-in every
+    chunk re-reads grows with the number of cells.
+    """
+    per_store_day = item_count * (BYTES_PER_CELL_DAY + BYTES_PER_CELL_WINDOW_DAY[method] * window)
+    per_store_lead = item_count * BYTES_PER_CELL_LEAD * window
+    stores = max(min(store_count, memory_budget // (per_store_lead + per_store_day * window)), 1)
+    days = (memory_budget - stores * per_store_lead) // (stores * per_store_day)
+    if days < 1:
+        raise ValueError(f"memory_budget {memory_budget:,} bytes is too small for {item_count:,} items "
+                         f"and a {window}-day window")
+    return int(stores), int(days)
+
+
+def _read_days(cube: np.ndarray, first: int, last: int, stores: slice) -> np.ndarray:
+    """Days [first, last) of a block of stores as a float32 array
+
+    A .npy memmap is read with plain file reads, so its pages don't stay mapped
+    into the process after the chunk is done.
+    """
+    if isinstance(cube, np.memmap) and isinstance(cube.base, mmap.mmap) and cube.flags.c_contiguous:
+        day_cells, store_cells = cube[0].size, cube[0, 0].size
+        block = np.empty((last - first, stores.stop - stores.start) + cube.shape[2:], dtype=cube.dtype)
+        with open(cube.filename, 'rb') as f:
+            for i, day in enumerate(range(first, last)):
+                f.seek(cube.offset + (day * day_cells + stores.start * store_cells) * cube.itemsize)
+                f.readinto(block[i])
+        return block.astype(np.float32, copy=False)
+    return np.array(cube[first:last, stores], dtype=np.float32)
+
+
+class _DayWriter:
+    """Writer of day x store-block slabs into a new float32 .npy file, without mapping it"""
+
+    def __init__(self, path: str, shape: Tuple[int, ...]):
+        header = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=shape)
+        self.path, self.offset = path, header.offset
+        self.day_bytes, self.store_bytes = header[0].nbytes, header[0, 0].nbytes
+        del header
+
+    def write(self, first: int, stores: slice, days: np.ndarray):
+        with open(self.path, 'r+b') as f:
+            for i, day in enumerate(np.asarray(days, dtype=np.float32)):
+                f.seek(self.offset + (first + i) * self.day_bytes + stores.start * self.store_bytes)
+                np.ascontiguousarray(day).tofile(f)
+
+
+def _sorted_median(ordered: np.ndarray, count: np.ndarray) -> np.ndarray:
+    """Median of each row of ordered (sorted along the last axis, NaNs last) with count values"""
+    k = count.astype(np.intp)[..., None]
+    low = np.take_along_axis(ordered, np.maximum(k - 1, 0) // 2, axis=-1)[..., 0]
+    high = np.take_along_axis(ordered, k // 2, axis=-1)[..., 0]
+    return (low + high) / 2
+
+
+def _top(scores: np.ndarray, indices: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    if len(scores) > k:
+        keep = np.argpartition(-np.abs(scores), k - 1)[:k]
+        scores, indices = scores[keep], indices[keep]
+    return scores, indices
+
+
+def analyze_cube(cube: np.ndarray, dates: Sequence[str], store_ids: Sequence, item_ids: Sequence,
+                 window: int = 14, method: str = 'zscore', threshold: float = 4.0,
+                 change_threshold: float = 0.10, min_periods: int = 5, top: int = 100,
+                 memory_budget: int = MEMORY_BUDGET, out_dir: Optional[str] = None) -> TrendReport:
+    """Rolling means, volatility, price changes and outliers over a date x store x item cube
+
+    Days are processed in chunks sized to memory_budget, each read together with
+    the window days before it (and, for very wide cubes, a block of stores at a
+    time), so a memmapped cube of any size is analyzed in fixed memory. Within a chunk everything is vectorized over days, stores and
+    items using running sums along the day axis.
+
+    A price is an outlier when it is more than threshold standard deviations from
+    its trailing window (the window days before it, at least min_periods of them
+    observed): method='zscore' uses the window mean and sample standard
+    deviation, method='mad' the window median and scaled MAD. Volatility is the
+    window's coefficient of variation; a change is a day-over-day move larger
+    than change_threshold. With out_dir, the full rolling mean and volatility
+    cubes are written there as rolling_mean.npy and volatility.npy.
+    """
+    if method not in ('zscore', 'mad'):
+        raise ValueError(f"Unknown anomaly method: {method}")
+    day_count, store_count, item_count = cube.shape
+    cells = store_count * item_count
+    store_step, step = chunk_shape(store_count, item_count, window, method, memory_budget)
+    writers = None
+    if out_dir:
+        writers = (_DayWriter(os.path.join(out_dir, 'rolling_mean.npy'), cube.shape),
+                   _DayWriter(os.path.join(out_dir, 'volatility.npy'), cube.shape))
+
+    change_counts = np.zeros((store_count, item_count), dtype=np.int32)
+    anomaly_counts = np.zeros((store_count, item_count), dtype=np.int32)
+    daily_changes = np.zeros(day_count, dtype=np.int64)
+    daily_anomalies = np.zeros(day_count, dtype=np.int64)
+    top_scores = np.empty(0, dtype=np.float32)
+    top_flat = np.empty(0, dtype=np.int64)
+    top_expected = np.empty(0, dtype=np.float32)
+    rolling_mean = np.full((store_count, item_count), np.nan, dtype=np.float32)
+    volatility = rolling_mean.copy()
+
+    chunks = [(slice(s, min(s + store_step, store_count)), first)
+              for s in range(0, store_count, store_step) for first in range(0, day_count, step)]
+    for stores, first in chunks:
+        last = min(first + step, day_count)
+        lead = min(window, first)
+        days = last - first
+        block = _read_days(cube, first - lead, last, stores)
+        rows = np.arange(lead, lead + days)
+
+        # Running sums along days with a leading zero row (sum over rows [i, j) is s[j] - s[i]),
+        # centred on a per-cell reference price so float32 sums of squares stay accurate
+        valid = ~np.isnan(block)
+        reference = np.nan_to_num(np.fmax.reduce(block, axis=0))
+        n = np.zeros((len(block) + 1,) + block.shape[1:], dtype=np.int16)
+        np.cumsum(valid, axis=0, out=n[1:], dtype=np.int16)
+        del valid
+        centered = block - reference
+        np.nan_to_num(centered, copy=False)
+        s1 = np.zeros(n.shape, dtype=np.float32)
+        np.cumsum(centered, axis=0, out=s1[1:])
+        np.square(centered, out=centered)
+        s2 = np.zeros(n.shape, dtype=np.float32)
+        np.cumsum(centered, axis=0, out=s2[1:])
+        del centered
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Window ending on each day (inclusive): rolling mean and volatility
+            lo = np.maximum(rows + 1 - window, 0)
+            count = (n[rows + 1] - n[lo]).astype(np.float32)
+            mean = s1[rows + 1] - s1[lo]
+            mean /= count
+            vol = s2[rows + 1] - s2[lo]
+            vol /= count
+            vol -= mean * mean
+            np.maximum(vol, 0, out=vol)
+            np.sqrt(vol, out=vol)
+            mean += reference
+            vol /= mean
+            mean[count < 1] = np.nan
+            vol[count < min_periods] = np.nan
+            if writers:
+                writers[0].write(first, stores, mean)
+                writers[1].write(first, stores, vol)
+            if last == day_count:
+                rolling_mean[stores], volatility[stores] = mean[-1], vol[-1]
+            del mean, vol
+
+            # Trailing window strictly before each day: the expected price and its spread
+            lo = np.maximum(rows - window, 0)
+            count = (n[rows] - n[lo]).astype(np.float32)
+            if method == 'zscore':
+                expected = s1[rows] - s1[lo]
+                expected /= count
+                spread = s2[rows] - s2[lo]
+                spread /= count
+                spread -= expected * expected
+                np.maximum(spread, 0, out=spread)
+                spread *= count / np.maximum(count - 1, 1)
+                np.sqrt(spread, out=spread)
+                expected += reference
+            del s1, s2, n
+            if method == 'mad':
+                # Pad the start of the history so window i always covers padded rows [i, i + window)
+                padded = np.concatenate([np.full((window - lead,) + block.shape[1:], np.nan, np.float32),
+                                         block]) if lead < window else block
+                windows = np.lib.stride_tricks.sliding_window_view(padded, window, axis=0)[:days]
+                # One sorted copy of the windows serves both medians (NaNs sort to the end)
+                ordered = np.sort(windows, axis=-1)
+                del windows, padded
+                expected = _sorted_median(ordered, count)
+                ordered -= expected[..., None]
+                np.abs(ordered, out=ordered)
+                ordered.sort(axis=-1)
+                spread = _sorted_median(ordered, count)
+                del ordered
+                spread *= MAD_SCALE
+            # A flat history still flags a jump: never trust a spread under 1% of the price
+            np.maximum(spread, 0.01 * np.abs(expected), out=spread)
+            price = block[lead:]
+            score = price - expected
+            score /= spread
+            del spread
+            flagged = np.abs(score) > threshold
+            flagged &= count >= min_periods
+            del count
+
+            # Day-over-day changes (the previous day is in the block except on day 0)
+            previous = block[lead - 1:lead - 1 + days] if lead else np.concatenate([block[:1], block[:days - 1]])
+            changed = np.abs(price - previous) > change_threshold * previous
+            del previous
+            if not lead:
+                changed[0] = False
+        del block
+
+        daily_changes[first:last] += changed.sum(axis=(1, 2))
+        change_counts[stores] += changed.sum(axis=0, dtype=np.int32)
+        del changed
+        daily_anomalies[first:last] += flagged.sum(axis=(1, 2))
+        anomaly_counts[stores] += flagged.sum(axis=0, dtype=np.int32)
+        flat = np.flatnonzero(flagged)
+        del flagged
+        if len(flat):
+            scores, flat = _top(score.reshape(-1)[flat], flat, top)
+            top_expected = np.concatenate([top_expected, expected.reshape(-1)[flat]])
+            # Chunk position -> position in the whole cube
+            day, rest = np.divmod(flat, score[0].size)
+            flat = (first + day) * cells + stores.start * item_count + rest
+            top_scores, top_flat = np.concatenate([top_scores, scores]), np.concatenate([top_flat, flat])
+            keep = np.argsort(-np.abs(top_scores), kind='stable')[:top]
+            top_scores, top_flat, top_expected = top_scores[keep], top_flat[keep], top_expected[keep]
+        del score, expected
+
+    day, rest = np.divmod(top_flat, cells)
+    store, item = np.divmod(rest, item_count)
+    store_ids, item_ids = np.asarray(store_ids), np.asarray(item_ids)
+    top_anomalies = pd.DataFrame({
+        'date': [dates[d] for d in day.tolist()],
+        'store_id': store_ids[store],
+        'item_id': item_ids[item],
+        'price': np.asarray(cube[day, store, item], dtype=np.float64).round(2),
+        'expected': np.round(top_expected.astype(np.float64), 2),
+        'score': np.round(top_scores.astype(np.float64), 2),
+    })
+    return TrendReport(list(dates), store_ids, item_ids, rolling_mean, volatility, change_counts,
+                       anomaly_counts, daily_changes, daily_anomalies, top_anomalies)
+
+
+def analyze_history(data_dir: str = price_store.DATA_DIR, path: Optional[str] = None, **options) -> TrendReport:
+    """load_price_cube + analyze_cube; without path the cube is a temporary memmap, removed afterwards"""
+    directory = None
+    if path is None:
+        directory = tempfile.mkdtemp(prefix='price_cube_')
+        path = os.path.join(directory, 'cube.npy')
+    try:
+        cube, dates, store_ids, item_ids = load_price_cube(data_dir, path)
+        report = analyze_cube(cube, dates, store_ids, item_ids, **options)
+        # Unmap before removing the file (Windows won't delete a mapped file)
+        del cube
+        return report
+    finally:
+        if directory:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def _reference_scores(cube: np.ndarray, window: int, min_periods: int) -> np.ndarray:
+    """pandas rolling z-scores for every cell, kept only to check the chunked path on small cubes"""
+    days, stores, items = cube.shape
+    frame = pd.DataFrame(cube.reshape(days, -1).astype(np.float64))
+    trailing = frame.shift(1).rolling(window, min_periods=min_periods)
+    mean, std = trailing.mean(), trailing.std()
+    std = np.maximum(std, 0.01 * mean.abs())
+    return ((frame - mean) / std).to_numpy().reshape(cube.shape)
+
+
+_BENCH_SNIPPET = """
+import sys, time
+sys.path.insert(0, {here!r})
+import numpy as np
+from price_trends import analyze_cube
+from peak_rss import peak_rss_mb, format_mb
+cube = np.load({path!r}, mmap_mode='r')
+days, stores, items = cube.shape
+baseline = format_mb(peak_rss_mb())
+start = time.perf_counter()
+report = analyze_cube(cube, [str(d) for d in range(days)], np.arange(stores), np.arange(items),
+                      method={method!r}, memory_budget={budget})
+elapsed = time.perf_counter() - start
+print(f"{{elapsed:.1f}} {{format_mb(peak_rss_mb())}} {{baseline}} {{int(report.anomaly_counts.sum())}} {{int(report.daily_changes.sum())}}")
+"""
+
+
+def _synthetic_cube(path: str, days: int, stores: int, items: int, seed: int = 0) -> int:
+    """Write a simulated history (a day at a time) with injected spikes; returns the spike count"""
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(1, 25, items).astype(np.float32)
+    multipliers = rng.uniform(0.8, 1.3, stores).astype(np.float32)
+    cube = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(days, stores, items))
+    spikes = 0
+    for day in range(days):
+        prices = rng.uniform(0.95, 1.05, (stores, items)).astype(np.float32)
+        prices *= multipliers[:, None]
+        prices *= base[None, :]
+        # A few missing observations and, after the first weeks, a few 40% price jumps
+        prices[rng.random((stores, items)) < 0.01] = np.nan
+        if day >= 14:
+            hits = rng.random((stores, items)) < 1e-5
+            prices[hits] *= 1.4
+            spikes += int(hits.sum())
+        cube[day] = np.round(prices, 2)
+    cube.flush()
+    return spikes
+
+
+def benchmark_trends(days: int = 365, stores: int = 1000, items: int = 500,
+                     budget: int = 256 << 20, methods: Sequence[str] = ('zscore', 'mad')):
+    """Check the chunked z-scores against pandas, then measure time and peak RSS on a memmapped cube"""
+    rng = np.random.default_rng(1)
+    small = np.round(rng.uniform(2, 3, (40, 6, 5)), 2).astype(np.float32)
+    small[rng.random(small.shape) < 0.1] = np.nan
+    small[30, 2, 3] = 9.0
+    report = analyze_cube(small, date_axis('2025-01-01', '2025-02-09'), np.arange(6), np.arange(5),
+                          window=7, threshold=3.5, min_periods=3,
+                          memory_budget=30 * (BYTES_PER_CELL_LEAD * 7 + BYTES_PER_CELL_DAY * 5))  # 5-day chunks
+    expected = _reference_scores(small, 7, 3)
+    flagged = np.abs(np.nan_to_num(expected)) > 3.5
+    assert report.anomaly_counts.sum() == flagged.sum() and report.anomaly_counts[2, 3] >= 1, report
+    top = report.top_anomalies.iloc[0]
+    assert (top['date'], top['store_id'], top['item_id']) == ('2025-01-31', 2, 3), top
+    assert abs(top['score'] - expected[30, 2, 3]) < 1e-3 * abs(expected[30, 2, 3])
+    # Blocks of 2 stores x 7 days give the same report
+    blocked = analyze_cube(small, report.dates, np.arange(6), np.arange(5), window=7, threshold=3.5,
+                           min_periods=3, memory_budget=2 * 5 * (BYTES_PER_CELL_LEAD * 7 + BYTES_PER_CELL_DAY * 7))
+    for name in ('change_counts', 'anomaly_counts', 'daily_changes', 'daily_anomalies'):
+        np.testing.assert_array_equal(getattr(blocked, name), getattr(report, name), err_msg=name)
+    # float32 running sums start on different days
+    np.testing.assert_allclose(blocked.rolling_mean, report.rolling_mean, rtol=1e-5)
+    np.testing.assert_allclose(blocked.volatility, report.volatility, rtol=1e-3)
+    pd.testing.assert_frame_equal(blocked.top_anomalies, report.top_anomalies, check_exact=False)
+    print("chunked z-scores match pandas rolling on a small cube, with and without store blocks")
+
+    directory = tempfile.mkdtemp()
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        path = os.path.join(directory, 'cube.npy')
+        start = time.perf_counter()
+        spikes = _synthetic_cube(path, days, stores, items)
+        print(f"{days} days x {stores} stores x {items} items ({os.path.getsize(path) / 1e9:.1f} GB memmap, "
+              f"{spikes} injected spikes) written in {time.perf_counter() - start:.0f}s")
+        for method in methods:
+            snippet = _BENCH_SNIPPET.format(here=here, path=path, method=method, budget=budget)
+            out = subprocess.run([sys.executable, '-c', snippet], stdout=subprocess.PIPE, text=True, check=True)
+            elapsed, peak, baseline, anomalies, changes = out.stdout.split()
+            print(f"{method:>6}: {elapsed}s, peak RSS {peak} MB ({baseline} MB before analyzing; "
+                  f"budget {budget >> 20} MB), {anomalies} outliers, {int(changes):,} changes > 10%")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'full':
+        benchmark_trends(365, 1000, 5000, budget=1 << 30, methods=('zscore',))
+    else:
+        benchmark_trends()
@@ -0,0 +1,305 @@
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from geopy.geocoders import Nominatim
+
+from geo_distance import haversine_miles
+from price_records import Store, STORE_FIELDS
+from price_simulator import DEFAULT_SEED
+from price_store import DATA_DIR
+from response_cache import cached_geocode
+from store_index import KNOWN_CENTERS, StoreIndex
+
+logger = logging.getLogger(__name__)
+
+REGIONS_DIR = os.path.join(DATA_DIR, 'regions')
+
+# Every output table is partitioned as <table>/region=<slug>/
+REGION_PARTITIONING = ds.partitioning(pa.schema([('region', pa.string())]), flavor='hive')
+REGION_TABLES = ('stores', 'prices', 'summary')
+
+
+class Region(NamedTuple):
+    """One trade area: a place to geocode (ZIP code or "City, ST") or a known centre, and a radius"""
+    name: str
+    place: str = ''
+    radius_miles: float = 50
+    center: Optional[Tuple[float, float]] = None
+
+    @property
+    def slug(self) -> str:
+        """Partition value for the region's output"""
+        return re.sub(r'[^a-z0-9]+', '-', self.name.lower()).strip('-')
+
+
+# The trade areas hard-coded around the project
+DEFAULT_REGIONS = [Region(name, name, 50, center) for name, center in KNOWN_CENTERS.items()]
+
+
+class FetchGroup(NamedTuple):
+    """Regions served by one Overpass fetch of a circle covering them all"""
+    center: Tuple[float, float]
+    radius_miles: float
+    members: List[int]  # Positions in the region list
+
+
+def locate(regions: Sequence[Region], geolocator=None) -> List[Tuple[float, float]]:
+    """Centre of every region; places are geocoded one at a time through the response cache"""
+    centers = []
+    for region in regions:
+        if region.center is not None:
+            centers.append(tuple(region.center))
+            continue
+        geolocator = geolocator or Nominatim(user_agent="grocery_price_comparer")
+        centers.append(cached_geocode(geolocator, region.place or region.name))
+    return centers
+
+
+def _covering_circle(centers: np.ndarray, radii: np.ndarray) -> Tuple[Tuple[float, float], float]:
+    center = (float(centers[:, 0].mean()), float(centers[:, 1].mean()))
+    reach = haversine_miles(center[0], center[1], centers[:, 0], centers[:, 1]) + radii
+    return center, float(reach.max())
+
+
+def plan_fetches(centers: Sequence[Tuple[float, float]], radii: Sequence[float]) -> List[FetchGroup]:
+    """Group overlapping regions so each group is fetched once
+
+    Two groups merge when their circles overlap and one circle covering both
+    has no more area than the two circles fetched separately, so sharing never
+    fetches more ground than it saves. The pair saving the most merges first.
+    """
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+    radii = np.asarray(radii, dtype=np.float64)
+    groups = [FetchGroup(tuple(centers[i]), float(radii[i]), [i]) for i in range(len(radii))]
+    while True:
+        best = None
+        for a in range(len(groups)):
+            for b in range(a + 1, len(groups)):
+                first, second = groups[a], groups[b]
+                apart = haversine_miles(first.center[0], first.center[1], second.center[0], second.center[1])
+                if apart >= first.radius_miles + second.radius_miles:
+                    continue
+                members = first.members + second.members
+                center, radius = _covering_circle(centers[members], radii[members])
+                saving = first.radius_miles ** 2 + second.radius_miles ** 2 - radius ** 2
+                if saving >= 0 and (best is None or saving > best[0]):
+                    best = (saving, a, b, FetchGroup(center, radius, sorted(members)))
+        if best is None:
+            return groups
+        _, a, b, merged = best
+        groups = [group for i, group in enumerate(groups) if i not in (a, b)] + [merged]
+
+
+def _fetch_group(group: FetchGroup) -> List[Store]:
+    """Worker: every store in a group's covering circle"""
+    from price_comparison import GroceryPriceComparer
+    comparer = GroceryPriceComparer('', group.radius_miles, center=group.center)
+    return comparer.fetch_stores(group.center, group.radius_miles)
+
+
+def _write_partition(frame: pd.DataFrame, table: str, slug: str, out_dir: str):
+    """Replace one region's partition of a table"""
+    part_dir = os.path.join(out_dir, table, f"region={slug}")
+    shutil.rmtree(part_dir, ignore_errors=True)
+    os.makedirs(part_dir)
+    pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), os.path.join(part_dir, 'part-0.parquet'))
+
+
+def _run_region(region: Region, center: Tuple[float, float], stores: List[Store], seed: int,
+                out_dir: str, group: int, shared_with: int) -> Dict[str, Any]:
+    """Worker: prices, analysis and cheapest basket for one region, written to its partitions"""
+    from price_comparison import GroceryPriceComparer
+    comparer = GroceryPriceComparer(region.place, region.radius_miles, seed=seed, center=center)
+    comparer.stores = stores
+    price_data = comparer.get_prices()
+    summary = {'name': region.name, 'place': region.place, 'lat': center[0], 'lng': center[1],
+               'radius_miles': float(region.radius_miles), 'stores': len(stores), 'fetch_group': group,
+               'regions_in_fetch': shared_with, 'cheapest_store': None, 'cheapest_average': np.nan,
+               'basket_stores': None, 'basket_total': np.nan, 'basket_miles': np.nan}
+    if stores:
+        analysis = comparer.analyze_price_patterns(price_data)
+        cheapest, average = next(iter(analysis['cheapest_stores'].items()))
+        plan = comparer.optimize_basket(price_data)
+        summary.update(cheapest_store=analysis['labels'][cheapest], cheapest_average=average,
+                       basket_stores=' + '.join(price_data.store_labels[s] for s in plan.stores),
+                       basket_total=plan.total_cost, basket_miles=plan.travel_miles)
+
+    stores_df = pd.DataFrame([store.to_row() for store in stores], columns=STORE_FIELDS)
+    stores_df.insert(0, 'store_key', [store.key for store in stores])
+    keys = np.array([store.key for store in stores], dtype=object)
+    prices_df = pd.DataFrame({
+        'store_key': keys[price_data.store_codes] if len(keys) else np.empty(0, dtype=object),
+        'item': np.array(price_data.items, dtype=object)[price_data.item_codes],
+        'price': price_data.prices,
+        'date': np.array(price_data.dates, dtype=object)[price_data.date_codes],
+    })
+    _write_partition(stores_df, 'stores', region.slug, out_dir)
+    _write_partition(prices_df, 'prices', region.slug, out_dir)
+    _write_partition(pd.DataFrame([summary]), 'summary', region.slug, out_dir)
+    return summary
+
+
+def run_regions(regions: Sequence[Region] = DEFAULT_REGIONS, out_dir: str = REGIONS_DIR,
+                max_workers: Optional[int] = None, seed: int = DEFAULT_SEED) -> pd.DataFrame:
+    """Refresh every region in one job; returns one summary row per region
+
+    Centres are geocoded (cached) in this process. Overlapping regions share
+    one Overpass fetch (plan_fetches), and each region's stores are cut from it
+    with a StoreIndex. Fetches, then regions, run on a process pool; each
+    region writes its own partitions of out_dir/{stores,prices,summary}, so
+    re-running a region replaces only its data.
+    """
+    slugs = [region.slug for region in regions]
+    if len(set(slugs)) != len(slugs) or not all(slugs):
+        raise ValueError(f"Region names must be distinct and non-empty: {[r.name for r in regions]}")
+    centers = locate(regions)
+    groups = plan_fetches(centers, [region.radius_miles for region in regions])
+    logger.info(f"{len(regions)} regions in {len(groups)} Overpass fetches")
+
+    # Spawned workers open their own SQLite cache connection and HTTP session
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+        fetched = list(pool.map(_fetch_group, groups))
+        jobs = {}
+        for number, (group, stores) in enumerate(zip(groups, fetched)):
+            index = StoreIndex(stores)
+            for member in group.members:
+                region = regions[member]
+                jobs[member] = pool.submit(_run_region, region, centers[member],
+                                           index.recenter(centers[member], region.radius_miles),
+                                           seed, out_dir, number, len(group.members))
+        summaries = [jobs[member].result() for member in range(len(regions))]
+    return pd.DataFrame(summaries)
+
+
+def read_regions(table: str, regions: Optional[Sequence[str]] = None, out_dir: str = REGIONS_DIR) -> pd.DataFrame:
+    """One output table for all regions (or the named ones), with a region column"""
+    if table not in REGION_TABLES:
+        raise ValueError(f"Unknown region table: {table}")
+    dataset = ds.dataset(os.path.join(out_dir, table), format='parquet', partitioning=REGION_PARTITIONING)
+    condition = None
+    if regions is not None:
+        condition = ds.field('region').isin(pa.array([Region(name).slug for name in regions], type=pa.string()))
+    return dataset.to_table(filter=condition).to_pandas()
+
+
+def _serve_payload(payload: bytes, latency: float) -> Tuple[ThreadingHTTPServer, Dict[str, int]]:
+    """Local Overpass stand-in answering every query with payload after latency seconds"""
+    counts = {'requests': 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            with lock:
+                counts['requests'] += 1
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, counts
+
+
+_BENCH_SNIPPET = """
+import sys, time
+sys.path.insert(0, {here!r})
+from price_comparison import GroceryPriceComparer
+from region_batch import Region
+start = time.perf_counter()
+for name, lat, lng, radius in {regions!r}:
+    comparer = GroceryPriceComparer(name, radius, center=(lat, lng))
+    comparer.stores = comparer.find_nearby_stores()
+    price_data = comparer.get_prices()
+    comparer.analyze_price_patterns(price_data)
+    comparer.optimize_basket(price_data)
+print(f"{{time.perf_counter() - start:.2f}}")
+"""
+
+
+def benchmark_batch(stores: int = 3000, latency: float = 2.0, max_workers: int = 4):
+    """One region at a time (fetch + process each) vs run_regions, against a slow local Overpass"""
+    rng = np.random.default_rng(0)
+    elements = [{'type': 'node', 'id': 1000 + i, 'lat': float(lat), 'lon': float(lon),
+                 'tags': {'name': f"Store {i}", 'shop': 'supermarket', 'addr:street': f"{i} Main Street"}}
+                for i, (lat, lon) in enumerate(zip(rng.uniform(29.7, 31.0, stores), rng.uniform(-92.0, -89.8, stores)))]
+    # Baton Rouge suburbs overlap heavily; New Orleans and Lafayette stand alone
+    regions = [Region('Baton Rouge, LA', center=(30.4515, -91.1871), radius_miles=20),
+               Region('Denham Springs, LA', center=(30.4866, -90.9568), radius_miles=20),
+               Region('Zachary, LA', center=(30.6485, -91.1565), radius_miles=20),
+               Region('Gonzales, LA', center=(30.2385, -90.9201), radius_miles=20),
+               Region('Livonia, LA', center=(30.5594, -91.5557), radius_miles=20),
+               Region('New Roads, LA', center=(30.7015, -91.4368), radius_miles=20),
+               Region('New Orleans, LA', center=(29.9511, -90.0715), radius_miles=20),
+               Region('Lafayette, LA', center=(30.2241, -92.0198), radius_miles=20)]
+    server, counts = _serve_payload(json.dumps({'elements': elements}).encode(), latency)
+    directory = tempfile.mkdtemp()
+    here = os.path.dirname(os.path.abspath(__file__))
+    environment = dict(os.environ, OVERPASS_URL=f"http://127.0.0.1:{server.server_port}/api")
+    saved = {key: os.environ.get(key) for key in ('OVERPASS_URL', 'SHELF_CACHE_PATH')}
+    try:
+        snippet = _BENCH_SNIPPET.format(here=here, regions=[(r.name, *r.center, r.radius_miles) for r in regions])
+        environment['SHELF_CACHE_PATH'] = os.path.join(directory, 'serial.sqlite3')
+        out = subprocess.run([sys.executable, '-c', snippet], stdout=subprocess.PIPE, text=True, check=True,
+                             env=environment, cwd=directory)
+        serial, serial_requests = float(out.stdout.split()[-1]), counts['requests']
+
+        # Workers are spawned with this process's environment
+        os.environ.update(OVERPASS_URL=environment['OVERPASS_URL'],
+                          SHELF_CACHE_PATH=os.path.join(directory, 'batch.sqlite3'))
+        counts['requests'] = 0
+        start = time.perf_counter()
+        summary = run_regions(regions, os.path.join(directory, 'regions'), max_workers=max_workers)
+        batch = time.perf_counter() - start
+        prices = read_regions('prices', out_dir=os.path.join(directory, 'regions'))
+        assert sorted(prices['region'].unique()) == sorted(r.slug for r in regions)
+        assert (summary['stores'] > 0).all(), summary
+
+        print(f"{len(regions)} regions, {stores:,} stores, Overpass latency {latency:.1f}s, {os.cpu_count()} CPU(s)")
+        print(f"one region at a time: {serial:.1f}s, {serial_requests} Overpass requests")
+        print(f"run_regions ({max_workers} processes): {batch:.1f}s, {counts['requests']} Overpass requests "
+              f"({summary['fetch_group'].nunique()} shared fetches), {len(prices):,} price rows in one dataset")
+        print(summary[['name', 'stores', 'regions_in_fetch', 'basket_total']].to_string(index=False))
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        server.shutdown()
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        benchmark_batch()
+    else:
+        # python region_batch.py ["City, ST" | ZIP ...]; the known trade areas by default
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        regions = [Region(place, place) for place in sys.argv[1:]] or DEFAULT_REGIONS
+        print(run_regions(regions).to_string(index=False))
@@ -0,0 +1,353 @@
+import os
+import gzip
+import json
+import time
+import zlib
+import base64
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+import requests
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+OVERPASS_URL = os.getenv('OVERPASS_URL', 'https://overpass-api.de/api/interpreter')
+CACHE_PATH = os.getenv('SHELF_CACHE_PATH', os.path.join('data', 'cache.sqlite3'))
+
+GEOCODE_TTL = 30 * 24 * 3600   # Places don't move
+OVERPASS_TTL = 7 * 24 * 3600   # Store openings/closings show up within a week
+MAX_ENTRIES = 5000
+# Bodies stay around this long after they go stale, so they can be revalidated with a 304
+VALIDATOR_TTL = 30 * 24 * 3600
+
+ACCEPT_ENCODING = 'gzip, deflate, br' if brotli else 'gzip, deflate'
+
+
+def normalize_query(text: str) -> str:
+    """Collapse whitespace so reformatted queries share a key (case is kept: Overpass tag values are case-sensitive)"""
+    return ' '.join(text.split())
+
+
+def make_key(kind: str, text: str, center: Optional[Tuple[float, float]] = None) -> str:
+    """Build a cache key from the request kind, query text and centre"""
+    parts = [kind, normalize_query(text)]
+    if center is not None:
+        # ~1 m precision; anything finer is geocoder noise
+        parts.append(f"{round(float(center[0]), 5)},{round(float(center[1]), 5)}")
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """On-disk SQLite cache with TTL expiry and LRU size-bounded eviction"""
+
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # The HttpCache over this store, made on first use by get_http_cache(cache)
+        self._http_cache: Optional['HttpCache'] = None
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float):
+        """Store a JSON-serializable value for ttl seconds"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """Drop expired rows, then least recently used rows beyond max_entries"""
+        self._conn.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+        count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def clear(self):
+        """Remove every cached response"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+_default_cache: Optional[ResponseCache] = None
+
+
+def get_default_cache() -> ResponseCache:
+    """Return the process-wide cache shared by all modules"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache()
+    return _default_cache
+
+
+def cached_geocode(geolocator, place: str, cache: Optional[ResponseCache] = None,
+                   ttl: float = GEOCODE_TTL) -> Tuple[float, float]:
+    """Geocode a place name to (lat, lng), consulting the cache first"""
+    cache = cache or get_default_cache()
+    key = make_key('geocode', place)
+    cached = cache.get(key)
+    if cached is not None:
+        return tuple(cached)
+
+    location = geolocator.geocode(place)
+    if not location:
+        raise Exception(f"Could not find location for {place}")
+    result = (location.latitude, location.longitude)
+    cache.set(key, list(result), ttl)
+    return result
+
+
+class CachedResponse:
+    """Minimal response: status, headers and the decoded body, wherever it came from"""
+
+    def __init__(self, status_code: int, content: bytes, headers: Dict[str, str], from_cache: bool = False):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.from_cache = from_cache
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+def decode_body(raw: bytes, encoding: str) -> bytes:
+    """Undo a Content-Encoding (gzip, deflate, br; applied in the listed order)"""
+    for coding in reversed([c.strip().lower() for c in encoding.split(',') if c.strip()]):
+        if coding in ('gzip', 'x-gzip'):
+            raw = gzip.decompress(raw)
+        elif coding == 'deflate':
+            try:
+                raw = zlib.decompress(raw)
+            except zlib.error:
+                raw = zlib.decompress(raw, -zlib.MAX_WBITS)
+        elif coding == 'br':
+            if brotli is None:
+                raise Exception("Response is brotli-encoded but the brotli package is not installed")
+            raw = brotli.decompress(raw)
+        elif coding != 'identity':
+            raise Exception(f"Unsupported Content-Encoding: {coding}")
+    return raw
+
+
+def _server_max_age(headers) -> Optional[float]:
+    """max-age from Cache-Control; None for no-store, 0 for no-cache or when absent (store, but revalidate)"""
+    directives = [d.strip().lower() for d in headers.get('Cache-Control', '').split(',')]
+    if 'no-store' in directives:
+        return None
+    if 'no-cache' in directives:
+        return 0
+    for directive in directives:
+        if directive.startswith('max-age='):
+            try:
+                return float(directive[len('max-age='):])
+            except ValueError:
+                return 0
+    return 0
+
+
+class HttpCache:
+    """Conditional GETs: bodies are kept with their ETag/Last-Modified in a ResponseCache
+
+    A stored body younger than max_age (the caller's, or the server's Cache-Control
+    max-age) is served without touching the network; an older one is revalidated
+    with If-None-Match / If-Modified-Since, and a 304 is answered from the store.
+    """
+
+    def __init__(self, cache: Optional[ResponseCache] = None, session: Optional[requests.Session] = None,
+                 keep_for: float = VALIDATOR_TTL):
+        self.cache = cache or get_default_cache()
+        self.session = session or requests.Session()
+        self.keep_for = keep_for
+        self.stats = {'requests': 0, 'fresh_hits': 0, 'not_modified': 0, 'downloads': 0,
+                      'bytes_received': 0, 'bytes_decoded': 0, 'bytes_saved': 0}
+
+    def key(self, url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        if params:
+            url = f"{url}?{urlencode(sorted(params.items()))}"
+        return hashlib.sha256(f"http|{url}".encode('utf-8')).hexdigest()
+
+    def lookup(self, key: str, max_age: float = 0) -> Tuple[Optional[Dict[str, Any]], Optional[CachedResponse]]:
+        """(stored entry, response if it is still fresh enough to skip the network)"""
+        entry = self.cache.get(key)
+        if entry is None:
+            return None, None
+        if time.time() - entry['fetched_at'] < max(max_age, entry['max_age']):
+            self.stats['fresh_hits'] += 1
+            self.stats['bytes_saved'] += entry['size']
+            return entry, self._response(entry)
+        return entry, None
+
+    def request_headers(self, entry: Optional[Dict[str, Any]],
+                        headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        headers = dict(headers or {})
+        headers.setdefault('Accept-Encoding', ACCEPT_ENCODING)
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def complete(self, key: str, entry: Optional[Dict[str, Any]], status_code: int,
+                 headers, raw: bytes) -> CachedResponse:
+        """Turn a network response (raw, still encoded body) into a CachedResponse, storing it if cacheable"""
+        self.stats['requests'] += 1
+        self.stats['bytes_received'] += len(raw)
+        server_max_age = _server_max_age(headers)
+        if status_code == 304 and entry is not None:
+            self.stats['not_modified'] += 1
+            self.stats['bytes_saved'] += entry['size']
+            entry = dict(entry, fetched_at=time.time(), max_age=server_max_age or 0,
+                         etag=headers.get('ETag', entry.get('etag')),
+                         last_modified=headers.get('Last-Modified', entry.get('last_modified')))
+            self.cache.set(key, entry, self.keep_for)
+            return self._response(entry)
+
+        content = decode_body(raw, headers.get('Content-Encoding', ''))
+        self.stats['downloads'] += 1
+        self.stats['bytes_decoded'] += len(content)
+        if status_code == 200 and server_max_age is not None:
+            self.cache.set(key, {
+                'body': base64.b64encode(zlib.compress(content)).decode('ascii'),
+                'content_type': headers.get('Content-Type', ''),
+                'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified'),
+                'fetched_at': time.time(),
+                'max_age': server_max_age,
+                'size': len(raw),
+            }, self.keep_for)
+        return CachedResponse(status_code, content, {'Content-Type': headers.get('Content-Type', '')})
+
+    def _response(self, entry: Dict[str, Any]) -> CachedResponse:
+        content = zlib.decompress(base64.b64decode(entry['body']))
+        return CachedResponse(200, content, {'Content-Type': entry['content_type']}, from_cache=True)
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None,
+            max_age: float = 0, timeout: Optional[float] = None, key: Optional[str] = None) -> CachedResponse:
+        """GET through the cache; max_age is how long a stored body may be used without revalidating
+
+        key overrides the URL-based cache key, for requests that are equivalent
+        under a normalization the URL doesn't capture.
+        """
+        key = key or self.key(url, params)
+        entry, cached = self.lookup(key, max_age)
+        if cached is not None:
+            return cached
+        # stream=True so the body can be read as it came over the wire
+        with self.session.get(url, params=params, headers=self.request_headers(entry, headers),
+                              timeout=timeout, stream=True) as response:
+            raw = response.raw.read(decode_content=False)
+            return self.complete(key, entry, response.status_code, response.headers, raw)
+
+    async def aget(self, client, url: str, headers: Optional[Dict[str, str]] = None,
+                   max_age: float = 0) -> CachedResponse:
+        """Like get(), over a shared httpx.AsyncClient"""
+        key = self.key(url)
+        entry, cached = self.lookup(key, max_age)
+        if cached is not None:
+            return cached
+        async with client.stream('GET', url, headers=self.request_headers(entry, headers)) as response:
+            raw = b''.join([chunk async for chunk in response.aiter_raw()])
+            return self.complete(key, entry, response.status_code, response.headers, raw)
+
+
+_default_http_cache: Optional[HttpCache] = None
+
+
+def get_http_cache(cache: Optional[ResponseCache] = None) -> HttpCache:
+    """Return the process-wide HTTP cache (one pooled session, one set of counters),
+    or the one over cache, made once so its session is reused across calls"""
+    global _default_http_cache
+    if cache is not None:
+        if cache._http_cache is None:
+            cache._http_cache = HttpCache(cache)
+        return cache._http_cache
+    if _default_http_cache is None:
+        _default_http_cache = HttpCache()
+    return _default_http_cache
+
+
+class OverpassError(Exception):
+    """Overpass API returned a non-200 response"""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"Overpass API request failed with status code {status_code}")
+        self.status_code = status_code
+
+
+def fetch_overpass(query: str, center: Tuple[float, float], cache: Optional[ResponseCache] = None,
+                   ttl: float = OVERPASS_TTL, url: Optional[str] = None,
+                   timeout: Optional[float] = None) -> Dict[str, Any]:
+    """Run an Overpass QL query through the HTTP cache
+
+    A payload younger than ttl is reused as-is; an older one is revalidated when
+    the server sent validators. Responses are keyed on the whitespace-normalized
+    query and the centre (make_key), so reformatting a query still hits.
+    """
+    http = get_http_cache(cache)
+    response = http.get(url or OVERPASS_URL, params={'data': query}, max_age=ttl, timeout=timeout,
+                        key=make_key('overpass', query, center))
+    if response.from_cache:
+        logger.info("Overpass cache hit")
+    if response.status_code != 200:
+        raise OverpassError(response.status_code)
+    return response.json()
@@ -0,0 +1,154 @@
+import json
+import math
+from collections import defaultdict
+from dataclasses import replace
+from typing import List, Dict, Any, Tuple, Union
+
+import numpy as np
+
+from geo_distance import haversine_miles
+from price_records import Store, STORE_FIELDS, REQUIRED_STORE_FIELDS
+
+# Miles per degree of latitude
+MILES_PER_DEGREE = 69.05
+
+# Centres hard-coded around the project, so one wide fetch can serve all of them
+KNOWN_CENTERS = {
+    'Baton Rouge, LA': (30.4515, -91.1871),
+    'Livonia, LA': (30.5594, -91.5557),
+    'New Roads, LA': (30.7015, -91.4368),
+    'New Orleans, LA': (29.9511, -90.0715),
+}
+
+# Store records, or the dicts (flat lat/lon or a nested 'location') older code passes around
+StoreLike = Union[Store, Dict[str, Any]]
+
+
+def _store_coords(store: StoreLike) -> Tuple[float, float]:
+    """Read lat/lon from a Store or either dict layout used in the project"""
+    if isinstance(store, Store):
+        return store.lat, store.lng
+    if 'location' in store and isinstance(store['location'], dict):
+        return store['location']['lat'], store['location']['lng']
+    return store['lat'], store['lon']
+
+
+class StoreIndex:
+    """Uniform lat/lon grid over a store table for local radius and k-nearest queries"""
+
+    def __init__(self, stores: List[StoreLike], cell_degrees: float = 0.1):
+        self.stores = list(stores)
+        self.cell_degrees = cell_degrees
+        coords = np.array([_store_coords(s) for s in self.stores], dtype=np.float64).reshape(-1, 2)
+        self.lats = coords[:, 0]
+        self.lons = coords[:, 1]
+
+        # Bucket store positions by grid cell
+        rows = np.floor(self.lats / cell_degrees).astype(np.int64)
+        cols = np.floor(self.lons / cell_degrees).astype(np.int64)
+        buckets = defaultdict(list)
+        for idx, cell in enumerate(zip(rows.tolist(), cols.tolist())):
+            buckets[cell].append(idx)
+        self.cells = {cell: np.array(idxs, dtype=np.int64) for cell, idxs in buckets.items()}
+        self.max_abs_lat = float(np.abs(self.lats).max()) if len(self.stores) else 0.0
+
+    def __len__(self):
+        return len(self.stores)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    def _candidates(self, row: int, col: int, row_span: int, col_span: int) -> np.ndarray:
+        """Store positions in the block of cells around (row, col)"""
+        found = [
+            self.cells[(r, c)]
+            for r in range(row - row_span, row + row_span + 1)
+            for c in range(col - col_span, col + col_span + 1)
+            if (r, c) in self.cells
+        ]
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    def within(self, center: Tuple[float, float], radius_miles: float) -> List[Tuple[StoreLike, float]]:
+        """Stores within radius_miles of center as (store, distance) pairs, nearest first"""
+        lat, lon = center
+        row, col = self._cell(lat, lon)
+        lat_span = radius_miles / MILES_PER_DEGREE
+        # Longitude degrees shrink towards the poles; widen the search to match
+        cos_lat = max(math.cos(math.radians(min(abs(lat) + lat_span, 89.9))), 1e-6)
+        lon_span = lat_span / cos_lat
+        idx = self._candidates(row, col,
+                               math.ceil(lat_span / self.cell_degrees),
+                               math.ceil(lon_span / self.cell_degrees))
+        if idx.size == 0:
+            return []
+
+        distances = haversine_miles(lat, lon, self.lats[idx], self.lons[idx])
+        mask = distances <= radius_miles
+        idx, distances = idx[mask], distances[mask]
+        order = np.argsort(distances, kind='stable')
+        return [(self.stores[i], float(d)) for i, d in zip(idx[order], distances[order])]
+
+    def nearest(self, center: Tuple[float, float], k: int = 5) -> List[Tuple[StoreLike, float]]:
+        """The k stores nearest to center as (store, distance) pairs"""
+        if k <= 0 or not self.stores:
+            return []
+        k = min(k, len(self.stores))
+        lat, lon = center
+        row, col = self._cell(lat, lon)
+        # Smallest width of a cell in miles anywhere the stores are
+        cell_miles = self.cell_degrees * MILES_PER_DEGREE * max(
+            math.cos(math.radians(max(self.max_abs_lat, abs(lat)))), 1e-6)
+
+        # Start at the first ring that can reach any occupied cell
+        rows = [r for r, _ in self.cells]
+        cols = [c for _, c in self.cells]
+        ring = max(min(rows) - row, row - max(rows), min(cols) - col, col - max(cols), 0)
+        while True:
+            idx = self._candidates(row, col, ring, ring)
+            if idx.size >= k:
+                distances = haversine_miles(lat, lon, self.lats[idx], self.lons[idx])
+                kth = np.partition(distances, k - 1)[k - 1]
+                # Anything outside the searched block is at least ring cells away
+                if kth <= ring * cell_miles or idx.size == len(self.stores):
+                    order = np.argsort(distances, kind='stable')[:k]
+                    return [(self.stores[idx[i]], float(distances[i])) for i in order]
+            ring += 1
+
+    def recenter(self, center: Tuple[float, float], radius_miles: float) -> List[StoreLike]:
+        """Copies of the stores within radius of a new centre, with 'distance' updated"""
+        return [replace(store, distance=distance) if isinstance(store, Store) else dict(store, distance=distance)
+                for store, distance in self.within(center, radius_miles)]
+
+    def save(self, path: str):
+        """Persist the index to an .npz file"""
+        np.savez_compressed(
+            path,
+            stores=np.array(json.dumps([s.to_row() if isinstance(s, Store) else s for s in self.stores],
+                                       default=str)),
+            cell_degrees=np.array(self.cell_degrees)
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'StoreIndex':
+        """Load an index written by save()"""
+        with np.load(path) as data:
+            stores = [Store(**s) if REQUIRED_STORE_FIELDS <= set(s) <= set(STORE_FIELDS) else s
+                      for s in json.loads(str(data['stores']))]
+            return cls(stores, float(data['cell_degrees']))
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(29.5, 31.5, 20000)
+    lons = rng.uniform(-92.5, -89.5, 20000)
+    index = StoreIndex([{'name': f"Store {i}", 'lat': a, 'lon': b}
+                        for i, (a, b) in enumerate(zip(lats, lons))])
+    for name, center in KNOWN_CENTERS.items():
+        start = time.perf_counter()
+        count = len(index.within(center, 10))
+        nearest = index.nearest(center, 5)
+        elapsed = time.perf_counter() - start
+        print(f"{name}: {count} stores within 10 mi, nearest {nearest[0][1]:.2f} mi "
+              f"({elapsed * 1e3:.2f} ms)")
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote_plus, urlsplit
+
+import httpx
+import lxml.html
+from lxml.cssselect import CSSSelector
+
+from response_cache import HttpCache, get_http_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0'}
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Registered adapters by name; scraper_for_url() picks one from a store's website
+SCRAPERS: Dict[str, 'StoreScraper'] = {}
+
+
+class StoreScraper:
+    """Per-store adapter: how to build a search URL and where the price is on the page
+
+    Selectors are compiled once per adapter, not per page.
+    """
+
+    name: str = ''
+    hosts: Tuple[str, ...] = ()
+    search_url: str = ''
+    price_selector: str = ''
+
+    def __init__(self, search_url: Optional[str] = None):
+        if search_url:
+            self.search_url = search_url
+        self._price = CSSSelector(self.price_selector)
+
+    def build_url(self, item: str) -> str:
+        return self.search_url.format(query=quote_plus(item))
+
+    def format_price(self, element) -> str:
+        return element.text_content().strip()
+
+    def parse(self, content: bytes) -> str:
+        """Raw price text of the first result on a search page, or 'N/A'"""
+        if not content:
+            return "N/A"
+        matches = self._price(lxml.html.fromstring(content))
+        return self.format_price(matches[0]) if matches else "N/A"
+
+
+def register(cls):
+    """Class decorator adding a default instance of the adapter to SCRAPERS"""
+    SCRAPERS[cls.name] = cls()
+    return cls
+
+
+def scraper_for_url(url: str, scrapers: Optional[Dict[str, StoreScraper]] = None) -> Optional[StoreScraper]:
+    """The registered adapter (or one of scrapers) whose host matches a store's website, if any"""
+    host = urlsplit(url).hostname or ''
+    for scraper in (scrapers or SCRAPERS).values():
+        if any(host == h or host.endswith('.' + h) for h in scraper.hosts):
+            return scraper
+    return None
+
+
+@register
+class WalmartScraper(StoreScraper):
+    name = 'walmart'
+    hosts = ('walmart.com',)
+    search_url = 'https://www.walmart.com/search?q={query}'
+    price_selector = 'span.price-characteristic'
+
+    def format_price(self, element) -> str:
+        # price-characteristic holds the dollars; the cents are in the price-mantissa span after it
+        dollars = element.text_content().strip()
+        cents = element.getnext()
+        if cents is not None and 'price-mantissa' in (cents.get('class') or '').split():
+            return f"${dollars}.{cents.text_content().strip()}"
+        return f"${dollars}"
+
+
+@register
+class RousesScraper(StoreScraper):
+    name = 'rouses'
+    hosts = ('rouses.com',)
+    search_url = 'https://www.rouses.com/shop/?s={query}'
+    # This selector may need to be updated based on Rouses' HTML
+    price_selector = 'span.woocommerce-Price-amount'
+
+
+class ScrapeSession:
+    """Shared keep-alive connection pool with a concurrency limit per host
+
+    Pages go through the conditional HTTP cache, so an unchanged page costs a 304.
+    """
+
+    def __init__(self, max_connections: int = 20, per_host: int = 4, timeout: float = 15.0,
+                 headers: Optional[Dict[str, str]] = None, http_cache: Optional[HttpCache] = None):
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.timeout = timeout
+        self.headers = headers or DEFAULT_HEADERS
+        self.http_cache = http_cache or get_http_cache()
+        self.stats = {'requests': 0, 'errors': 0}
+
+    async def _fetch(self, client: httpx.AsyncClient, limits: Dict[str, asyncio.Semaphore],
+                     scraper: StoreScraper, item: str) -> Dict[str, Any]:
+        url = scraper.build_url(item)
+        try:
+            async with limits[urlsplit(url).hostname]:
+                response = await self.http_cache.aget(client, url)
+            self.stats['requests'] += 1
+            price = scraper.parse(response.content) if response.status_code == 200 else "N/A"
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"Error scraping {scraper.name} for {item}: {e}")
+            price = "Error"
+        return {'store': scraper.name, 'item': item, 'url': url, 'price': price}
+
+    async def scrape_async(self, jobs: Iterable[Tuple[StoreScraper, str]]) -> List[Dict[str, Any]]:
+        """Fetch and parse (scraper, item) jobs concurrently, preserving input order"""
+        limits = defaultdict(lambda: asyncio.Semaphore(self.per_host))
+        pool = httpx.Limits(max_connections=self.max_connections,
+                            max_keepalive_connections=self.max_connections)
+        async with httpx.AsyncClient(headers=self.headers, limits=pool, timeout=self.timeout,
+                                     follow_redirects=True) as client:
+            return await asyncio.gather(*(self._fetch(client, limits, scraper, item)
+                                          for scraper, item in jobs))
+
+    def scrape(self, jobs: Iterable[Tuple[StoreScraper, str]]) -> List[Dict[str, Any]]:
+        """Blocking wrapper around scrape_async"""
+        jobs = list(jobs)
+        start = time.perf_counter()
+        results = asyncio.run(self.scrape_async(jobs))
+        logger.info(f"Scraped {len(jobs)} pages in {time.perf_counter() - start:.2f}s: "
+                    f"{self.stats}, HTTP cache {self.http_cache.stats}")
+        return results
+
+
+def serve_fixtures(directory: str = FIXTURE_DIR) -> ThreadingHTTPServer:
+    """Serve recorded search pages on a local port (query strings are ignored)"""
+    class FixtureHandler(SimpleHTTPRequestHandler):
+        # Keep-alive, so the pooled client can reuse connections
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def translate_path(self, path):
+            return super().translate_path(path.split('?', 1)[0])
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(FixtureHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def benchmark_fixtures():
+    """Time the recorded fixtures through a local server against the old serial path
+
+    Correctness is covered by tests/test_store_scrapers.py.
+    """
+    import tempfile
+    import requests
+    from bs4 import BeautifulSoup
+    from response_cache import ResponseCache
+
+    server = serve_fixtures()
+    tmp = tempfile.TemporaryDirectory()
+    http_cache = HttpCache(ResponseCache(os.path.join(tmp.name, 'cache.sqlite3')))
+    base = f"http://127.0.0.1:{server.server_port}"
+    scrapers = {
+        'walmart': (WalmartScraper(base + '/walmart_search.html?q={query}'), '$3.48', 'price-characteristic'),
+        'rouses': (RousesScraper(base + '/rouses_search.html?s={query}'), '$3.49', 'woocommerce-Price-amount'),
+    }
+    items = [f"item {i}" for i in range(50)]
+    try:
+        jobs = [(scraper, item) for scraper, _, _ in scrapers.values() for item in items]
+        start = time.perf_counter()
+        results = ScrapeSession(http_cache=http_cache).scrape(jobs)
+        pooled = time.perf_counter() - start
+        for result, (scraper, _) in zip(results, jobs):
+            assert result['price'] == scrapers[scraper.name][1], result
+
+        # Second pass: the fixture server answers If-Modified-Since with 304s
+        start = time.perf_counter()
+        results = ScrapeSession(http_cache=http_cache).scrape(jobs)
+        revalidated = time.perf_counter() - start
+        assert [r['price'] for r in results] == [scrapers[s.name][1] for s, _ in jobs]
+        assert http_cache.stats['not_modified'] == len(jobs), http_cache.stats
+
+        # The old path: a new connection per request, parsed with html.parser, one at a time
+        start = time.perf_counter()
+        for name, (scraper, expected, css_class) in scrapers.items():
+            for item in items:
+                response = requests.get(scraper.build_url(item), headers=DEFAULT_HEADERS)
+                soup = BeautifulSoup(response.content, "html.parser")
+                price_span = soup.find("span", class_=css_class)
+                price = price_span.text.strip() if price_span else "N/A"
+                # The old Walmart path read the dollars only ("$3" for $3.48)
+                assert expected.startswith(f"${price}" if name == 'walmart' else price)
+        serial = time.perf_counter() - start
+    finally:
+        server.shutdown()
+        http_cache.cache.close()
+        tmp.cleanup()
+    print(f"{len(jobs)} fixture pages: pooled async + lxml {pooled:.2f}s, "
+          f"serial requests + html.parser {serial:.2f}s")
+    print(f"re-scrape with conditional requests {revalidated:.2f}s: {http_cache.stats['not_modified']} x 304, "
+          f"{http_cache.stats['bytes_saved'] / 1e6:.1f} MB not downloaded")
+
+    content = open(os.path.join(FIXTURE_DIR, 'rouses_search.html'), 'rb').read()
+    scraper = scrapers['rouses'][0]
+    start = time.perf_counter()
+    for _ in range(200):
+        scraper.parse(content)
+    lxml_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(200):
+        BeautifulSoup(content, "html.parser").find("span", class_="woocommerce-Price-amount")
+    soup_time = time.perf_counter() - start
+    print(f"parse {len(content) // 1024} KB page: lxml {lxml_time / 200 * 1000:.2f} ms, "
+          f"html.parser {soup_time / 200 * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    benchmark_fixtures()
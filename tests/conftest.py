@@ -0,0 +1,67 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+# handler(path, query params, request headers, request body) -> (status, response headers, body)
+Handler = Callable[[str, Dict[str, str], Dict[str, str], bytes], Tuple[int, Dict[str, str], bytes]]
+
+
+class StubServer:
+    """Local HTTP server standing in for Overpass, a store website or the completion API"""
+
+    def __init__(self, handler: Handler):
+        self.handler = handler
+        self.requests: List[Tuple[str, Dict[str, str], Dict[str, str]]] = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _answer(self, body_in: bytes):
+                parts = urlsplit(self.path)
+                params = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+                headers = dict(self.headers.items())
+                with stub._lock:
+                    stub.requests.append((parts.path, params, headers))
+                status, out_headers, body = stub.handler(parts.path, params, headers, body_in)
+                self.send_response(status)
+                for name, value in out_headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._answer(b'')
+
+            def do_POST(self):
+                self._answer(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), RequestHandler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    """Start StubServers for a test: stub_server(handler) -> StubServer"""
+    servers = []
+
+    def start(handler: Handler) -> StubServer:
+        servers.append(StubServer(handler))
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.close()
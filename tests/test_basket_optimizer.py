@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from basket_optimizer import BasketOptimizer, _synthetic_problem
+
+
+def _road_problem(seed, stores=9, items=12):
+    """Like _synthetic_problem, with detour factors that break the triangle inequality"""
+    rng = np.random.default_rng(seed)
+    straight = _synthetic_problem(stores, items, seed, in_stock=0.6)
+    prices = np.where(np.isfinite(straight.prices), straight.prices, np.nan)
+    coords = rng.uniform((30.4, -91.7), (30.7, -91.4), (stores, 2))
+    road = straight.miles[1:, 1:] * rng.uniform(1.0, 3.0, (stores, stores))
+    return BasketOptimizer(prices, straight.miles[0, 1:], coords, store_miles=road)
+
+
+def _same_cost(a, b):
+    return (np.isinf(a.total_cost) and np.isinf(b.total_cost)) or np.isclose(a.total_cost, b.total_cost, atol=1e-6)
+
+
+@pytest.mark.parametrize('seed', range(12))
+@pytest.mark.parametrize('k', [1, 2, 3])
+def test_exact_matches_brute_force(seed, k):
+    for optimizer in (_synthetic_problem(10, 15, seed, in_stock=0.6), _road_problem(seed)):
+        exact, reference = optimizer.exact(k), optimizer.brute_force(k)
+        assert _same_cost(exact, reference), (exact, reference)
+        assert optimizer.local_search(k).total_cost >= exact.total_cost - 1e-9
+
+
+def test_items_sold_nowhere_are_unassigned():
+    prices = np.array([[1.0, np.nan, 2.0], [1.5, np.nan, 1.0]])
+    optimizer = BasketOptimizer(prices, [1.0, 1.0], np.array([[30.5, -91.5], [30.5, -91.5]]))
+    plan = optimizer.exact(2)
+    assert plan.assignment[1] == -1
+    assert plan.assignment[[0, 2]].tolist() == [0, 1]
+    assert plan.item_cost == pytest.approx(2.0)
+
+
+def test_from_frames_aligns_stores_and_items():
+    stores_df = pd.DataFrame({'store_id': [30, 10, 20], 'lat': [30.50, 30.51, 30.52],
+                              'lon': [-91.50, -91.51, -91.52]})
+    prices_df = pd.DataFrame({
+        'store_id': [10, 10, 20, 30, 30, 99],
+        'item_id':  [1, 2, 1, 2, 3, 1],
+        'price':    [1.10, 2.10, 1.20, 2.30, 3.30, 0.01],
+    })
+    optimizer = BasketOptimizer.from_frames(stores_df, prices_df, [2, 1, 4], (30.5, -91.5), quantities=[2, 1, 1])
+    # Rows follow stores_df, columns item_ids; store 99 isn't listed and item 4 is sold nowhere
+    expected = np.array([[4.60, np.inf], [4.20, 1.10], [np.inf, 1.20]])
+    np.testing.assert_allclose(optimizer.prices, expected)
+    assert optimizer.available.tolist() == [True, True, False]
+    assert optimizer.miles[0, 1] == pytest.approx(0.0, abs=1e-9)
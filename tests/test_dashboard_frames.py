@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard_frames import _rerun_before, build_frames
+from price_simulator import cube_dates, cube_to_frame, simulate_price_cube
+from price_snapshot import build_snapshot
+
+
+def _tables(seed=0, stores=12, items=8, days=10):
+    rng = np.random.default_rng(seed)
+    store_ids = np.arange(1, stores + 1, dtype=np.int32)
+    item_ids = np.arange(1, items + 1, dtype=np.int32)
+    # Stores share a few plazas, so markers get jittered
+    stores_df = pd.DataFrame({
+        'store_id': store_ids,
+        'store_name': ["Soprano's Supermarket" if i == 1 else f"Store {i}" for i in store_ids],
+        'address': [f"{i} Main Street" for i in store_ids],
+        'lat': np.round(30.5 + rng.integers(0, 4, stores) * 0.01, 4),
+        'lon': np.round(-91.5 + rng.integers(0, 4, stores) * 0.01, 4),
+    })
+    items_df = pd.DataFrame({'item_id': item_ids, 'name': [f"item {i}" for i in item_ids]})
+    cube = simulate_price_cube(rng.uniform(1, 25, items), rng.uniform(0.8, 1.3, stores), days, seed=seed)
+    prices_df = cube_to_frame(cube, cube_dates(days), store_ids, item_ids)
+    # Some stores don't carry some items at all, including my store
+    dropped = rng.random(stores * items) < 0.15
+    dropped[0] = True
+    missing = pd.MultiIndex.from_arrays([np.repeat(store_ids, items)[dropped], np.tile(item_ids, stores)[dropped]])
+    keep = ~pd.MultiIndex.from_frame(prices_df[['store_id', 'item_id']]).isin(missing)
+    return stores_df, items_df, prices_df[keep].reset_index(drop=True)
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_cached_frames_match_the_per_rerun_computation(seed):
+    stores_df, items_df, prices_df = _tables(seed)
+    frames = build_frames(stores_df, items_df, build_snapshot(prices_df), 'test')
+    assert frames.latest_date == prices_df['date'].max()
+    for selected in items_df['name']:
+        display, map_df = _rerun_before(stores_df, items_df, prices_df, selected)
+        pd.testing.assert_frame_equal(frames.recommendations_display, display)
+        item_map = frames.item_maps[frames.item_ids[selected]]
+        pd.testing.assert_frame_equal(item_map.points[map_df.columns], map_df)
+        assert item_map.icons['store_name'].tolist() == ["Soprano's Supermarket"]
+        assert len(item_map.icons) + len(item_map.others) == len(stores_df)
+        assert item_map.table['Price'].tolist() == map_df['price_str'].tolist()
+    assert (frames.item_maps[1].table['Price'] == 'N/A').any()
@@ -0,0 +1,29 @@
+import pandas as pd
+
+import data_collector
+from price_store import write_stores
+
+
+def _element(osm_id, name):
+    return {'type': 'node', 'id': osm_id, 'lat': 30.5, 'lon': -91.5, 'tags': {'name': name, 'shop': 'supermarket'}}
+
+
+def _serve(monkeypatch, elements):
+    monkeypatch.setattr(data_collector, 'fetch_overpass', lambda query, center: {'elements': elements})
+
+
+def test_store_ids_follow_osm_ids_across_runs(monkeypatch, tmp_path):
+    _serve(monkeypatch, [_element(901, 'Rouses Market'), _element(902, 'ALDI'), _element(901, 'Rouses Market')])
+    first = data_collector.get_nearby_stores(30.5, -91.5)
+    assert [(s['osm_id'], s['store_id']) for s in first] == [(901, 1), (902, 2)]
+
+    write_stores(pd.DataFrame(first), str(tmp_path))
+    known = data_collector.known_store_ids(str(tmp_path))
+    # Reordered, with one new store in front
+    _serve(monkeypatch, [_element(903, 'Target'), _element(902, 'ALDI'), _element(901, 'Rouses Market')])
+    second = data_collector.get_nearby_stores(30.5, -91.5, known_ids=known)
+    assert {s['osm_id']: s['store_id'] for s in second} == {901: 1, 902: 2, 903: 3}
+
+
+def test_no_saved_stores(tmp_path):
+    assert data_collector.known_store_ids(str(tmp_path)) == {}
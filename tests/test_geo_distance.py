@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from geopy.distance import geodesic
+
+from geo_distance import distances_from, geodesic_miles, haversine_miles
+
+BATON_ROUGE = (30.4515, -91.1871)
+
+
+def _relative_error(lat1, lon1, lat2, lon2):
+    exact = np.array([geodesic(a, b).miles for a, b in zip(zip(lat1, lon1), zip(lat2, lon2))])
+    return np.abs(haversine_miles(lat1, lon1, lat2, lon2) - exact) / exact
+
+
+def test_haversine_within_bound_around_baton_rouge():
+    rng = np.random.default_rng(0)
+    lats, lons = BATON_ROUGE[0] + rng.uniform(-1, 1, 300), BATON_ROUGE[1] + rng.uniform(-1, 1, 300)
+    assert _relative_error(np.full(300, BATON_ROUGE[0]), np.full(300, BATON_ROUGE[1]), lats, lons).max() <= 0.0035
+
+
+def test_haversine_within_bound_anywhere():
+    rng = np.random.default_rng(1)
+    points = rng.uniform((-80, -180, -80, -180), (80, 180, 80, 180), (300, 4))
+    assert _relative_error(*points.T).max() <= 0.006
+
+
+def test_haversine_broadcasts_and_is_zero_on_the_spot():
+    distances = haversine_miles(BATON_ROUGE[0], BATON_ROUGE[1], [BATON_ROUGE[0], 30.5594], [BATON_ROUGE[1], -91.5557])
+    assert distances.shape == (2,) and distances[0] == 0.0
+    assert distances[1] == pytest.approx(23.2, abs=0.1)
+
+
+def test_geodesic_method_matches_geopy():
+    lats, lons = [30.5594, 30.7015, 29.9511], [-91.5557, -91.4368, -90.0715]
+    found = distances_from(BATON_ROUGE, lats, lons, method='geodesic')
+    expected = [geodesic(BATON_ROUGE, point).miles for point in zip(lats, lons)]
+    np.testing.assert_allclose(found, expected, rtol=1e-12)
+    np.testing.assert_allclose(geodesic_miles(BATON_ROUGE[0], BATON_ROUGE[1], lats, lons), expected, rtol=1e-12)
+
+
+def test_unknown_method_raises():
+    with pytest.raises(ValueError, match='Unknown distance method'):
+        distances_from(BATON_ROUGE, [30.0], [-91.0], method='manhattan')
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import re
+import time
+
+import openai
+import pytest
+
+from llm_pricing import EstimationPipeline, TokenBucket, basket_max_tokens, parse_basket
+from response_cache import ResponseCache
+
+
+def completion(content, tokens=10):
+    return json.dumps({
+        'id': 'chatcmpl-test', 'object': 'chat.completion', 'created': 0, 'model': 'test-model',
+        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+        'usage': {'prompt_tokens': tokens, 'completion_tokens': 1, 'total_tokens': tokens + 1},
+    }).encode()
+
+
+class Completions:
+    """Completion stand-in: answer(prompt) gives the reply text, or an int status to fail with"""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.prompts = []
+        self.bodies = []
+
+    def __call__(self, path, params, headers, body):
+        assert path.endswith('/chat/completions')
+        request = json.loads(body)
+        prompt = request['messages'][0]['content']
+        self.prompts.append(prompt)
+        self.bodies.append(request)
+        reply = self.answer(prompt)
+        if isinstance(reply, int):
+            return reply, {'Content-Type': 'application/json'}, json.dumps({'error': {'message': 'busy'}}).encode()
+        return 200, {'Content-Type': 'application/json'}, completion(reply)
+
+
+def single_price(prompt):
+    return '3.49'
+
+
+def basket_prices(prompt):
+    items = re.findall(r'^- (.+)$', prompt, re.M)
+    if not items:
+        return '3.49'
+    return json.dumps([{'item': item, 'price': 2.5} for item in items])
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite3'))
+    yield cache
+    cache.close()
+
+
+def pipeline_for(server, cache, **kwargs):
+    client = openai.AsyncOpenAI(base_url=server.url + '/v1', api_key='test', max_retries=0)
+    kwargs.setdefault('backoff', 0.01)
+    return EstimationPipeline(model='test-model', cache=cache, client=client, **kwargs)
+
+
+def test_estimates_are_cached(stub_server, cache):
+    completions = Completions(single_price)
+    server = stub_server(completions)
+    pairs = [('Rouses Market', 'milk'), ('Walmart', 'eggs')]
+    first = pipeline_for(server, cache).estimate(pairs, day='2025-05-01')
+    assert [r['price'] for r in first] == [3.49, 3.49]
+
+    pipeline = pipeline_for(server, cache)
+    again = pipeline.estimate(pairs, day='2025-05-01')
+    assert [r['price'] for r in again] == [3.49, 3.49]
+    assert len(completions.prompts) == 2
+    assert pipeline.stats['cached'] == 2 and pipeline.stats['requested'] == 0
+
+    # A new day is a new question
+    pipeline_for(server, cache).estimate(pairs[:1], day='2025-05-02')
+    assert len(completions.prompts) == 3
+
+
+def test_unparsable_answers_are_not_cached(stub_server, cache):
+    completions = Completions(lambda prompt: "I don't have access to current prices.")
+    server = stub_server(completions)
+    for _ in range(2):
+        result = pipeline_for(server, cache).estimate([('Target', 'milk')], day='2025-05-01')[0]
+        assert result['price'] is None and result['text']
+    assert len(completions.prompts) == 2
+
+
+def test_rate_limited_requests_are_retried(stub_server, cache):
+    answers = iter([429, 503])
+    completions = Completions(lambda prompt: next(answers, '4.19'))
+    server = stub_server(completions)
+    pipeline = pipeline_for(server, cache)
+    result = pipeline.estimate([('ALDI', 'bread')], day='2025-05-01')[0]
+    assert result['price'] == 4.19
+    assert pipeline.stats['retries'] == 2 and len(completions.prompts) == 3
+
+
+def test_non_retryable_error_fails_the_pair(stub_server, cache):
+    completions = Completions(lambda prompt: 400)
+    server = stub_server(completions)
+    pipeline = pipeline_for(server, cache)
+    assert pipeline.estimate([('ALDI', 'bread')], day='2025-05-01')[0]['price'] is None
+    assert pipeline.stats['failed'] == 1 and len(completions.prompts) == 1
+
+
+def test_requests_are_rate_limited(stub_server, cache):
+    server = stub_server(Completions(single_price))
+    # 600/minute = 10 per second with a burst of 10, so 25 requests need at least 1.5 s
+    pipeline = pipeline_for(server, cache, requests_per_minute=600, concurrency=25)
+    start = time.perf_counter()
+    results = pipeline.estimate([('Store', f"item {i}") for i in range(25)], day='2025-05-01')
+    assert time.perf_counter() - start >= 1.4
+    assert all(r['price'] == 3.49 for r in results)
+
+
+def test_token_bucket_waits_for_refill():
+    async def take(n):
+        bucket = TokenBucket(rate=20, capacity=5)
+        start = time.perf_counter()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.perf_counter() - start
+
+    assert asyncio.run(take(5)) < 0.1
+    assert asyncio.run(take(15)) >= 0.45
+
+
+def test_basket_with_missing_items_falls_back(stub_server, cache):
+    def answer(prompt):
+        if prompt.lstrip().startswith('Estimate'):
+            return json.dumps([{'item': 'milk', 'price': 3.29}, {'item': 'eggs', 'price': 'about two dollars'}])
+        return '5.99'
+
+    completions = Completions(answer)
+    server = stub_server(completions)
+    results = pipeline_for(server, cache).estimate_baskets([('Rouses Market', ['milk', 'eggs', 'bread'])],
+                                                           day='2025-05-01', baseline_samples=0)[0]
+    # eggs came back without a usable price and bread not at all: both are asked on their own
+    assert [(r['item'], r['price'], r['mode']) for r in results] == [
+        ('milk', 3.29, 'batch'), ('eggs', 5.99, 'single'), ('bread', 5.99, 'single')]
+    assert len(completions.prompts) == 3
+
+
+def test_unparsable_basket_is_not_cached(stub_server, cache):
+    completions = Completions(lambda prompt: 'Sorry, I cannot help with that.')
+    server = stub_server(completions)
+    for _ in range(2):
+        pipeline_for(server, cache).estimate_baskets([('Target', ['milk', 'eggs'])], day='2025-05-01',
+                                                     baseline_samples=0)
+    baskets = [p for p in completions.prompts if p.lstrip().startswith('Estimate')]
+    assert len(baskets) == 2
+
+
+def test_parse_basket_drops_bad_entries():
+    text = 'Here you go: [{"item": "Milk", "price": 3.5}, {"item": "eggs", "price": -1}, ' \
+           '{"item": "caviar", "price": 90}, {"item": "milk", "price": 4}, {"item": "bread", "price": "$2.99"}]'
+    assert parse_basket(text, ['milk', 'eggs', 'bread']) == {'milk': 3.5, 'bread': 2.99}
+    assert parse_basket('no json here', ['milk']) == {}
+
+
+def test_basket_cap_fits_the_answer(stub_server, cache):
+    items = ['Orange Juice (1/2 gal)', 'Toilet Paper (12pk)', 'Organic Apples (1lb)', 'Gluten-Free Bread'] * 10
+    items = [f"{name} #{i}" for i, name in enumerate(items)]
+    answer = json.dumps([{'item': name, 'price': 12.99} for name in items])
+    # Even at 3 characters per token the full answer fits
+    assert basket_max_tokens(items) >= len(answer) / 3
+
+    completions = Completions(basket_prices)
+    server = stub_server(completions)
+    pipeline_for(server, cache, max_tokens=8).estimate_baskets([('Walmart', items)], day='2025-05-01',
+                                                               baseline_samples=0)
+    assert completions.bodies[0]['max_tokens'] == basket_max_tokens(items)
+    assert len(completions.prompts) == 1
+
+
+def test_blocking_wrapper_makes_no_baseline_calls_by_default(stub_server, cache):
+    completions = Completions(basket_prices)
+    server = stub_server(completions)
+    results = pipeline_for(server, cache).estimate_baskets([('Target', ['milk', 'eggs'])], day='2025-05-01')
+    assert [r['mode'] for r in results[0]] == ['batch', 'batch']
+    assert len(completions.prompts) == 1
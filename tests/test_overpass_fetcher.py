@@ -0,0 +1,121 @@
+import json
+import re
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from geo_distance import haversine_miles
+from overpass_fetcher import fetch_stores_tiled, make_tiles
+from response_cache import OverpassError, ResponseCache
+
+CENTER = (30.4515, -91.1871)
+RADIUS = 40
+TILE_MILES = 25
+BBOX = re.compile(r'\(([-\d.]+),([-\d.]+),([-\d.]+),([-\d.]+)\)')
+
+
+def _nodes():
+    rng = np.random.default_rng(0)
+    lats = CENTER[0] + rng.uniform(-0.7, 0.7, 400)
+    lons = CENTER[1] + rng.uniform(-0.8, 0.8, 400)
+    nodes = [{'type': 'node', 'id': i, 'lat': float(lat), 'lon': float(lon), 'tags': {'shop': 'supermarket'}}
+             for i, (lat, lon) in enumerate(zip(lats, lons))]
+    # One store exactly on the edge between two tiles, returned by both
+    south, west, north, east = make_tiles(CENTER, RADIUS, TILE_MILES)[0]
+    nodes.append({'type': 'node', 'id': 10_000, 'lat': round(north, 6), 'lon': round((west + east) / 2, 6),
+                  'tags': {'shop': 'supermarket'}})
+    return nodes
+
+
+NODES = _nodes()
+
+
+class Overpass:
+    """Answers tile queries with the nodes in their box; failures[tile] lists statuses to send first"""
+
+    def __init__(self, failures=None):
+        self.failures = {bbox: list(statuses) for bbox, statuses in (failures or {}).items()}
+        self.attempts = Counter()
+
+    def __call__(self, path, params, headers, body):
+        bbox = tuple(float(v) for v in BBOX.search(params['data']).groups())
+        self.attempts[bbox] += 1
+        pending = self.failures.get(bbox)
+        if pending:
+            return pending.pop(0), {}, b'busy'
+        south, west, north, east = bbox
+        inside = [n for n in NODES if south <= n['lat'] <= north and west <= n['lon'] <= east]
+        return 200, {'Content-Type': 'application/json'}, json.dumps({'elements': inside}).encode()
+
+
+def _tile_key(bbox):
+    return tuple(float(f"{v:.6f}") for v in bbox)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite3'))
+    yield cache
+    cache.close()
+
+
+def _fetch(server, cache, retries=3):
+    return fetch_stores_tiled(CENTER, RADIUS, tile_miles=TILE_MILES, max_workers=4, retries=retries,
+                              backoff=0, url=server.url, cache=cache)
+
+
+def _expected_ids():
+    distances = haversine_miles(CENTER[0], CENTER[1], [n['lat'] for n in NODES], [n['lon'] for n in NODES])
+    return {n['id'] for n, d in zip(NODES, distances) if d <= RADIUS}
+
+
+def test_tiles_are_merged_deduplicated_and_clipped(stub_server, cache):
+    overpass = Overpass()
+    server = stub_server(overpass)
+    elements = _fetch(server, cache)['elements']
+    ids = [e['id'] for e in elements]
+    assert len(ids) == len(set(ids))
+    assert set(ids) == _expected_ids()
+    assert 10_000 in ids
+    assert len(server.requests) == len(make_tiles(CENTER, RADIUS, TILE_MILES))
+
+
+def test_rate_limited_and_timed_out_tiles_are_retried(stub_server, cache):
+    tiles = [_tile_key(t) for t in make_tiles(CENTER, RADIUS, TILE_MILES)]
+    overpass = Overpass({tiles[0]: [429, 429], tiles[1]: [504], tiles[-1]: [503, 502]})
+    server = stub_server(overpass)
+    elements = _fetch(server, cache)['elements']
+    assert {e['id'] for e in elements} == _expected_ids()
+    assert overpass.attempts[tiles[0]] == 3
+    assert overpass.attempts[tiles[1]] == 2
+    assert overpass.attempts[tiles[-1]] == 3
+    assert all(overpass.attempts[t] == 1 for t in tiles[2:-1])
+
+
+def test_retries_run_out(stub_server, cache):
+    tiles = [_tile_key(t) for t in make_tiles(CENTER, RADIUS, TILE_MILES)]
+    overpass = Overpass({tiles[0]: [504] * 10})
+    server = stub_server(overpass)
+    with pytest.raises(OverpassError) as error:
+        _fetch(server, cache, retries=2)
+    assert error.value.status_code == 504
+    assert overpass.attempts[tiles[0]] == 3
+
+
+def test_bad_request_is_not_retried(stub_server, cache):
+    tiles = [_tile_key(t) for t in make_tiles(CENTER, RADIUS, TILE_MILES)]
+    overpass = Overpass({tiles[0]: [400]})
+    server = stub_server(overpass)
+    with pytest.raises(OverpassError) as error:
+        _fetch(server, cache)
+    assert error.value.status_code == 400
+    assert overpass.attempts[tiles[0]] == 1
+
+
+def test_second_fetch_is_served_from_the_cache(stub_server, cache):
+    server = stub_server(Overpass())
+    first = _fetch(server, cache)
+    requests = len(server.requests)
+    assert _fetch(server, cache) == first
+    assert len(server.requests) == requests
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from overpass_stream import iter_elements, stream_elements
+from response_cache import OverpassError
+
+ELEMENTS = [
+    {'type': 'node', 'id': 1, 'lat': 30.4515, 'lon': -91.1871, 'tags': {'name': 'Café Rouses', 'shop': 'supermarket'}},
+    {'type': 'node', 'id': 2, 'lat': 30.5, 'lon': -91.2, 'tags': {'name': 'Tienda – 日本 🛒', 'elements': '[1, 2]'}},
+    {'type': 'way', 'id': 3, 'center': {'lat': 30.4, 'lon': -91.1}, 'tags': {'name': 'Corner "elements": [ Store'}},
+]
+
+# Overpass-shaped payload with the key also appearing as a string value, a nested key and inside a string
+PAYLOAD = ('{"version": 0.6, "generator": "elements", "osm3s": {"elements": [{"id": -1}], '
+           '"copyright": "\\"elements\\": [ not this"}, "counts": [7, 8],\n"elements": [\n'
+           + ',\n'.join(json.dumps(element, ensure_ascii=False) for element in ELEMENTS)
+           + '\n],\n"remark": "ok"}\n').encode('utf-8')
+
+
+def _chunks(payload, size):
+    return [payload[i:i + size] for i in range(0, len(payload), size)]
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64, 4096])
+def test_chunk_boundaries_anywhere(size):
+    assert list(iter_elements(_chunks(PAYLOAD, size))) == ELEMENTS
+
+
+def test_multibyte_characters_split_across_chunks():
+    name = 'Tienda – 日本 🛒'.encode('utf-8')
+    split = PAYLOAD.index(name) + len('Tienda ') + 1  # Inside the three-byte dash
+    assert list(iter_elements([PAYLOAD[:split], PAYLOAD[split:]])) == ELEMENTS
+
+
+def test_text_chunks():
+    text = PAYLOAD.decode('utf-8')
+    assert list(iter_elements(text[i:i + 5] for i in range(0, len(text), 5))) == ELEMENTS
+
+
+def test_number_split_across_chunks_is_not_cut_short():
+    payload = b'{"version": 0.6, "elements": [12345, 6.75e2]}'
+    assert list(iter_elements(_chunks(payload, 1))) == [12345, 675.0]
+
+
+@pytest.mark.parametrize('payload', [b'{"elements": []}', b'{"version": 0.6, "elements": [ \n ], "remark": "empty"}'])
+def test_empty_array(payload):
+    assert list(iter_elements(_chunks(payload, 1))) == []
+
+
+def test_missing_key_yields_nothing():
+    assert list(iter_elements([b'{"version": 0.6, "remark": "runtime error"}'])) == []
+
+
+def test_other_key():
+    payload = b'{"elements": [{"id": 1}], "ways": [{"id": 2}]}'
+    assert list(iter_elements(_chunks(payload, 3), key='ways')) == [{'id': 2}]
+
+
+@pytest.mark.parametrize('cut', [len(b'{"elements": ['), len(b'{"elements": [{"id": 1}, {"id"'),
+                                 len(b'{"elements": [{"id": 1}, {"id": 2}')])
+def test_payload_ending_inside_the_array(cut):
+    payload = b'{"elements": [{"id": 1}, {"id": 2}]}'[:cut]
+    with pytest.raises(ValueError, match="Payload ended inside 'elements'"):
+        list(iter_elements(_chunks(payload, 4)))
+
+
+def test_key_that_is_not_an_array():
+    with pytest.raises(ValueError, match="Expected '\\['"):
+        list(iter_elements([b'{"elements": {"id": 1}}']))
+
+
+def test_stream_elements_reads_the_response(stub_server):
+    server = stub_server(lambda path, params, headers, body: (200, {'Content-Type': 'application/json'}, PAYLOAD))
+    assert list(stream_elements('[out:json];node;out;', url=f"{server.url}/api/interpreter", chunk_size=5)) == ELEMENTS
+    assert server.requests[0][1] == {'data': '[out:json];node;out;'}
+
+
+def test_stream_elements_raises_on_error_status(stub_server):
+    server = stub_server(lambda path, params, headers, body: (429, {}, b'rate limited'))
+    with pytest.raises(OverpassError):
+        list(stream_elements('q', url=server.url))
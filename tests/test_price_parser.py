@@ -0,0 +1,56 @@
+import pytest
+
+from price_parser import _SAMPLES, parse_price, parse_price_text
+
+
+@pytest.mark.parametrize('text, expected', _SAMPLES)
+def test_samples(text, expected):
+    assert parse_price(text) == expected
+
+
+def test_fractional_size_is_not_a_per_unit_quote():
+    parsed = parse_price_text('Orange Juice (1/2 gal) $3.99')
+    assert (parsed.price, parsed.size, parsed.unit) == (3.99, 64.0, 'fl oz')
+    assert parsed.unit_price == round(3.99 / 64, 4)
+
+
+def test_range_keeps_its_unit():
+    parsed = parse_price_text('$3.99 – $4.49 per lb')
+    assert (parsed.low, parsed.high, parsed.price) == (3.99, 4.49, 4.24)
+    assert (parsed.size, parsed.unit, parsed.unit_price) == (16.0, 'oz', round(4.24 / 16, 4))
+    assert parse_price_text('$3.99 - $4.49/2 lb').size == 32.0
+
+
+def test_offers_are_not_fractions():
+    parsed = parse_price_text('3/$10')
+    assert (parsed.multi_buy, parsed.price) == (3, 3.33)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Was $4.99 now $3.99', 3.99),
+    ('$3.99 (was $4.99)', 3.99),
+    ('Reg. $5.49, sale $4.49', 4.49),
+    ('Regular price: $5.49 Sale price: $4.29', 4.29),
+    ('was 99¢ now 89¢', 0.89),
+    ('was 2 for $6, now 2 for $5', 2.5),
+])
+def test_now_price_beats_was_price(text, expected):
+    assert parse_price(text) == expected
+
+
+def test_was_price_alone_is_the_fallback():
+    assert parse_price('Was $4.99') == 4.99
+    assert parse_price('The price was 3.99') == 3.99
+    assert parse_price('was 2 for $6') == 3.0
+
+
+def test_price_before_count_is_a_multi_buy():
+    parsed = parse_price_text('$5 for 2')
+    assert (parsed.multi_buy, parsed.deal_price, parsed.price) == (2, 2.5, 2.5)
+    assert parse_price_text('$10 for 3 (12 oz each)')[:6] == (3.33, 3.33, 3.33, 3, 3.33, 12.0)
+
+
+def test_price_for_a_size_is_not_a_multi_buy():
+    parsed = parse_price_text('$5 for 2 lb')
+    assert (parsed.multi_buy, parsed.price, parsed.size, parsed.unit) == (None, 5.0, 32.0, 'oz')
+    assert parse_price_text('$4.99 for 12 oz').multi_buy is None
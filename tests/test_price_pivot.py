@@ -0,0 +1,59 @@
+import csv
+from dataclasses import asdict
+
+import numpy as np
+
+from price_pivot import PriceIndex, write_pivot_report
+from price_records import PriceTable, Store
+
+
+def _baseline_pivot(data, filename):
+    """GroceryPriceComparer.save_to_csv's report writer before price_pivot (a next() scan per cell)"""
+    stores = sorted(set(item['store'] for item in data))
+    items = sorted(set(item['item'] for item in data))
+    headers = ['Item'] + stores
+    with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(headers)
+        for item in items:
+            row = [item]
+            for store in stores:
+                price_data = next((p for p in data if p['item'] == item and p['store'] == store), None)
+                price = f"${price_data['price']:.2f}" if price_data else "N/A"
+                row.append(price)
+            writer.writerow(row)
+        writer.writerow(['Average Price'] + [
+            f"${sum(p['price'] for p in data if p['store'] == store) / len(items):.2f}"
+            for store in stores
+        ])
+        writer.writerow(['Distance (miles)'] + [
+            f"{next((p['distance'] for p in data if p['store'] == store), 'N/A'):.1f}"
+            for store in stores
+        ])
+
+
+def _table():
+    stores = [Store(name, 'N/A', 30.0 + i / 100, -91.0, 1.25 * (i + 1), 'supermarket', 'supermarket', 'N/A', 'N/A')
+              for i, name in enumerate(['Walmart', 'ALDI', 'Rouses Market'])]
+    items = ['Milk, 1 gal', 'Eggs (dozen)', 'Bread']
+    # Rouses has no bread; ALDI's milk is observed twice and the first price must win
+    store_codes = [0, 0, 0, 1, 1, 1, 1, 2, 2]
+    item_codes = [0, 1, 2, 0, 1, 2, 0, 0, 1]
+    prices = [3.48, 2.98, 1.5, 3.19, 2.45, 1.29, 9.99, 3.99, 3.05]
+    return PriceTable(stores, items, ['2025-05-20'], store_codes, item_codes, np.zeros(9), prices)
+
+
+def test_matches_the_baseline_writer_byte_for_byte(tmp_path):
+    table = _table()
+    records = [asdict(observation) for observation in table.observations()]
+    for data in (table, records):
+        new, old = tmp_path / 'new.csv', tmp_path / 'old.csv'
+        write_pivot_report(data, str(new))
+        _baseline_pivot(records, str(old))
+        assert new.read_bytes() == old.read_bytes()
+
+
+def test_first_observation_wins():
+    index = PriceIndex(_table())
+    assert index.get('Milk, 1 gal', 'ALDI') == 3.19
+    assert index.get('Bread', 'Rouses Market') is None
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from price_recommendations import _benchmark_frames, calculate_price_recommendations
+
+
+def _reference_recommendations(prices_df, stores_df, items_df, my_store_id=1):
+    """The original per-item loop from the dashboard"""
+    latest_date = prices_df['date'].max()
+    latest_prices = prices_df[prices_df['date'] == latest_date]
+    price_stats = []
+    for item_id in items_df['item_id']:
+        item_prices = latest_prices[latest_prices['item_id'] == item_id]
+        my_store_prices = item_prices[item_prices['store_id'] == my_store_id]['price']
+        my_price = my_store_prices.iloc[0] if not my_store_prices.empty else np.nan
+        other_prices = item_prices[item_prices['store_id'] != my_store_id]['price']
+        avg_price = other_prices.mean()
+        min_price = other_prices.min()
+        max_price = other_prices.max()
+        item_details = items_df[items_df['item_id'] == item_id].iloc[0]
+        target_margin = 0.20
+        estimated_cost = avg_price * 0.7 if not np.isnan(avg_price) else np.nan
+        current_margin = (my_price - estimated_cost) / my_price if not np.isnan(my_price) and not np.isnan(estimated_cost) else np.nan
+        margin_gap = current_margin - target_margin if not np.isnan(current_margin) else np.nan
+        recommended_price = estimated_cost / (1 - target_margin) if not np.isnan(estimated_cost) else np.nan
+        price_stats.append({
+            'item_id': item_id,
+            'item_name': item_details['name'],
+            'target_margin': target_margin,
+            'current_margin': current_margin,
+            'margin_gap': margin_gap,
+            'my_price': my_price,
+            'avg_price': avg_price,
+            'min_price': min_price,
+            'max_price': max_price,
+            'recommended_price': round(recommended_price, 2) if not np.isnan(recommended_price) else np.nan,
+            'price_difference': round(my_price - avg_price, 2) if not np.isnan(my_price) and not np.isnan(avg_price) else np.nan,
+            'price_difference_percent': round((my_price - avg_price) / avg_price * 100, 1) if not np.isnan(my_price) and not np.isnan(avg_price) and avg_price != 0 else np.nan
+        })
+    return pd.DataFrame(price_stats)
+
+
+def _frames(seed):
+    """Seeded prices with 5% gaps and an unpriced item, plus items only one store sells"""
+    prices_df, stores_df, items_df = _benchmark_frames(60, 8, seed)
+    items = len(items_df)
+    only_mine = pd.DataFrame({'store_id': [1], 'item_id': [items + 1], 'price': [3.49], 'date': '2025-05-21'})
+    only_theirs = pd.DataFrame({'store_id': [5], 'item_id': [items + 2], 'price': [2.19], 'date': '2025-05-21'})
+    prices_df = pd.concat([prices_df, only_mine, only_theirs], ignore_index=True)
+    items_df = pd.concat([items_df, pd.DataFrame({'item_id': [items + 1, items + 2],
+                                                  'name': ['only mine', 'only theirs']})], ignore_index=True)
+    return prices_df, stores_df, items_df
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_matches_the_loop_version(seed):
+    prices_df, stores_df, items_df = _frames(seed)
+    expected = _reference_recommendations(prices_df, stores_df, items_df)
+    actual = calculate_price_recommendations(prices_df, stores_df, items_df)
+    assert expected['my_price'].isna().any() and expected['avg_price'].isna().any()
+    # groupby means use compensated summation, so they can differ from Series.mean()
+    # in the last bit; that can flip a rounded value by one step on a .5 boundary
+    rounded = {'recommended_price': 0.01, 'price_difference': 0.01, 'price_difference_percent': 0.1}
+    pd.testing.assert_frame_equal(actual.drop(columns=list(rounded)), expected.drop(columns=list(rounded)),
+                                  check_dtype=False, rtol=1e-12)
+    for column, step in rounded.items():
+        assert actual[column].isna().equals(expected[column].isna()), column
+        assert ((actual[column] - expected[column]).abs().dropna() <= step + 1e-9).all(), column
+
+
+def test_single_store_items():
+    prices_df, stores_df, items_df = _frames(0)
+    actual = calculate_price_recommendations(prices_df, stores_df, items_df).set_index('item_name')
+    assert actual.loc['only mine', 'my_price'] == 3.49 and np.isnan(actual.loc['only mine', 'avg_price'])
+    assert np.isnan(actual.loc['only theirs', 'my_price']) and actual.loc['only theirs', 'avg_price'] == 2.19
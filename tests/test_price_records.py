@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from price_records import PriceTable, Store, branch_labels, brand_key
+
+
+def _store(name, osm_id=0, distance=1.0, address='N/A', brand='N/A', lat=30.0, lng=-91.0):
+    chain = brand_key(brand if brand != 'N/A' else name)
+    return Store(name, address, lat, lng, distance, 'supermarket', 'supermarket', brand, 'N/A', osm_id, chain)
+
+
+def test_from_matrix_is_store_major():
+    stores = [_store('Walmart', 1, 2.5), _store('ALDI', 2, 4.0)]
+    matrix = np.array([[3.481, 2.98, 1.5], [3.19, 2.45, 1.29]])
+    table = PriceTable.from_matrix(stores, ['milk', 'eggs', 'bread'], matrix, '2025-05-20')
+    assert len(table) == 6
+    assert table.store_codes.dtype == np.int32 and table.date_codes.dtype == np.int16
+    observations = list(table.observations())
+    assert (observations[0].store, observations[0].item, observations[0].price) == ('Walmart', 'milk', 3.48)
+    assert (observations[5].store, observations[5].item, observations[5].price) == ('ALDI', 'bread', 1.29)
+    np.testing.assert_array_equal(table.distances, [2.5] * 3 + [4.0] * 3)
+    assert {o.date for o in observations} == {'2025-05-20'}
+
+
+@pytest.mark.parametrize('text, key', [
+    ('Walmart Supercenter', 'walmart'), ('Walmart Neighborhood Market', 'walmart'), ('walmart', 'walmart'),
+    ("Rouse's Market", 'rouses'), ('Rouse’s Market', 'rouses'), ('Winn-Dixie', 'winn dixie'),
+    ('Dollar General Store 1234', 'dollar general'), ('Market', 'market'), ('', ''),
+])
+def test_brand_key(text, key):
+    assert brand_key(text) == key
+
+
+def test_same_named_branches_stay_separate():
+    stores = [_store('Walmart', 101, address='460 Hospital Rd'), _store('Walmart', 102, address='12 Main St'),
+              _store('Walmart', 103, address='12 Main St'), _store('Walmart', 0, lat=30.12341, lng=-91.5),
+              _store('ALDI', 201)]
+    assert branch_labels(stores) == ['Walmart (460 Hospital Rd)', 'Walmart #102', 'Walmart #103',
+                                     'Walmart (30.1234, -91.5000)', 'ALDI']
+    assert len({store.key for store in stores}) == 5
+
+    table = PriceTable.from_matrix(stores, ['milk'], np.array([[3.0], [3.2], [3.4], [3.6], [2.9]]), '2025-05-20')
+    by_branch = {o.store: o.price for o in table.observations()}
+    assert len(by_branch) == 5 and by_branch['Walmart #103'] == 3.4
+
+
+def test_brand_rollup_averages_branches():
+    stores = [_store('Walmart Supercenter', 1, distance=6.0, brand='Walmart', address='far'),
+              _store('Walmart Neighborhood Market', 2, distance=2.0, brand='Walmart', address='near'),
+              # Unbranded (no chain key): stays on its own
+              Store('Corner Store', 'N/A', 30.0, -91.0, 1.0, 'convenience', 'convenience', 'N/A', 'N/A', 3, ''),
+              _store('ALDI', 4, distance=3.0)]
+    items = ['milk', 'eggs']
+    # Two days; the near Walmart has no eggs on the second day
+    table = PriceTable(stores, items, ['2025-05-20', '2025-05-21'],
+                       store_codes=[0, 0, 1, 1, 2, 2, 3, 3, 0, 0, 1],
+                       item_codes=[0, 1, 0, 1, 0, 1, 0, 1, 0, 1, 0],
+                       date_codes=[0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1],
+                       prices=[3.00, 2.00, 4.00, 2.50, 5.00, 3.00, 2.80, 1.90, 3.10, 2.20, 3.30])
+    brands = table.rollup()
+    assert [store.name for store in brands.stores] == ['Walmart', 'Corner Store', 'ALDI']
+    walmart = brands.stores[0]
+    assert (walmart.distance, walmart.address, walmart.osm_id) == (2.0, 'near', 0)
+    assert table.brand_codes().tolist() == [0, 0, 1, 2]
+
+    prices = {(brands.stores[s].name, items[i], brands.dates[d]): p for s, i, d, p in zip(
+        brands.store_codes.tolist(), brands.item_codes.tolist(), brands.date_codes.tolist(), brands.prices.tolist())}
+    assert prices[('Walmart', 'milk', '2025-05-20')] == 3.50
+    assert prices[('Walmart', 'eggs', '2025-05-20')] == 2.25
+    assert prices[('Walmart', 'milk', '2025-05-21')] == 3.20
+    assert prices[('Walmart', 'eggs', '2025-05-21')] == 2.20
+    assert prices[('Corner Store', 'milk', '2025-05-20')] == 5.00
+    assert len(prices) == 8
+    assert table.rollup() is brands
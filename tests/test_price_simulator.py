@@ -0,0 +1,59 @@
+import zlib
+from datetime import date
+
+import numpy as np
+
+from price_simulator import (cube_dates, cube_to_frame, load_cube, name_seed, save_cube, simulate_flat_prices,
+                             simulate_price_cube, simulate_price_days)
+
+BASES, MULTIPLIERS = [3.99, 4.99, 0.69, 24.99], [1.0, 0.9, 1.3]
+
+
+def test_same_seed_same_prices():
+    np.testing.assert_array_equal(simulate_price_cube(BASES, MULTIPLIERS, 5, seed=7),
+                                  simulate_price_cube(BASES, MULTIPLIERS, 5, seed=7))
+    assert not np.array_equal(simulate_price_cube(BASES, MULTIPLIERS, 5, seed=7),
+                              simulate_price_cube(BASES, MULTIPLIERS, 5, seed=8))
+    names = ['osm:1', 'osm:2', 'Walmart@30.1,-91.0']
+    np.testing.assert_array_equal(simulate_flat_prices(names, 10, 3), simulate_flat_prices(names, 10, 3))
+
+
+def test_store_rows_ignore_the_other_stores():
+    alone = simulate_flat_prices(['osm:2'], 30)[0]
+    crowded = simulate_flat_prices(['osm:9', 'osm:1', 'osm:2', 'osm:5'], 30)
+    reordered = simulate_flat_prices(['osm:2', 'osm:5', 'osm:9'], 30)
+    np.testing.assert_array_equal(crowded[2], alone)
+    np.testing.assert_array_equal(reordered[0], alone)
+    assert not np.array_equal(crowded[0], crowded[1])
+    assert ((alone >= 2.0) & (alone <= 2.99)).all()
+
+
+def test_name_seed_is_stable():
+    # crc32, so the same in every process (hash() is salted)
+    assert name_seed('Walmart Supercenter') == zlib.crc32(b'Walmart Supercenter') == 2449091657
+
+
+def test_days_simulate_alike_alone_or_in_a_history():
+    dates = cube_dates(10, end=date(2025, 5, 21))
+    history = simulate_price_days(BASES, MULTIPLIERS, dates)
+    np.testing.assert_array_equal(simulate_price_days(BASES, MULTIPLIERS, dates[3:4])[0], history[3])
+    assert dates[0] == '2025-05-21' and dates[-1] == '2025-05-12'
+
+
+def test_cube_to_frame_layout():
+    cube = simulate_price_cube(BASES, MULTIPLIERS, 2)
+    frame = cube_to_frame(cube, ['2025-05-21', '2025-05-20'], [11, 12, 13], [1, 2, 3, 4])
+    assert len(frame) == cube.size
+    row = frame[(frame['date'] == '2025-05-20') & (frame['store_id'] == 13) & (frame['item_id'] == 2)]
+    assert row['price'].item() == cube[1, 2, 1]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    cube = simulate_price_cube(BASES, MULTIPLIERS, 3)
+    dates, store_ids, item_ids = ['2025-05-21', '2025-05-20', '2025-05-19'], [4, 5, 6], [1, 2, 3, 4]
+    path = str(tmp_path / 'cube.npz')
+    save_cube(path, cube, dates, store_ids, item_ids)
+    loaded, loaded_dates, loaded_stores, loaded_items = load_cube(path)
+    # Stored as float32: cents survive rounding
+    np.testing.assert_array_equal(np.round(loaded, 2), cube)
+    assert (loaded_dates, loaded_stores, loaded_items) == (dates, store_ids, item_ids)
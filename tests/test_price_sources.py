@@ -0,0 +1,115 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from price_sources import (MIN_CONFIDENCE, PriceScheduler, SimulatedSource, SnapshotSource, WorkUnit,
+                           observe, price_rows, work_units)
+
+DAY = '2025-05-21'
+
+
+class FakeSource:
+    """Answers from a {(store_id, item_id): (price, confidence)} table, recording what it was offered"""
+
+    def __init__(self, name, cost, answers, limit=None, concurrency=1, batch_by_store=False):
+        self.name, self.cost, self.answers = name, cost, answers
+        self.limit, self.concurrency, self.batch_by_store = limit, concurrency, batch_by_store
+        self.offered, self.batches = [], 0
+
+    def covers(self, unit):
+        return True
+
+    def batch_key(self, unit):
+        return unit.store_id if self.batch_by_store else None
+
+    async def fetch(self, units, day):
+        self.batches += 1
+        self.offered.extend((unit.store_id, unit.item_id) for unit in units)
+        results = []
+        for unit in units:
+            price, confidence = self.answers.get((unit.store_id, unit.item_id), (None, 0.0))
+            results.append(observe(unit, price, day, self.name, confidence))
+        return results
+
+
+def _units(staleness=None):
+    staleness = staleness or {}
+    return [WorkUnit(s, i, f"Store {s}", f"item {i}", staleness=staleness.get((s, i), 1.0))
+            for s in (1, 2) for i in (1, 2, 3)]
+
+
+def _run(sources, units, min_confidence=MIN_CONFIDENCE):
+    return PriceScheduler(sources, min_confidence).run(units, DAY)
+
+
+def test_expensive_tier_only_sees_unfilled_pairs():
+    cheap = FakeSource('cheap', 0.0, {(1, 1): (2.0, 0.9), (1, 2): (2.5, 0.2), (2, 1): (3.0, 0.7)})
+    dear = FakeSource('dear', 10.0, {pair: (4.0, 0.6) for pair in [(s, i) for s in (1, 2) for i in (1, 2, 3)]})
+    observations = _run([dear, cheap], _units())
+    assert set(cheap.offered) == {(s, i) for s in (1, 2) for i in (1, 2, 3)}
+    # (1, 2) was answered below MIN_CONFIDENCE, so it goes on to the next tier
+    assert sorted(dear.offered) == [(1, 2), (1, 3), (2, 2), (2, 3)]
+    # The low-confidence cheap answer stays in the stream
+    assert ((observations['source'] == 'cheap') & (observations['item_id'] == 2)).sum() == 1
+
+
+def test_same_cost_sources_share_a_tier():
+    first = FakeSource('first', 1.0, {(1, 1): (2.0, 0.9)})
+    second = FakeSource('second', 1.0, {})
+    _run([first, second], _units())
+    assert sorted(first.offered) == sorted(second.offered) and len(second.offered) == 6
+
+
+def test_limit_offers_the_stalest_units():
+    staleness = {(1, 3): float('inf'), (2, 2): 9.0, (2, 3): 4.0, (1, 1): 2.0}
+    dear = FakeSource('dear', 10.0, {}, limit=3)
+    _run([dear], _units(staleness))
+    assert dear.offered == [(1, 3), (2, 2), (2, 3)]
+
+
+def test_units_are_batched_by_key():
+    source = FakeSource('batched', 1.0, {}, batch_by_store=True)
+    _run([source], _units())
+    assert source.batches == 2
+
+
+def test_min_confidence_is_inclusive():
+    cheap = FakeSource('cheap', 0.0, {(1, 1): (2.0, 0.4)})
+    dear = FakeSource('dear', 10.0, {})
+    _run([cheap, dear], _units(), min_confidence=0.4)
+    assert (1, 1) not in dear.offered and len(dear.offered) == 5
+
+
+def test_price_rows_keep_the_best_new_confident_price():
+    observations = pd.DataFrame([
+        (1, 1, 3.00, '2025-05-20', 'snapshot', 0.9),
+        (1, 1, 3.10, DAY, 'scraper', 0.8),
+        (1, 2, 2.00, DAY, 'sampled', 0.2),
+        (1, 2, 2.40, DAY, 'llm', 0.6),
+        (2, 1, 1.00, DAY, 'simulated', 0.1),
+        (2, 2, 5.00, '2025-05-19', 'snapshot', 0.6),
+    ], columns=['store_id', 'item_id', 'price', 'date', 'source', 'confidence'])
+    rows = price_rows(observations)
+    # (1, 1) and (2, 2) are best answered by what's already stored, (2, 1) isn't confident
+    assert rows.to_dict('records') == [{'store_id': 1, 'item_id': 2, 'price': 2.40, 'date': DAY}]
+
+
+def test_snapshot_confidence_halves_per_half_life():
+    latest = pd.DataFrame({'store_id': [1, 1], 'item_id': [1, 2], 'price': [2.0, 3.0],
+                           'date': [DAY, '2025-05-14']})
+    source = SnapshotSource(latest, confidence=0.8, half_life_days=7)
+    fresh, week_old = asyncio.run(source.fetch(_units()[:2], DAY))
+    assert fresh.confidence == pytest.approx(0.8) and week_old.confidence == pytest.approx(0.4)
+    assert week_old.date == '2025-05-14'
+
+
+def test_branches_of_a_chain_get_their_own_simulated_prices():
+    stores = pd.DataFrame({'store_id': [1, 2, 3], 'store_name': ['Walmart', 'Walmart', 'Walmart'],
+                           'osm_id': [101, 102, 0], 'lat': [30.1, 30.2, 30.3], 'lon': [-91.0, -91.1, -91.2]})
+    items = pd.DataFrame({'item_id': range(1, 21), 'name': [f"item {i}" for i in range(1, 21)]})
+    units = work_units(stores, items, day=DAY)
+    assert sorted({unit.store_key for unit in units}) == ['Walmart@30.3,-91.2', 'osm:101', 'osm:102']
+    observations = asyncio.run(SimulatedSource().fetch(units, DAY))
+    rows = [[o.price for o in observations if o.store_id == store] for store in (1, 2, 3)]
+    assert rows[0] != rows[1] and rows[1] != rows[2]
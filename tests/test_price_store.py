@@ -0,0 +1,60 @@
+import pandas as pd
+
+from price_snapshot import update_snapshot
+from price_store import ingest_prices, read_latest, write_items, write_prices, write_stores
+
+
+def _store(tmp_path):
+    data_dir = str(tmp_path)
+    write_stores(pd.DataFrame({'store_id': [1, 2], 'store_name': ['A', 'B']}), data_dir)
+    write_items(pd.DataFrame({'item_id': [1], 'name': ['milk']}), data_dir)
+    write_prices(pd.DataFrame({'store_id': [1, 2], 'item_id': [1, 1], 'price': [3.49, 3.29],
+                               'date': ['2025-05-01', '2025-05-01']}), data_dir)
+    return data_dir
+
+
+def test_empty_ingest_leaves_snapshot_unchanged(tmp_path):
+    data_dir = _store(tmp_path)
+    before = read_latest(data_dir)
+    empty = pd.DataFrame({'store_id': [], 'item_id': [], 'price': [], 'date': []})
+    assert ingest_prices(empty, data_dir) == 0
+    pd.testing.assert_frame_equal(read_latest(data_dir), before)
+
+
+def test_update_snapshot_with_no_new_prices(tmp_path):
+    snapshot = read_latest(_store(tmp_path))
+    empty = snapshot.iloc[:0][['store_id', 'item_id', 'date', 'price']]
+
+    def read_window(start):
+        raise AssertionError("nothing new, so nothing to read")
+
+    assert update_snapshot(snapshot, empty, read_window) is snapshot
+
+
+def test_ingest_updates_latest(tmp_path):
+    data_dir = _store(tmp_path)
+    ingest_prices(pd.DataFrame({'store_id': [1], 'item_id': [1], 'price': [3.59], 'date': ['2025-05-02']}), data_dir)
+    latest = read_latest(data_dir).set_index('store_id')
+    assert latest.loc[1, 'price'] == 3.59 and latest.loc[1, 'date'] == '2025-05-02'
+    assert latest.loc[2, 'price'] == 3.29
+
+
+def test_read_prices_keeps_the_latest_append(tmp_path):
+    from price_store import append_prices, read_prices
+    data_dir = _store(tmp_path)
+    append_prices(pd.DataFrame({'store_id': [1], 'item_id': [1], 'price': [2.99], 'date': ['2025-05-01']}),
+                  data_dir)
+    prices = read_prices(data_dir).sort_values('store_id')
+    assert prices['price'].tolist() == [2.99, 3.29]
+
+
+def test_fresh_checkout_has_demo_prices(tmp_path):
+    import os
+    import shutil
+    from price_store import load_dashboard_tables
+    checkout = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+    for name in ('stores.csv', 'items.csv', 'prices.csv'):
+        shutil.copy(os.path.join(checkout, name), tmp_path)
+    stores_df, items_df, latest_df = load_dashboard_tables(str(tmp_path))
+    assert len(latest_df) == len(stores_df) * len(items_df) > 0
+    assert latest_df['price'].notna().all()
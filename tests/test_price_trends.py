@@ -0,0 +1,72 @@
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from price_simulator import cube_dates, cube_to_frame, simulate_price_days
+from price_store import ingest_prices, write_items, write_prices, write_stores
+from price_trends import analyze_cube, analyze_history, cube_from_frame, load_price_cube
+
+
+def _history(data_dir, days=40, stores=6, items=5, gap=None):
+    os.makedirs(data_dir, exist_ok=True)
+    write_stores(pd.DataFrame({'store_id': np.arange(1, stores + 1), 'store_name': [f"S{i}" for i in range(stores)]}),
+                 data_dir)
+    write_items(pd.DataFrame({'item_id': np.arange(1, items + 1), 'name': [f"I{i}" for i in range(items)]}), data_dir)
+    dates = [d for d in cube_dates(days) if d != gap]
+    cube = simulate_price_days(np.linspace(1, 9, items), np.linspace(0.8, 1.2, stores), dates)
+    cube[0, 2, 3] *= 3  # One obvious outlier on the latest day (dates are most recent first)
+    prices_df = cube_to_frame(cube, dates, np.arange(1, stores + 1), np.arange(1, items + 1))
+    write_prices(prices_df, data_dir)
+    return prices_df
+
+
+@pytest.mark.parametrize('method', ['zscore', 'mad'])
+def test_history_matches_in_memory_cube(tmp_path, method):
+    data_dir = str(tmp_path)
+    dates = cube_dates(40)
+    prices_df = _history(data_dir, gap=dates[10])
+    # A late correction appended to an existing partition wins over the first row
+    ingest_prices(pd.DataFrame({'store_id': [1], 'item_id': [1], 'price': [99.0], 'date': [dates[1]]}), data_dir)
+    prices_df.loc[(prices_df['store_id'] == 1) & (prices_df['item_id'] == 1) & (prices_df['date'] == dates[1]),
+                  'price'] = 99.0
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        report = analyze_history(data_dir, method=method)
+    expected = analyze_cube(*cube_from_frame(prices_df), method=method)
+    assert report.dates == expected.dates and len(report.dates) == 40
+    np.testing.assert_allclose(report.rolling_mean, expected.rolling_mean, rtol=1e-5)
+    np.testing.assert_array_equal(report.anomaly_counts, expected.anomaly_counts)
+    flagged = set(zip(report.top_anomalies['store_id'], report.top_anomalies['item_id'], report.top_anomalies['date']))
+    assert {(3, 4, dates[0]), (1, 1, dates[1])} <= flagged
+
+
+def test_temporary_cube_is_removed(tmp_path, monkeypatch):
+    import tempfile
+    _history(str(tmp_path / 'data'))
+    scratch = tmp_path / 'scratch'
+    scratch.mkdir()
+    monkeypatch.setattr(tempfile, 'tempdir', str(scratch))
+    analyze_history(str(tmp_path / 'data'))
+    assert os.listdir(scratch) == []
+
+
+def test_cube_is_a_memmap(tmp_path):
+    _history(str(tmp_path / 'data'), days=5)
+    cube, dates, store_ids, item_ids = load_price_cube(str(tmp_path / 'data'), str(tmp_path / 'cube.npy'))
+    assert isinstance(cube, np.memmap) and cube.shape == (5, 6, 5)
+    assert not np.isnan(cube).any()
+
+
+def test_empty_history(tmp_path):
+    data_dir = str(tmp_path)
+    _history(data_dir, days=3)
+    for part in os.listdir(os.path.join(data_dir, 'prices')):
+        for name in os.listdir(os.path.join(data_dir, 'prices', part)):
+            os.remove(os.path.join(data_dir, 'prices', part, name))
+    report = analyze_history(data_dir)
+    assert report.dates == [] and report.top_anomalies.empty
+    assert report.rolling_mean.shape == (6, 5)
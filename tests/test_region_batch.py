@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+from geo_distance import haversine_miles
+from price_records import Store
+from region_batch import Region, _run_region, plan_fetches, read_regions
+
+NEW_ORLEANS = (29.9511, -90.0715)
+METAIRIE = (29.9841, -90.1529)
+SHREVEPORT = (32.5252, -93.7502)
+
+
+def _stores(center, count, first_id):
+    return [Store(f"Store {first_id + i}", 'N/A', center[0] + i / 200, center[1], 0.0,
+                  'supermarket', 'supermarket', 'N/A', 'N/A', first_id + i)
+            for i in range(count)]
+
+
+def _run(region, stores, out_dir, seed=1):
+    return _run_region(region, region.center, stores, seed, str(out_dir), 0, 1)
+
+
+def test_overlapping_circles_share_one_fetch():
+    groups = plan_fetches([NEW_ORLEANS, METAIRIE], [50, 50])
+    assert len(groups) == 1
+    group = groups[0]
+    assert group.members == [0, 1]
+    # The covering circle reaches past both regions but fetches less than the two apart
+    for center in (NEW_ORLEANS, METAIRIE):
+        apart = haversine_miles(group.center[0], group.center[1], center[0], center[1])
+        assert apart + 50 <= group.radius_miles + 1e-9
+    assert group.radius_miles ** 2 <= 2 * 50 ** 2
+
+
+def test_distant_circles_are_fetched_apart():
+    groups = plan_fetches([NEW_ORLEANS, SHREVEPORT], [50, 50])
+    assert sorted(group.members for group in groups) == [[0], [1]]
+    for group, center in zip(sorted(groups, key=lambda g: g.members), (NEW_ORLEANS, SHREVEPORT)):
+        assert group.center == center
+        assert group.radius_miles == 50
+
+
+def test_only_overlapping_regions_merge():
+    groups = plan_fetches([NEW_ORLEANS, SHREVEPORT, METAIRIE], [50, 50, 50])
+    assert sorted(group.members for group in groups) == [[0, 2], [1]]
+
+
+def test_touching_but_wasteful_circles_stay_apart():
+    # Overlapping, but one circle covering both would fetch more ground than two
+    groups = plan_fetches([NEW_ORLEANS, SHREVEPORT], [200, 5])
+    assert sorted(group.members for group in groups) == [[0], [1]]
+
+
+def test_rerun_replaces_only_its_partition(tmp_path):
+    new_orleans = Region('New Orleans', 'New Orleans, LA', 10, NEW_ORLEANS)
+    shreveport = Region('Shreveport', 'Shreveport, LA', 10, SHREVEPORT)
+    _run(new_orleans, _stores(NEW_ORLEANS, 3, 1), tmp_path)
+    _run(shreveport, _stores(SHREVEPORT, 2, 100), tmp_path)
+    before = read_regions('prices', out_dir=tmp_path)
+    untouched = before[before['region'] == 'shreveport'].reset_index(drop=True)
+
+    _run(new_orleans, _stores(NEW_ORLEANS, 2, 50), tmp_path, seed=2)
+
+    stores = read_regions('stores', out_dir=tmp_path)
+    assert sorted(stores.loc[stores['region'] == 'new-orleans', 'store_key']) == ['osm:50', 'osm:51']
+    assert sorted(stores.loc[stores['region'] == 'shreveport', 'store_key']) == ['osm:100', 'osm:101']
+    after = read_regions('prices', out_dir=tmp_path)
+    assert set(after.loc[after['region'] == 'new-orleans', 'store_key']) == {'osm:50', 'osm:51'}
+    after_shreveport = after[after['region'] == 'shreveport'].reset_index(drop=True)
+    assert after_shreveport.equals(untouched)
+    summary = read_regions('summary', out_dir=tmp_path).set_index('region')
+    assert summary.loc['new-orleans', 'stores'] == 2
+    assert summary.loc['shreveport', 'stores'] == 2
+    assert os.listdir(tmp_path / 'prices' / 'region=new-orleans') == ['part-0.parquet']
+
+
+def test_read_regions_filters_by_name(tmp_path):
+    regions = [Region('New Orleans', '', 10, NEW_ORLEANS), Region('Metairie', '', 10, METAIRIE),
+               Region('Shreveport', '', 10, SHREVEPORT)]
+    for number, region in enumerate(regions):
+        _run(region, _stores(region.center, 2, 10 * (number + 1)), tmp_path)
+
+    everything = read_regions('stores', out_dir=tmp_path)
+    assert set(everything['region']) == {'new-orleans', 'metairie', 'shreveport'}
+    picked = read_regions('stores', regions=['New Orleans', 'Shreveport'], out_dir=tmp_path)
+    assert set(picked['region']) == {'new-orleans', 'shreveport'}
+    assert len(picked) == 4
+    assert sorted(picked['store_key']) == ['osm:10', 'osm:11', 'osm:30', 'osm:31']
+    assert read_regions('summary', regions=[], out_dir=tmp_path).empty
+
+
+def test_read_regions_rejects_unknown_table(tmp_path):
+    with pytest.raises(ValueError):
+        read_regions('basket', out_dir=tmp_path)
@@ -0,0 +1,121 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from response_cache import (OverpassError, ResponseCache, _server_max_age, cached_geocode, fetch_overpass,
+                            get_http_cache, normalize_query)
+
+QUERY = '[out:json][timeout:25];\nnode["shop"="supermarket"](around:1000,30.45,-91.18);\nout body;'
+CENTER = (30.45, -91.18)
+PAYLOAD = {'elements': [{'type': 'node', 'id': 1, 'lat': 30.45, 'lon': -91.18, 'tags': {'name': 'Rouses'}}]}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite3'))
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def overpass(stub_server):
+    """Overpass stand-in that tags its answer with an ETag and answers a matching If-None-Match with 304"""
+    def handler(path, params, headers, body):
+        if headers.get('If-None-Match') == '"v1"':
+            return 304, {'ETag': '"v1"'}, b''
+        return 200, {'Content-Type': 'application/json', 'ETag': '"v1"'}, json.dumps(PAYLOAD).encode()
+    return stub_server(handler)
+
+
+def test_miss_then_hit(cache):
+    assert cache.get('key') is None
+    cache.set('key', {'a': 1}, ttl=60)
+    assert cache.get('key') == {'a': 1}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_expired_entry_is_a_miss(cache):
+    cache.set('key', [1, 2], ttl=-1)
+    assert cache.get('key') is None
+    assert cache.misses == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'small.sqlite3'), max_entries=2)
+    cache.set('a', 1, ttl=60)
+    cache.set('b', 2, ttl=60)
+    cache.get('a')
+    cache.set('c', 3, ttl=60)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    cache.close()
+
+
+def test_geocode_is_cached(cache):
+    calls = []
+
+    class Geolocator:
+        def geocode(self, place):
+            calls.append(place)
+            return SimpleNamespace(latitude=30.5594, longitude=-91.5557)
+
+    assert cached_geocode(Geolocator(), 'Livonia, LA', cache) == (30.5594, -91.5557)
+    assert cached_geocode(Geolocator(), 'Livonia, LA', cache) == (30.5594, -91.5557)
+    assert calls == ['Livonia, LA']
+
+
+def test_overpass_miss_then_hit(cache, overpass):
+    assert fetch_overpass(QUERY, CENTER, cache=cache, url=overpass.url) == PAYLOAD
+    assert fetch_overpass(QUERY, CENTER, cache=cache, url=overpass.url) == PAYLOAD
+    assert len(overpass.requests) == 1
+    assert overpass.requests[0][1]['data'] == QUERY
+
+
+def test_overpass_other_query_is_a_miss(cache, overpass):
+    fetch_overpass(QUERY, CENTER, cache=cache, url=overpass.url)
+    fetch_overpass(QUERY.replace('supermarket', 'convenience'), CENTER, cache=cache, url=overpass.url)
+    assert len(overpass.requests) == 2
+
+
+def test_expired_overpass_payload_is_revalidated(cache, overpass):
+    fetch_overpass(QUERY, CENTER, cache=cache, url=overpass.url)
+    # ttl=0: the stored payload is stale at once, so it is revalidated and the 304 served from the store
+    assert fetch_overpass(QUERY, CENTER, cache=cache, ttl=0, url=overpass.url) == PAYLOAD
+    assert len(overpass.requests) == 2
+    assert overpass.requests[1][2].get('If-None-Match') == '"v1"'
+
+
+def test_overpass_errors_are_not_cached(cache, stub_server):
+    server = stub_server(lambda path, params, headers, body: (504, {}, b'Gateway Timeout'))
+    for _ in range(2):
+        with pytest.raises(OverpassError) as error:
+            fetch_overpass(QUERY, CENTER, cache=cache, url=server.url)
+        assert error.value.status_code == 504
+    assert len(server.requests) == 2
+
+
+def test_reformatted_query_hits(cache, overpass):
+    fetch_overpass(QUERY, CENTER, cache=cache, url=overpass.url)
+    assert fetch_overpass('  ' + QUERY.replace('\n', '\n\t  '), CENTER, cache=cache, url=overpass.url) == PAYLOAD
+    assert len(overpass.requests) == 1
+
+
+def test_tag_values_keep_their_case(cache, overpass):
+    assert normalize_query('node["name"="ALDI"]') != normalize_query('node["name"="aldi"]')
+    fetch_overpass(QUERY, CENTER, cache=cache, url=overpass.url)
+    fetch_overpass(QUERY.replace('supermarket', 'Supermarket'), CENTER, cache=cache, url=overpass.url)
+    assert len(overpass.requests) == 2
+
+
+def test_one_http_cache_per_store(cache):
+    http = get_http_cache(cache)
+    assert get_http_cache(cache) is http
+    assert http.cache is cache
+
+
+def test_server_max_age():
+    assert _server_max_age({}) == 0
+    assert _server_max_age({'Cache-Control': 'no-store'}) is None
+    assert _server_max_age({'Cache-Control': 'no-cache'}) == 0
+    assert _server_max_age({'Cache-Control': 'public, max-age=600'}) == 600
@@ -0,0 +1,43 @@
+from dataclasses import replace
+
+import pytest
+
+from price_comparison import GroceryPriceComparer
+from price_records import Store
+from road_network import SNAP_MARGIN_MILES, RoadGraph, _grid_elements, build_drive_times, grid_origins
+
+
+@pytest.fixture
+def matrix(tmp_path):
+    graph = RoadGraph.from_osm(_grid_elements(12, 12))
+    stores = [Store(f"Store {i}", 'N/A', float(graph.lats[n]) + 0.001, float(graph.lons[n]), 0.0,
+                    'supermarket', 'supermarket', 'N/A', 'N/A', 1000 + i) for i, n in enumerate((5, 70, 130))]
+    origins = grid_origins([s.lat for s in stores], [s.lng for s in stores], spacing_miles=1.0, margin_miles=0)
+    return build_drive_times(graph, origins, stores, str(tmp_path)), stores, origins
+
+
+def test_snap_distance_is_spacing_plus_margin(matrix):
+    drive_times, _, _ = matrix
+    assert drive_times.snap_miles == pytest.approx(1.0 + SNAP_MARGIN_MILES, abs=0.05)
+
+
+def test_nearest_origin_rejects_distant_points(matrix):
+    drive_times, _, origins = matrix
+    origin_id, lat, lon = origins[0]
+    assert drive_times.nearest_origin((lat + 0.001, lon)) == origin_id
+    assert drive_times.nearest_origin((lat + 1.0, lon)) is None
+    assert drive_times.nearest_origin((lat + 0.02, lon), max_miles=0.1) is None
+
+
+def test_find_nearby_stores_falls_back_to_straight_line(matrix, monkeypatch):
+    drive_times, stores, origins = matrix
+    straight = [replace(store, distance=10.0 + i) for i, store in enumerate(stores)]
+    far = (origins[0][1] + 1.0, origins[0][2])
+    comparer = GroceryPriceComparer('70760', drive_times=drive_times, center=far)
+    monkeypatch.setattr(comparer, 'fetch_stores', lambda center, radius: list(straight))
+    assert comparer.find_nearby_stores() == straight
+
+    near = (origins[0][1], origins[0][2])
+    comparer = GroceryPriceComparer('70760', drive_times=drive_times, center=near)
+    monkeypatch.setattr(comparer, 'fetch_stores', lambda center, radius: list(straight))
+    assert [store.distance for store in comparer.find_nearby_stores()] != [10.0, 11.0, 12.0]
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from geo_distance import haversine_miles
+from price_records import Store
+from store_index import KNOWN_CENTERS, StoreIndex
+
+
+def _stores(count=600, seed=0):
+    rng = np.random.default_rng(seed)
+    lats, lons = rng.uniform(29.5, 31.5, count), rng.uniform(-92.5, -89.5, count)
+    return [Store(f"Store {i}", 'N/A', float(lat), float(lon), 0.0, 'supermarket', 'supermarket', 'N/A', 'N/A', i + 1)
+            for i, (lat, lon) in enumerate(zip(lats, lons))]
+
+
+def _brute_force(stores, center):
+    distances = haversine_miles(center[0], center[1], [s.lat for s in stores], [s.lng for s in stores])
+    order = np.argsort(distances, kind='stable')
+    return [(stores[i], float(distances[i])) for i in order]
+
+
+CENTERS = list(KNOWN_CENTERS.values()) + [(30.0, -91.0), (33.0, -95.0)]
+
+
+@pytest.mark.parametrize('cell_degrees', [0.05, 0.1, 0.5])
+@pytest.mark.parametrize('center', CENTERS)
+def test_within_matches_a_full_scan(center, cell_degrees):
+    stores = _stores()
+    index = StoreIndex(stores, cell_degrees)
+    ranked = _brute_force(stores, center)
+    for radius in (0.0, 3.0, 15.0, 60.0, 400.0):
+        expected = [(s.osm_id, d) for s, d in ranked if d <= radius]
+        found = [(s.osm_id, d) for s, d in index.within(center, radius)]
+        assert [i for i, _ in found] == [i for i, _ in expected]
+        np.testing.assert_allclose([d for _, d in found], [d for _, d in expected])
+
+
+@pytest.mark.parametrize('cell_degrees', [0.05, 0.1, 0.5])
+@pytest.mark.parametrize('center', CENTERS)
+def test_nearest_matches_a_full_scan(center, cell_degrees):
+    stores = _stores()
+    index = StoreIndex(stores, cell_degrees)
+    ranked = _brute_force(stores, center)
+    for k in (1, 5, 40, len(stores) + 10):
+        found = index.nearest(center, k)
+        assert [s.osm_id for s, _ in found] == [s.osm_id for s, _ in ranked[:k]]
+    assert index.nearest(center, 0) == []
+
+
+def test_recenter_sets_distances_from_the_new_centre():
+    stores = _stores()
+    center = KNOWN_CENTERS['Livonia, LA']
+    recentred = StoreIndex(stores).recenter(center, 20)
+    expected = [(s.osm_id, d) for s, d in _brute_force(stores, center) if d <= 20]
+    assert [(s.osm_id, s.distance) for s in recentred] == pytest.approx(expected)
+    assert all(isinstance(s, Store) for s in recentred) and stores[0].distance == 0.0
+
+
+def test_dict_stores_are_indexed_too():
+    stores = _stores(50)
+    flat = [{'name': s.name, 'lat': s.lat, 'lon': s.lng} for s in stores]
+    nested = [{'name': s.name, 'location': {'lat': s.lat, 'lng': s.lng}} for s in stores]
+    center = KNOWN_CENTERS['Baton Rouge, LA']
+    expected = [s.name for s, d in _brute_force(stores, center) if d <= 50]
+    for records in (flat, nested):
+        recentred = StoreIndex(records).recenter(center, 50)
+        assert [r['name'] for r in recentred] == expected and 'distance' in recentred[0]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    stores = _stores(200)
+    index = StoreIndex(stores, 0.2)
+    path = str(tmp_path / 'stores.npz')
+    index.save(path)
+    loaded = StoreIndex.load(path)
+    assert loaded.stores == stores and loaded.cell_degrees == 0.2
+    center = KNOWN_CENTERS['New Roads, LA']
+    assert loaded.within(center, 30) == index.within(center, 30)
+    assert loaded.nearest(center, 7) == index.nearest(center, 7)
+
+
+def test_empty_index():
+    index = StoreIndex([])
+    assert len(index) == 0 and index.within((30.0, -91.0), 10) == [] and index.nearest((30.0, -91.0), 3) == []
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from price_parser import parse_price
+from response_cache import HttpCache, ResponseCache
+from store_scrapers import FIXTURE_DIR, RousesScraper, ScrapeSession, WalmartScraper, scraper_for_url, serve_fixtures
+
+
+def _fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture
+def fixture_server():
+    server = serve_fixtures()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture
+def http_cache(tmp_path):
+    cache = HttpCache(ResponseCache(str(tmp_path / 'cache.sqlite3')))
+    yield cache
+    cache.cache.close()
+
+
+def test_walmart_price_keeps_cents():
+    price = WalmartScraper().parse(_fixture('walmart_search.html'))
+    assert price == '$3.48'
+    assert parse_price(price) == 3.48
+
+
+def test_rouses_price():
+    assert RousesScraper().parse(_fixture('rouses_search.html')) == '$3.49'
+
+
+def test_page_without_results():
+    assert WalmartScraper().parse(b'<html><body><p>No results</p></body></html>') == 'N/A'
+    assert RousesScraper().parse(b'') == 'N/A'
+
+
+def test_scraper_for_url():
+    assert scraper_for_url('https://www.walmart.com/store/123').name == 'walmart'
+    assert scraper_for_url('https://rouses.com/shop/').name == 'rouses'
+    assert scraper_for_url('https://www.target.com/') is None
+
+
+def test_scrape_session_against_fixtures(fixture_server, http_cache):
+    walmart = WalmartScraper(fixture_server + '/walmart_search.html?q={query}')
+    rouses = RousesScraper(fixture_server + '/rouses_search.html?s={query}')
+    jobs = [(scraper, item) for scraper in (walmart, rouses) for item in ('milk', 'eggs', 'bread')]
+
+    results = ScrapeSession(http_cache=http_cache).scrape(jobs)
+    assert [(r['store'], r['item'], r['price']) for r in results] == [
+        (scraper.name, item, '$3.48' if scraper is walmart else '$3.49') for scraper, item in jobs]
+
+    # The fixture server honours If-Modified-Since, so a second pass is all 304s
+    again = ScrapeSession(http_cache=http_cache).scrape(jobs)
+    assert [r['price'] for r in again] == [r['price'] for r in results]
+    assert http_cache.stats['not_modified'] == len(jobs)
+
+
+def test_missing_page_is_not_a_price(fixture_server, http_cache):
+    scraper = WalmartScraper(fixture_server + '/missing.html?q={query}')
+    session = ScrapeSession(http_cache=http_cache)
+    assert session.scrape([(scraper, 'milk')])[0]['price'] == 'N/A'
+    assert session.stats['errors'] == 0